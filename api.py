@@ -5,6 +5,7 @@ import uvicorn
 import aiofiles
 import configparser
 import asyncio
+import atexit
 import time
 from typing import List
 from fastapi import FastAPI
@@ -18,8 +19,11 @@ from selenium.webdriver.chrome.options import Options
 
 from sources.llm_provider import Provider
 from sources.agents import CasualAgent, CoderAgent, FileAgent, BrowserAgent, PlannerAgent
-from sources.browser import Browser, create_driver
+from sources.browser_pool import BrowserPool
+from sources.fetcher import parse_domain_modes
+from sources.router import AgentRouter
 from sources.utility import pretty_print
+from sources.models import set_quantization, set_onnx
 from sources.logger import Logger
 from sources.schemas import QueryRequest, QueryResponse
 
@@ -48,6 +52,8 @@ def initialize_system():
     stealth_mode = config.getboolean('BROWSER', 'stealth_mode')
     personality_folder = "jarvis" if config.getboolean('MAIN', 'jarvis_personality') else "base"
     languages = config["MAIN"]["languages"].split(' ')
+    set_quantization(config.getboolean('MAIN', 'quantize_models', fallback=False))
+    set_onnx(config.getboolean('MAIN', 'use_onnx', fallback=False))
 
     provider = Provider(
         provider_name=config["MAIN"]["provider_name"],
@@ -57,24 +63,36 @@ def initialize_system():
     )
     logger.info(f"Provider initialized: {provider.provider_name} ({provider.model})")
 
-    # Try creating browser with our fixed approach
-    browser = None
+    # Try creating browser with our fixed approach, each web task leases its own browser from the pool
+    browser_pool = None
     try:
         logger.info("Initializing Chrome browser with fixed settings...")
-        driver = create_driver(headless=False, stealth_mode=False)
-        browser = Browser(driver, anticaptcha_manual_install=False)
+        browser_pool = BrowserPool(
+            size=config.getint('BROWSER', 'pool_size', fallback=1),
+            headless=config.getboolean('BROWSER', 'headless_browser', fallback=False),
+            stealth_mode=False,
+            max_navigations=config.getint('BROWSER', 'max_navigations', fallback=50),
+            browser_kwargs={
+                "html_extractor": config.get('BROWSER', 'html_extractor', fallback='auto'),
+                "fetch_mode": config.get('BROWSER', 'fetch_mode', fallback='auto'),
+                "domain_fetch_modes": parse_domain_modes(config.get('BROWSER', 'domain_fetch_modes', fallback=''))
+            }
+        )
+        browser_pool.start()
+        atexit.register(browser_pool.close)
         logger.info("Browser initialized successfully!")
     except Exception as e:
         logger.error(f"Browser initialization failed: {str(e)}")
         pretty_print("Browser initialization failed. Running in browser-less mode.", color="warning")
-        browser = None
+        browser_pool = None
 
     # Create all agents
     agents = [
         CasualAgent(
             name=config["MAIN"]["agent_name"],
             prompt_path=f"prompts/{personality_folder}/casual_agent.txt",
-            provider=provider, verbose=False
+            provider=provider, verbose=False,
+            semantic_retrieval=config.getboolean('MAIN', 'semantic_retrieval', fallback=False)
         ),
         CoderAgent(
             name="coder",
@@ -89,26 +107,37 @@ def initialize_system():
     ]
     
     # Only add browser-dependent agents if browser was initialized
-    if browser:
+    if browser_pool:
         agents.extend([
             BrowserAgent(
                 name="Browser",
                 prompt_path=f"prompts/{personality_folder}/browser_agent.txt",
-                provider=provider, verbose=False, browser=browser
+                provider=provider, verbose=False, browser=browser_pool
             ),
             PlannerAgent(
                 name="Planner",
                 prompt_path=f"prompts/{personality_folder}/planner_agent.txt",
-                provider=provider, verbose=False, browser=browser
+                provider=provider, verbose=False, browser=browser_pool
             )
         ])
     
     logger.info("Agents initialized")
 
-    # Use simplified interaction without router
+    # the router answers right away with keyword routing while its models load in background
+    router = None
+    if config.getboolean('MAIN', 'use_router', fallback=False):
+        try:
+            router = AgentRouter(agents, supported_language=languages)
+            logger.info("Router initialized, models loading in background")
+        except Exception as e:
+            logger.error(f"Router initialization failed: {str(e)}")
+
+    # Use simplified interaction
     class SimpleInteraction:
-        def __init__(self, agents):
+        def __init__(self, agents, router=None, browser_pool=None):
             self.agents = agents
+            self.router = router
+            self.browser_pool = browser_pool
             self.current_agent = agents[0] if agents else None
             self.last_query = None
             self.last_answer = None
@@ -120,8 +149,10 @@ def initialize_system():
             if not self.last_query:
                 return False
                 
-            # Always use the first agent (casual agent)
-            self.current_agent = self.agents[0]
+            # use the first agent (casual agent) without router
+            # the routing models run on a worker thread, not on the event loop
+            agent = await asyncio.to_thread(self.router.select_agent, self.last_query) if self.router else None
+            self.current_agent = agent if agent is not None else self.agents[0]
             self.last_answer, self.last_reasoning = await self.current_agent.process(self.last_query, None)
             self.last_success = True if self.last_answer else False
             return self.last_success
@@ -139,8 +170,8 @@ def initialize_system():
             # No-op
             pass
 
-    interaction = SimpleInteraction(agents)
-    logger.info("Simple interaction initialized (router disabled)")
+    interaction = SimpleInteraction(agents, router, browser_pool)
+    logger.info(f"Simple interaction initialized (router {'enabled' if router else 'disabled'})")
             
     return interaction
 
@@ -151,9 +182,11 @@ query_resp_history = []
 @api.get("/screenshot")
 async def get_screenshot():
     logger.info("Screenshot endpoint called")
-    screenshot_path = ".screenshots/updated_screen.png"
-    if os.path.exists(screenshot_path):
-        return FileResponse(screenshot_path)
+    # each pooled browser writes its own folder, show the latest screenshot of any of them
+    screenshots = [os.path.join(root, "updated_screen.png") for root, _, files in os.walk(".screenshots")
+                   if "updated_screen.png" in files]
+    if screenshots:
+        return FileResponse(max(screenshots, key=os.path.getmtime))
     logger.error("No screenshot available")
     return JSONResponse(
         status_code=404,
@@ -163,7 +196,12 @@ async def get_screenshot():
 @api.get("/health")
 async def health_check():
     logger.info("Health check endpoint called")
-    return {"status": "healthy", "version": "0.1.0"}
+    router = {"enabled": False, "ready": False}
+    if interaction.router is not None:
+        router = {"enabled": True, **interaction.router.status(), "cache": interaction.router.cache.stats(),
+                  "decisions": interaction.router.decisions}
+    browsers = interaction.browser_pool.status() if interaction.browser_pool is not None else None
+    return {"status": "healthy", "version": "0.1.0", "router": router, "browsers": browsers}
 
 @api.get("/is_active")
 async def is_active():
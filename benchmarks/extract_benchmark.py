@@ -0,0 +1,119 @@
+#!/usr/bin python3
+
+"""
+Page text extraction benchmark.
+
+Run the html extractors of the browser on saved html pages, and compare their speed and output
+to the markdownify extractor. Run from the project root:
+
+    python benchmarks/extract_benchmark.py --json extract.json
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+import statistics
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+
+from sources.extractors import HtmlExtractor, get_extractor, LXML_FOUND
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "html")
+
+def load_fixtures(folder: str = FIXTURES_PATH) -> Dict[str, str]:
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(folder, "*.html"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            fixtures[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return fixtures
+
+def words(lines: List[str]) -> set:
+    return set(re.findall(r'\w+', " ".join(lines).lower()))
+
+def compare(baseline: List[str], lines: List[str]) -> dict:
+    """
+    Compare an extraction to the baseline by their vocabulary.
+    recall: share of the baseline words found in the output, precision: share of the output words in the baseline
+    """
+    reference, output = words(baseline), words(lines)
+    common = len(reference & output)
+    return {
+        "recall": common / len(reference) if reference else 1.0,
+        "precision": common / len(output) if output else 1.0
+    }
+
+def time_extractor(extractor: HtmlExtractor, html: str, max_chars: int, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        lines = extractor.extract(html, max_chars)
+        timings.append(time.perf_counter() - start)
+    return lines, timings
+
+def run_benchmark(fixtures: Dict[str, str], extractors: List[HtmlExtractor], max_chars: int = 32768, repeat: int = 5) -> dict:
+    """
+    Extract every fixture with every extractor.
+    Args:
+        fixtures: page name to html
+        extractors: the extractors to compare, the first one is the baseline
+        max_chars: output budget given to the extractors
+        repeat: timed runs per page and extractor
+    Returns:
+        dict: the report, per page and per extractor
+    """
+    report = {"max_chars": max_chars, "repeat": repeat, "baseline": extractors[0].name, "pages": {}}
+    for name, html in fixtures.items():
+        page = {"html_chars": len(html)}
+        baseline = None
+        for extractor in extractors:
+            lines, timings = time_extractor(extractor, html, max_chars, repeat)
+            if baseline is None:
+                baseline = lines
+            output = "\n\n".join(lines)
+            page[extractor.name] = {
+                "p50_ms": statistics.median(timings) * 1000,
+                "lines": len(lines),
+                "chars": len(output),
+                **compare(baseline, lines)
+            }
+        report["pages"][name] = page
+    return report
+
+def print_report(report: dict) -> None:
+    print(f"Budget {report['max_chars']} chars, baseline {report['baseline']}")
+    for name, page in report["pages"].items():
+        print(f"{name} ({page['html_chars']} html chars)")
+        for extractor, stats in page.items():
+            if extractor == "html_chars":
+                continue
+            print(f"  {extractor:<12} {stats['p50_ms']:8.1f}ms  {stats['chars']:>6} chars  {stats['lines']:>4} lines  "
+                  f"recall {stats['recall']:.0%}  precision {stats['precision']:.0%}")
+
+def main(argv: List[str] = None) -> dict:
+    parser = argparse.ArgumentParser(description="Page text extraction benchmark")
+    parser.add_argument("--fixtures", default=FIXTURES_PATH, help="folder of the html pages")
+    parser.add_argument("--extractors", nargs="+", default=["markdownify", "lxml"], help="extractors to compare, the first is the baseline")
+    parser.add_argument("--max-chars", type=int, default=32768, help="output budget")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per page")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    names = [name for name in args.extractors if name != "lxml" or LXML_FOUND]
+    if len(names) < len(args.extractors):
+        print("lxml is not installed, run: pip install lxml")
+    report = run_benchmark(load_fixtures(args.fixtures), [get_extractor(name) for name in names],
+                           max_chars=args.max_chars, repeat=args.repeat)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin python3
+
+"""
+Routing accuracy and latency benchmark.
+
+Run the router on a labelled multilingual query set and report the latency of each routing stage,
+the number of queries decided by the rule based pre-router,
+the end-to-end p50/p95 and the accuracy per agent role. The JSON report allow to compare backends
+and quantization modes across versions. Run from the project root:
+
+    python benchmarks/router_benchmark.py --json router_fp32.json
+    python benchmarks/router_benchmark.py --quantize --json router_int8.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from collections import defaultdict
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+
+RESOURCE_FOUND = True
+
+try:
+    import resource
+except ImportError:
+    RESOURCE_FOUND = False
+
+from sources.router import AgentRouter
+from sources.models import set_quantization, set_onnx, onnx_enabled, registry
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "router_queries.json")
+STAGES = ["rules", "detect", "translate", "complexity", "adaptive", "bart"]
+
+class BenchAgent:
+    """Stand-in for an agent, the router only read its role, name and type."""
+    def __init__(self, role: str, agent_name: str, type: str):
+        self.role = role
+        self.agent_name = agent_name
+        self.type = type
+
+def default_agents() -> List[BenchAgent]:
+    """The agents of cli.py, their roles are the routing labels."""
+    return [
+        BenchAgent("talk", "jarvis", "casual_agent"),
+        BenchAgent("code", "coder", "code_agent"),
+        BenchAgent("files", "File Agent", "file_agent"),
+        BenchAgent("web", "Browser", "browser_agent"),
+        BenchAgent("planification", "Planner", "planner_agent")
+    ]
+
+def load_queries(path: str = QUERIES_PATH) -> List[dict]:
+    """Load the labelled queries, a JSON list of {"text", "lang", "role"}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile with linear interpolation, q in [0, 100]."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+def peak_rss_mb() -> float | None:
+    """Peak resident memory of the process in MB, None where unavailable."""
+    if not RESOURCE_FOUND:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class StageTimer:
+    """
+    Time the routing stages by wrapping the router methods of each stage.
+    The router runs its usual code path, so the decisions are the ones of select_agent.
+    """
+    def __init__(self, router: AgentRouter):
+        self.router = router
+        self.current = defaultdict(float)
+        self.originals = []
+
+    def wrap(self, owner, name: str, stage: str, container: bool = False) -> None:
+        original = owner[name] if container else getattr(owner, name)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.current[stage] += time.perf_counter() - start
+        if container:
+            owner[name] = timed
+        else:
+            setattr(owner, name, timed)
+        self.originals.append((owner, name, original, container))
+
+    def __enter__(self):
+        self.wrap(self.router, "rule_route", "rules")
+        self.wrap(self.router.lang_analysis, "detect_language", "detect")
+        self.wrap(self.router.lang_analysis, "translate", "translate")
+        self.wrap(self.router, "estimate_complexity", "complexity")
+        # the shared encoder pass is counted with the adaptive classifier head
+        self.wrap(self.router, "encode", "adaptive")
+        self.wrap(self.router, "llm_router", "adaptive")
+        self.wrap(self.router.pipelines, "bart", "bart", container=True)
+        return self
+
+    def __exit__(self, *exc):
+        for owner, name, original, container in reversed(self.originals):
+            if container:
+                owner[name] = original
+            else:
+                setattr(owner, name, original)
+        self.originals = []
+
+    def collect(self) -> Dict[str, float]:
+        stages = dict(self.current)
+        self.current = defaultdict(float)
+        return stages
+
+def route_query(router: AgentRouter, text: str, rules: bool = True) -> str:
+    """Route a query like select_agent, without the routing cache."""
+    role = router.rule_route(text) if rules else None
+    if role is not None:
+        return role
+    lang = router.lang_analysis.detect_language(text)
+    return router.route(router.find_first_sentence(text), lang)
+
+def run_benchmark(router: AgentRouter, queries: List[dict], repeat: int = 1, warmup: int = 1, rules: bool = True) -> dict:
+    """
+    Route every query and measure latency and accuracy.
+    Args:
+        router: a ready router
+        queries: labelled queries, {"text", "lang", "role"}
+        repeat: number of timed passes over the queries
+        warmup: number of untimed passes, the first inferences are slower
+        rules: route with the rule based pre-router first, the models only otherwise
+    Returns:
+        dict: the report
+    """
+    for _ in range(warmup):
+        for query in queries:
+            route_query(router, query["text"], rules)
+    stage_times = defaultdict(list)
+    totals = []
+    per_role = defaultdict(lambda: {"total": 0, "correct": 0})
+    per_lang = defaultdict(lambda: {"total": 0, "correct": 0})
+    errors = []
+    decisions = dict(router.decisions)
+    with StageTimer(router) as timer:
+        for run in range(repeat):
+            for query in queries:
+                start = time.perf_counter()
+                role = route_query(router, query["text"], rules)
+                totals.append(time.perf_counter() - start)
+                for stage, seconds in timer.collect().items():
+                    stage_times[stage].append(seconds)
+                if run > 0:
+                    continue
+                correct = role == query["role"]
+                for counts in [per_role[query["role"]], per_lang[query["lang"]]]:
+                    counts["total"] += 1
+                    counts["correct"] += int(correct)
+                if not correct:
+                    errors.append({"text": query["text"], "expected": query["role"], "predicted": role})
+    def latency(values: List[float]) -> dict:
+        return {
+            "calls": len(values),
+            "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000
+        }
+    def accuracy(counts: dict) -> dict:
+        return {name: dict(c, accuracy=c["correct"] / c["total"]) for name, c in sorted(counts.items())}
+    correct = sum(c["correct"] for c in per_role.values())
+    return {
+        "queries": len(queries),
+        "repeat": repeat,
+        "end_to_end": latency(totals),
+        # a stage is only counted for the queries running it, bart only run on ties
+        "stages": {stage: latency(stage_times[stage]) for stage in STAGES},
+        "decided_by_rules": (router.decisions["rules"] - decisions["rules"]) / repeat,
+        "accuracy": correct / len(queries) if queries else 0.0,
+        "accuracy_per_role": accuracy(per_role),
+        "accuracy_per_lang": accuracy(per_lang),
+        "errors": errors
+    }
+
+def environment(load_seconds: float) -> dict:
+    import torch
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "torch": torch.__version__,
+        "quantize": registry.quantize,
+        "onnx": onnx_enabled(),
+        "load_seconds": load_seconds
+    }
+
+def print_report(report: dict) -> None:
+    e2e = report["end_to_end"]
+    print(f"Routed {report['queries']} queries x{report['repeat']}: "
+          f"p50 {e2e['p50_ms']:.1f}ms p95 {e2e['p95_ms']:.1f}ms mean {e2e['mean_ms']:.1f}ms")
+    print(f"Decided by rules: {report['decided_by_rules']:.0f}/{report['queries']}")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<11} calls {stats['calls']:>4}  p50 {stats['p50_ms']:8.1f}ms  p95 {stats['p95_ms']:8.1f}ms")
+    print(f"Accuracy {report['accuracy']:.1%}")
+    for role, stats in report["accuracy_per_role"].items():
+        print(f"  {role:<14} {stats['correct']}/{stats['total']} ({stats['accuracy']:.0%})")
+    for error in report["errors"]:
+        print(f"  miss: {error['text']!r} expected {error['expected']}, got {error['predicted']}")
+    if report.get("peak_rss_mb") is not None:
+        print(f"Peak RSS {report['peak_rss_mb']:.0f}MB")
+
+def main(argv: List[str] = None) -> dict:
+    parser = argparse.ArgumentParser(description="Routing accuracy and latency benchmark")
+    parser.add_argument("--queries", default=QUERIES_PATH, help="labelled queries JSON file")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over the queries")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed passes before measuring")
+    parser.add_argument("--quantize", action="store_true", help="int8 dynamic quantization of the CPU models")
+    parser.add_argument("--onnx", action="store_true", help="ONNX Runtime int8 backend")
+    parser.add_argument("--no-rules", action="store_true", help="route every query with the models")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    set_quantization(args.quantize)
+    set_onnx(args.onnx)
+    queries = load_queries(args.queries)
+    languages = sorted({query["lang"] for query in queries} | {"en"})
+    start = time.perf_counter()
+    router = AgentRouter(default_agents(), supported_language=languages, warm_up=False)
+    router.load_models()
+    if not router.is_ready():
+        raise RuntimeError(f"Router models failed to load: {router.load_error}")
+    report = {"environment": environment(time.perf_counter() - start)}
+    report.update(run_benchmark(router, queries, repeat=args.repeat, warmup=args.warmup, rules=not args.no_rules))
+    report["peak_rss_mb"] = peak_rss_mb()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Report written to {args.json}")
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,10 @@ import asyncio
 from sources.llm_provider import Provider
 from sources.interaction import Interaction
 from sources.agents import Agent, CoderAgent, CasualAgent, FileAgent, PlannerAgent, BrowserAgent, McpAgent
-from sources.browser import Browser, create_driver
+from sources.browser_pool import BrowserPool
+from sources.fetcher import parse_domain_modes
 from sources.utility import pretty_print
+from sources.models import set_quantization, set_onnx
 
 import warnings
 warnings.filterwarnings("ignore")
@@ -22,21 +24,33 @@ async def main():
     stealth_mode = config.getboolean('BROWSER', 'stealth_mode')
     personality_folder = "jarvis" if config.getboolean('MAIN', 'jarvis_personality') else "base"
     languages = config["MAIN"]["languages"].split(' ')
+    set_quantization(config.getboolean('MAIN', 'quantize_models', fallback=False))
+    set_onnx(config.getboolean('MAIN', 'use_onnx', fallback=False))
 
     provider = Provider(provider_name=config["MAIN"]["provider_name"],
                         model=config["MAIN"]["provider_model"],
                         server_address=config["MAIN"]["provider_server_address"],
                         is_local=config.getboolean('MAIN', 'is_local'))
 
-    browser = Browser(
-        create_driver(headless=config.getboolean('BROWSER', 'headless_browser'), stealth_mode=stealth_mode, lang=languages[0]),
-        anticaptcha_manual_install=stealth_mode
+    browser_pool = BrowserPool(
+        size=config.getint('BROWSER', 'pool_size', fallback=1),
+        headless=config.getboolean('BROWSER', 'headless_browser'),
+        stealth_mode=stealth_mode,
+        lang=languages[0],
+        max_navigations=config.getint('BROWSER', 'max_navigations', fallback=50),
+        browser_kwargs={
+            "html_extractor": config.get('BROWSER', 'html_extractor', fallback='auto'),
+            "fetch_mode": config.get('BROWSER', 'fetch_mode', fallback='auto'),
+            "domain_fetch_modes": parse_domain_modes(config.get('BROWSER', 'domain_fetch_modes', fallback=''))
+        }
     )
+    browser_pool.start()
 
     agents = [
         CasualAgent(name=config["MAIN"]["agent_name"],
                     prompt_path=f"prompts/{personality_folder}/casual_agent.txt",
-                    provider=provider, verbose=False),
+                    provider=provider, verbose=False,
+                    semantic_retrieval=config.getboolean('MAIN', 'semantic_retrieval', fallback=False)),
         CoderAgent(name="coder",
                    prompt_path=f"prompts/{personality_folder}/coder_agent.txt",
                    provider=provider, verbose=False),
@@ -45,10 +59,10 @@ async def main():
                   provider=provider, verbose=False),
         BrowserAgent(name="Browser",
                      prompt_path=f"prompts/{personality_folder}/browser_agent.txt",
-                     provider=provider, verbose=False, browser=browser),
+                     provider=provider, verbose=False, browser=browser_pool),
         PlannerAgent(name="Planner",
                      prompt_path=f"prompts/{personality_folder}/planner_agent.txt",
-                     provider=provider, verbose=False, browser=browser),
+                     provider=provider, verbose=False, browser=browser_pool),
         #McpAgent(name="MCP Agent",
         #            prompt_path=f"prompts/{personality_folder}/mcp_agent.txt",
         #            provider=provider, verbose=False), # NOTE under development
@@ -73,6 +87,7 @@ async def main():
     finally:
         if config.getboolean('MAIN', 'save_session'):
             interaction.save_session()
+        browser_pool.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
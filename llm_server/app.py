@@ -1,8 +1,9 @@
 #!/usr/bin python3
 
 import argparse
+import json
 import time
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 
 from sources.llamacpp_handler import LlamacppLLM
 from sources.ollama_handler import OllamaLLM
@@ -10,6 +11,9 @@ from sources.ollama_handler import OllamaLLM
 parser = argparse.ArgumentParser(description='AgenticSeek server script')
 parser.add_argument('--provider', type=str, help='LLM backend library to use. set to [ollama], [vllm] or [llamacpp]', required=True)
 parser.add_argument('--port', type=int, help='port to use', required=True)
+parser.add_argument('--max-concurrent', type=int, default=1, help='number of generations running at the same time')
+parser.add_argument('--max-queue', type=int, default=16, help='number of generations waiting for a slot before requests are refused')
+parser.add_argument('--no-cache', action='store_true', help='disable the persistent response cache')
 args = parser.parse_args()
 
 app = Flask(__name__)
@@ -17,11 +21,13 @@ app = Flask(__name__)
 assert args.provider in ["ollama", "llamacpp"], f"Provider {args.provider} does not exists. see --help for more information"
 
 handler_map = {
-    "ollama": OllamaLLM(),
-    "llamacpp": LlamacppLLM(),
+    "ollama": OllamaLLM,
+    "llamacpp": LlamacppLLM,
 }
 
-generator = handler_map[args.provider]
+generator = handler_map[args.provider](max_concurrent=args.max_concurrent,
+                                       max_queue=args.max_queue,
+                                       use_cache=not args.no_cache)
 
 @app.route('/generate', methods=['POST'])
 def start_generation():
@@ -29,9 +35,47 @@ def start_generation():
         return jsonify({"error": "Generator not initialized"}), 401
     data = request.get_json()
     history = data.get('messages', [])
-    if generator.start(history):
-        return jsonify({"message": "Generation started"}), 202
-    return jsonify({"error": "Generation already in progress"}), 402
+    generation_id = generator.start(history, model=data.get('model'), params=data.get('params'))
+    if generation_id is not None:
+        return jsonify({"message": "Generation started", "id": generation_id}), 202
+    return jsonify({"error": "Generation queue is full"}), 402
+
+@app.route('/stream', methods=['POST'])
+def stream_generation():
+    """
+    Start a generation and stream the tokens back as newline-delimited JSON.
+    Each line is either {"token": ...} or the final {"is_complete": true}.
+    """
+    if generator is None:
+        return jsonify({"error": "Generator not initialized"}), 401
+    data = request.get_json()
+    history = data.get('messages', [])
+    generation_id = generator.start(history, model=data.get('model'), params=data.get('params'))
+    if generation_id is None:
+        return jsonify({"error": "Generation queue is full"}), 402
+
+    def ndjson_tokens():
+        completed = False
+        try:
+            for token in generator.stream_updates(generation_id):
+                yield json.dumps({"token": token}) + "\n"
+            yield json.dumps({"is_complete": True}) + "\n"
+            completed = True
+        finally:
+            # the client went away before the end, no one will read the rest
+            if not completed:
+                generator.cancel(generation_id)
+    response = Response(stream_with_context(ndjson_tokens()), mimetype='application/x-ndjson')
+    response.headers['X-Generation-Id'] = generation_id
+    return response
+
+@app.route('/cancel/<generation_id>', methods=['POST'])
+def cancel_generation(generation_id):
+    if generator is None:
+        return jsonify({"error": "Generator not initialized"}), 401
+    if not generator.cancel(generation_id):
+        return jsonify({"error": f"Unknown generation {generation_id}"}), 404
+    return jsonify({"message": "Generation cancelled"}), 200
 
 @app.route('/setup', methods=['POST'])
 def setup():
@@ -42,6 +86,15 @@ def setup():
     generator.set_model(model)
     return jsonify({"message": "Model set"}), 200
 
+@app.route('/status/<generation_id>')
+def get_generation_status(generation_id):
+    if not generator:
+        return jsonify({"error": "Generator not initialized"}), 405
+    status = generator.get_status(generation_id)
+    if status is None:
+        return jsonify({"error": f"Unknown generation {generation_id}"}), 404
+    return status
+
 @app.route('/get_updated_sentence')
 def get_updated_sentence():
     if not generator:
@@ -50,4 +103,4 @@ def get_updated_sentence():
     return generator.get_status()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', threaded=True, debug=True, port=args.port)
\ No newline at end of file
+    app.run(host='0.0.0.0', threaded=True, debug=True, port=args.port)
@@ -1,36 +1,80 @@
-import os
 import json
+import time
+import hashlib
+import sqlite3
+import threading
 from pathlib import Path
 
 class Cache:
-    def __init__(self, cache_dir='.cache', cache_file='messages.json'):
+    """
+    Persistent cache of generated responses.
+    Entries are keyed by a hash of the model, the full message history and the sampling parameters.
+    The store is a SQLite table indexed on the key, with least recently used and age based eviction.
+    """
+    def __init__(self, cache_dir='.cache', cache_file='messages.db', max_entries: int = 1024, max_age: int = 7 * 24 * 3600):
         self.cache_dir = Path(cache_dir)
         self.cache_file = self.cache_dir / cache_file
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        if not self.cache_file.exists():
-            with open(self.cache_file, 'w') as f:
-                json.dump([], f)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(self.cache_file, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_created ON responses(created)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
 
-        with open(self.cache_file, 'r') as f:
-            self.cache = set(json.load(f))
+    @staticmethod
+    def make_key(model: str, history: list, params: dict = None) -> str:
+        """Hash the model, message history and sampling parameters into a cache key."""
+        payload = json.dumps({"model": model, "messages": history, "params": params or {}},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
-    def add_message_pair(self, user_message: str, assistant_message: str):
-        """Add a user/assistant pair to the cache if not present."""
-        if not any(entry["user"] == user_message for entry in self.cache):
-            self.cache.append({"user": user_message, "assistant": assistant_message})
-            self._save()
+    def get(self, key: str) -> str | None:
+        """Return the cached response for a key, None if absent or expired."""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
 
-    def is_cached(self, user_message: str) -> bool:
-        """Check if a user msg is cached."""
-        return any(entry["user"] == user_message for entry in self.cache)
+    def put(self, key: str, response: str) -> None:
+        """Store a response and evict entries past the age or size limits."""
+        now = time.time()
+        with self.lock:
+            exists = self.conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses (key, response, created, last_access) VALUES (?, ?, ?, ?)",
+                              (key, response, now, now))
+            if exists is None:
+                self.size += 1
+            self._evict(now)
+            self.conn.commit()
 
-    def get_cached_response(self, user_message: str) -> str | None:
-        """Return the assistant response to a user message if cached."""
-        for entry in self.cache:
-            if entry["user"] == user_message:
-                return entry["assistant"]
-        return None
+    def _evict(self, now: float) -> None:
+        self.size -= self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,)).rowcount
+        overflow = self.size - self.max_entries
+        if overflow > 0:
+            self.size -= self.conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            ).rowcount
 
-    def _save(self):
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": self.size, "hits": self.hits, "misses": self.misses}
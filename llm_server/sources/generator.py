@@ -1,27 +1,52 @@
-
 import threading
 import logging
+import time
+import uuid
 from abc import abstractmethod
 from .cache import Cache
 
 class GenerationState:
-    def __init__(self):
+    def __init__(self, generation_id: str = None, model: str = None, params: dict = None):
+        self.id = generation_id or str(uuid.uuid4())
+        # the model and sampling parameters are fixed when the generation is queued,
+        # a later /setup from another client must not change the model
+        self.model = model
+        self.params = params or {}
         self.lock = threading.Lock()
+        self.updated = threading.Condition(self.lock)
         self.last_complete_sentence = ""
         self.current_buffer = ""
         self.is_generating = False
+        self.is_queued = False
+        self.is_cancelled = False
+        self.finished_at = None
     
     def status(self) -> dict:
         return {
+            "id": self.id,
             "sentence": self.current_buffer,
             "is_complete": not self.is_generating,
             "last_complete_sentence": self.last_complete_sentence,
             "is_generating": self.is_generating,
+            "is_queued": self.is_queued,
         }
 
 class GeneratorLLM():
-    def __init__(self):
+    def __init__(self, max_concurrent: int = 1, max_queue: int = 16, retention: int = 600, use_cache: bool = True):
+        """
+        args:
+            max_concurrent: number of generations running at the same time
+            max_queue: number of generations waiting for a free slot before new requests are refused
+            retention: seconds a finished generation status is kept for /status/<id>
+            use_cache: answer repeated requests from the persistent response cache
+        """
         self.model = None
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.retention = retention
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.generations = {}
         self.state = GenerationState()
         self.logger = logging.getLogger(__name__)
         handler = logging.StreamHandler()
@@ -30,33 +55,138 @@ class GeneratorLLM():
         handler.setFormatter(formatter)
         self.logger.addHandler(handler)
         self.logger.setLevel(logging.INFO)
-        cache = Cache()
+        self.cache = Cache() if use_cache else None
     
     def set_model(self, model: str) -> None:
         self.logger.info(f"Model set to {model}")
         self.model = model
-    
-    def start(self, history: list) -> bool:
-        if self.model is None:
+
+    def purge_finished(self) -> None:
+        """Forget the finished generations older than the retention delay."""
+        now = time.time()
+        expired = [gen_id for gen_id, state in self.generations.items()
+                   if state.finished_at is not None and now - state.finished_at > self.retention]
+        for gen_id in expired:
+            del self.generations[gen_id]
+
+    def start(self, history: list, model: str = None, params: dict = None) -> str | None:
+        """
+        Queue a generation.
+        args:
+            history: list of messages
+            model: model of the generation, the model set by set_model if None
+            params: sampling parameters given to the backend
+        returns:
+            the generation id, or None if the queue is full
+        """
+        model = model or self.model
+        if model is None:
             raise Exception("Model not set")
-        with self.state.lock:
-            if self.state.is_generating:
-                return False
-            self.state.is_generating = True
-            self.logger.info("Starting generation")
-            threading.Thread(target=self.generate, args=(history,)).start()
+        with self.lock:
+            self.purge_finished()
+            pending = sum(1 for state in self.generations.values() if state.finished_at is None)
+            if pending >= self.max_concurrent + self.max_queue:
+                self.logger.warning(f"Generation queue is full ({pending} pending)")
+                return None
+            state = GenerationState(model=model, params=params)
+            self.generations[state.id] = state
+            self.state = state
+        cache_key = Cache.make_key(state.model, history, state.params) if self.cache is not None else None
+        cached = self.cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            self.logger.info(f"Generation {state.id} answered from cache")
+            state.current_buffer = cached
+            state.finished_at = time.time()
+            return state.id
+        state.is_generating = True
+        state.is_queued = True
+        self.logger.info(f"Queued generation {state.id}")
+        threading.Thread(target=self.run, args=(history, state, cache_key), daemon=True).start()
+        return state.id
+
+    def run(self, history: list, state: GenerationState, cache_key: str = None) -> None:
+        """Wait for a free slot then run the generation."""
+        try:
+            with self.slots:
+                with state.lock:
+                    state.is_queued = False
+                if state.is_cancelled:
+                    return
+                self.logger.info(f"Starting generation {state.id}")
+                self.generate(history, state)
+            if cache_key is not None and state.current_buffer and not state.is_cancelled:
+                self.cache.put(cache_key, state.current_buffer)
+        except Exception as e:
+            self.logger.error(f"Generation {state.id} failed: {e}")
+        finally:
+            with state.lock:
+                state.is_generating = False
+                state.is_queued = False
+                state.finished_at = time.time()
+                state.updated.notify_all()
+
+    def cancel(self, generation_id: str) -> bool:
+        """
+        Request a generation to stop, handlers check the flag between two tokens.
+        returns:
+            False if the generation is unknown
+        """
+        state = self.get_generation(generation_id)
+        if state is None:
+            return False
+        with state.lock:
+            if state.is_generating:
+                self.logger.info(f"Cancelling generation {generation_id}")
+                state.is_cancelled = True
         return True
+
+    def get_generation(self, generation_id: str = None) -> GenerationState | None:
+        """Get a generation state by id, or the most recent one if no id is given."""
+        if generation_id is None:
+            return self.state
+        with self.lock:
+            return self.generations.get(generation_id)
     
-    def get_status(self) -> dict:
-        with self.state.lock:
-            return self.state.status()
+    def get_status(self, generation_id: str = None) -> dict | None:
+        state = self.get_generation(generation_id)
+        if state is None:
+            return None
+        with state.lock:
+            return state.status()
+
+    def stream_updates(self, generation_id: str = None, timeout: float = 0.5):
+        """
+        Yield the text appended to the buffer as soon as the handler produces it.
+        Stop once the generation is complete.
+        args:
+            generation_id: id returned by start, the most recent generation if None
+            timeout: maximum wait between two checks of the generation state
+        """
+        state = self.get_generation(generation_id)
+        if state is None:
+            return
+        sent = 0
+        while True:
+            with state.updated:
+                state.updated.wait_for(
+                    lambda: len(state.current_buffer) > sent or not state.is_generating,
+                    timeout=timeout
+                )
+                buffer = state.current_buffer
+                done = not state.is_generating
+            if len(buffer) > sent:
+                yield buffer[sent:]
+                sent = len(buffer)
+            if done:
+                return
 
     @abstractmethod
-    def generate(self, history: list) -> None:
+    def generate(self, history: list, state: GenerationState) -> None:
         """
-        Generate text using the model.
+        Generate text using the model of the generation.
         args:
             history: list of strings
+            state: the GenerationState to fill with the generated text, holds the model and sampling parameters
         returns:
             None
         """
@@ -64,4 +194,4 @@ class GeneratorLLM():
 
 if __name__ == "__main__":
     generator = GeneratorLLM()
-    generator.get_status()
\ No newline at end of file
+    generator.get_status()
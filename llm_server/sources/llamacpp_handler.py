@@ -1,40 +1,50 @@
-
+import threading
 from .generator import GeneratorLLM
 from llama_cpp import Llama
 from .decorator import timer_decorator
 
 class LlamacppLLM(GeneratorLLM):
 
-    def __init__(self):
+    def __init__(self, **kwargs):
         """
         Handle generation using llama.cpp
         """
-        super().__init__()
+        super().__init__(**kwargs)
         self.llm = None
+        self.llm_model = None # model name of the loaded Llama instance
+        # a Llama instance is not thread safe, queued generations run one at a time on it
+        self.llm_lock = threading.Lock()
     
     @timer_decorator
-    def generate(self, history):
-        if self.llm is None:
-            self.logger.info(f"Loading {self.model}...")
-            self.llm = Llama.from_pretrained(
-                repo_id=self.model,
-                filename="*Q8_0.gguf",
-                n_ctx=4096,
-                verbose=True
-            )
-        self.logger.info(f"Using {self.model} for generation with Llama.cpp")
-        try:
-            with self.state.lock:
-                self.state.is_generating = True
-                self.state.last_complete_sentence = ""
-                self.state.current_buffer = ""
-            output = self.llm.create_chat_completion(
-                  messages = history
-            )
-            with self.state.lock:
-                self.state.current_buffer = output['choices'][0]['message']['content']
-        except Exception as e:
-            self.logger.error(f"Error: {e}")
-        finally:
-            with self.state.lock:
-                self.state.is_generating = False
\ No newline at end of file
+    def generate(self, history, state):
+        with self.llm_lock:
+            if self.llm is None or self.llm_model != state.model:
+                self.logger.info(f"Loading {state.model}...")
+                self.llm = None # free the previous model before loading the next one
+                self.llm = Llama.from_pretrained(
+                    repo_id=state.model,
+                    filename="*Q8_0.gguf",
+                    n_ctx=4096,
+                    verbose=True
+                )
+                self.llm_model = state.model
+            self.logger.info(f"Using {state.model} for generation with Llama.cpp")
+            try:
+                stream = self.llm.create_chat_completion(
+                      messages = history,
+                      stream = True,
+                      **state.params
+                )
+                for chunk in stream:
+                    if state.is_cancelled:
+                        self.logger.info(f"Generation {state.id} cancelled")
+                        break
+                    content = chunk['choices'][0]['delta'].get('content', '')
+                    if not content:
+                        continue
+                    with state.lock:
+                        state.current_buffer += content
+                        state.updated.notify_all()
+            except Exception as e:
+                self.logger.error(f"Error: {e}")
+                raise e
@@ -42,7 +42,7 @@ setup(
         "markdownify>=1.1.0",
         "text2emotion>=0.0.5",
         "python-dotenv>=1.0.0",
-        "adaptive-classifier>=0.0.10",
+        "adaptive-classifier==0.3.1",
         "langid>=1.1.6",
         "chromedriver-autoinstaller>=0.6.4",
         "httpx>=0.27,<0.29",
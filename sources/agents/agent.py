@@ -48,7 +48,9 @@ class Agent():
         self.status_message = "Haven't started yet"
         self.stop = False
         self.verbose = verbose
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.executor = ThreadPoolExecutor(max_workers=1) # speaks the wait messages without blocking the event loop
+        self.llm_task = None
+        self.llm_loop = None
     
     @property
     def get_agent_name(self) -> str:
@@ -122,10 +124,13 @@ class Agent():
     
     def request_stop(self) -> None:
         """
-        Request the agent to stop.
+        Request the agent to stop and cancel the in-flight LLM request if any.
         """
         self.stop = True
         self.status_message = "Stopped"
+        task, loop = self.llm_task, self.llm_loop
+        if task is not None and not task.done():
+            loop.call_soon_threadsafe(task.cancel)
     
     @abstractmethod
     def process(self, prompt, speech_module) -> str:
@@ -160,20 +165,34 @@ class Agent():
     async def llm_request(self) -> Tuple[str, str]:
         """
         Asynchronously ask the LLM to process the prompt.
+        The request can be cancelled with request_stop while the LLM is generating.
         """
         self.status_message = "Thinking..."
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, self.sync_llm_request)
+        self.llm_loop = asyncio.get_running_loop()
+        self.llm_task = asyncio.ensure_future(self.generate_answer())
+        try:
+            thought = await self.llm_task
+        except asyncio.CancelledError:
+            if not self.stop:
+                raise
+            pretty_print("LLM request cancelled.", color="warning")
+            thought = "Operation interrupted by user. REQUEST_EXIT"
+        finally:
+            self.llm_task = None
+        return self.handle_llm_answer(thought)
     
-    def sync_llm_request(self) -> Tuple[str, str]:
+    async def generate_answer(self) -> str:
         """
-        Ask the LLM to process the prompt and return the answer and the reasoning.
+        Build the context then generate the answer.
+        The context is built on a worker thread, token counting and retrieval embeddings would block the event loop.
+        """
+        memory = await self.llm_loop.run_in_executor(None, self.memory.get)
+        return await self.llm.respond_async(memory, self.verbose)
+
+    def handle_llm_answer(self, thought: str) -> Tuple[str, str]:
+        """
+        Split the reasoning from the answer and push the answer to memory.
         """
-        print("AGENT DEBUG: Starting LLM request")
-        memory = self.memory.get()
-        print(f"AGENT DEBUG: Memory retrieved with {len(memory)} items")
-        
-        thought = self.llm.respond(memory, self.verbose)
         print(f"AGENT DEBUG: Received thought from LLM: '{thought}'")
         
         reasoning = self.extract_reasoning_text(thought)
@@ -9,6 +9,7 @@ from sources.utility import pretty_print, animate_thinking
 from sources.agents.agent import Agent
 from sources.tools.searxSearch import searxSearch
 from sources.browser import Browser
+from sources.browser_pool import BrowserPool
 from sources.logger import Logger
 from sources.memory import Memory
 
@@ -23,6 +24,7 @@ class BrowserAgent(Agent):
     def __init__(self, name, prompt_path, provider, verbose=False, browser=None):
         """
         The Browser agent is an agent that navigate the web autonomously in search of answer
+        browser: a Browser, or a BrowserPool to lease a browser from for each task
         """
         super().__init__(name, prompt_path, provider, verbose, browser)
         self.tools = {
@@ -30,12 +32,15 @@ class BrowserAgent(Agent):
         }
         self.role = "web"
         self.type = "browser_agent"
-        self.browser = browser
+        self.browser_pool = browser if isinstance(browser, BrowserPool) else None
+        self.browser = None if self.browser_pool else browser
+        self.lease_timeout = 300
         self.current_page = ""
         self.search_history = []
         self.navigable_links = []
         self.last_action = Action.NAVIGATE.value
         self.notes = []
+        self.prefetch_count = 4 # search results fetched in the background while the llm decides
         self.date = self.get_today_date()
         self.logger = Logger("browser_agent.log")
         self.memory = Memory(self.load_prompt(prompt_path),
@@ -248,12 +253,19 @@ class BrowserAgent(Agent):
         self.logger.warning("No suitable link selected.")
         return None
     
-    def get_page_text(self, limit_to_model_ctx = False) -> str:
-        """Get the text content of the current page."""
+    def get_page_text(self, limit_to_model_ctx = False, user_prompt: str = None) -> str:
+        """
+        Get the text content of the current page.
+        When limited to the model context, the parts of the page most relevant to the user prompt and notes are kept.
+        """
         page_text = self.browser.get_text()
         if limit_to_model_ctx:
             #page_text = self.memory.compress_text_to_max_ctx(page_text)
-            page_text = self.memory.trim_text_to_max_ctx(page_text)
+            if user_prompt is None:
+                page_text = self.memory.trim_text_to_max_ctx(page_text)
+            else:
+                query = '\n'.join([user_prompt] + self.notes)
+                page_text = self.memory.select_text_to_max_ctx(page_text, query)
         return page_text
     
     def conclude_prompt(self, user_query: str) -> str:
@@ -329,6 +341,25 @@ class BrowserAgent(Agent):
         return prompt
     
     async def process(self, user_prompt: str, speech_module: type) -> Tuple[str, str]:
+        """
+        Process the user prompt, with a browser leased from the pool for the whole task when the agent has a pool.
+        Args:
+          user_prompt: The user's input query
+          speech_module: Optional speech output module
+        Returns:
+            tuple containing the final answer and reasoning
+        """
+        if self.browser_pool is None:
+            return await self.browse(user_prompt, speech_module)
+        self.status_message = "Waiting for a browser..."
+        self.browser = await asyncio.to_thread(self.browser_pool.lease, self.lease_timeout)
+        try:
+            return await self.browse(user_prompt, speech_module)
+        finally:
+            self.browser_pool.release(self.browser)
+            self.browser = None
+
+    async def browse(self, user_prompt: str, speech_module: type) -> Tuple[str, str]:
         """
         Process the user prompt to conduct an autonomous web search.
         Start with a google search with searxng using web_search tool.
@@ -357,6 +388,7 @@ class BrowserAgent(Agent):
         while not complete and len(unvisited) > 0 and not self.stop:
             self.memory.clear()
             unvisited = self.select_unvisited(search_result)
+            self.browser.prefetch([res["link"] for res in unvisited[:self.prefetch_count]])
             answer, reasoning = await self.llm_decide(prompt, show_reasoning = False)
             if self.stop:
                 pretty_print(f"Requested stop.", color="failure")
@@ -372,13 +404,13 @@ class BrowserAgent(Agent):
                 self.status_message = "Filling web form..."
                 pretty_print(f"Filling inputs form...", color="status")
                 fill_success = self.browser.fill_form(extracted_form)
-                page_text = self.get_page_text(limit_to_model_ctx=True)
+                page_text = self.get_page_text(limit_to_model_ctx=True, user_prompt=user_prompt)
                 answer = self.handle_update_prompt(user_prompt, page_text, fill_success)
                 answer, reasoning = await self.llm_decide(prompt)
 
             if Action.FORM_FILLED.value in answer:
                 pretty_print(f"Filled form. Handling page update.", color="status")
-                page_text = self.get_page_text(limit_to_model_ctx=True)
+                page_text = self.get_page_text(limit_to_model_ctx=True, user_prompt=user_prompt)
                 self.navigable_links = self.browser.get_navigable()
                 prompt = self.make_navigation_prompt(user_prompt, page_text)
                 continue
@@ -417,7 +449,7 @@ class BrowserAgent(Agent):
                 prompt = self.make_newsearch_prompt(user_prompt, unvisited)
                 continue
             self.current_page = link
-            page_text = self.get_page_text(limit_to_model_ctx=True)
+            page_text = self.get_page_text(limit_to_model_ctx=True, user_prompt=user_prompt)
             self.navigable_links = self.browser.get_navigable()
             prompt = self.make_navigation_prompt(user_prompt, page_text)
             self.status_message = "Navigating..."
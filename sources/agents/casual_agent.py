@@ -9,9 +9,11 @@ from sources.tools.BashInterpreter import BashInterpreter
 from sources.memory import Memory
 
 class CasualAgent(Agent):
-    def __init__(self, name, prompt_path, provider, verbose=False):
+    def __init__(self, name, prompt_path, provider, verbose=False, semantic_retrieval=False):
         """
         The casual agent is a special for casual talk to the user without specific tasks.
+        semantic_retrieval: send the recent messages and the older ones relevant to the query,
+                            downloads the sentence embedding model on first use
         """
         super().__init__(name, prompt_path, provider, verbose, None)
         self.tools = {
@@ -21,7 +23,8 @@ class CasualAgent(Agent):
         self.memory = Memory(self.load_prompt(prompt_path),
                                 recover_last_session=False, # session recovery in handled by the interaction class
                                 memory_compression=False,
-                                model_provider=provider.get_model_name())
+                                model_provider=provider.get_model_name(),
+                                semantic_retrieval=semantic_retrieval)
     
     async def process(self, prompt, speech_module) -> str:
         self.memory.push('user', prompt)
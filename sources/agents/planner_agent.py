@@ -36,6 +36,14 @@ class PlannerAgent(Agent):
                                 model_provider=provider.get_model_name())
         self.logger = Logger("planner_agent.log")
     
+    def request_stop(self) -> None:
+        """
+        Request the planner and its agents to stop.
+        """
+        super().request_stop()
+        for agent in self.agents.values():
+            agent.request_stop()
+
     def get_task_names(self, text: str) -> List[str]:
         """
         Extracts task names from the given text.
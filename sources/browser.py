@@ -7,7 +7,6 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.action_chains import ActionChains
 from typing import List, Tuple, Type, Dict
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 from fake_useragent import UserAgent
 from selenium_stealth import stealth
@@ -21,7 +20,6 @@ import os
 import shutil
 import uuid
 import tempfile
-import markdownify
 import sys
 import re
 
@@ -32,6 +30,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sources.utility import pretty_print, animate_thinking
 from sources.logger import Logger
+from sources.extractors import get_extractor, is_sentence
+from sources.fetcher import StaticFetcher
+from sources.prefetcher import Prefetcher
 
 
 def get_chrome_path() -> str:
@@ -122,14 +123,20 @@ def create_undetected_chromedriver(service, chrome_options) -> webdriver.Chrome:
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})") 
     return driver
 
-def create_driver(headless=False, stealth_mode=True, crx_path="./crx/nopecha.crx", lang="en") -> webdriver.Chrome:
-    """Create a Chrome WebDriver with specified options."""
+def create_driver(headless=False, stealth_mode=True, crx_path="./crx/nopecha.crx", lang="en", profile_dir=None) -> webdriver.Chrome:
+    """
+    Create a Chrome WebDriver with specified options.
+    profile_dir: Chrome user data directory, a new temporary one if None
+    """
     # Create options with minimal settings for macOS
     options = Options()
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
-    options.add_argument(f"--user-data-dir={tempfile.mkdtemp(prefix='chrome_profile_')}")
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    options.add_argument(f"--user-data-dir={profile_dir or tempfile.mkdtemp(prefix='chrome_profile_')}")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option('useAutomationExtension', False)
@@ -160,32 +167,104 @@ def create_driver(headless=False, stealth_mode=True, crx_path="./crx/nopecha.crx
             raise e
 
 class Browser:
-    def __init__(self, driver, anticaptcha_manual_install=False):
-        """Initialize the browser with optional AntiCaptcha installation."""
+    def __init__(self, driver, anticaptcha_manual_install=False, html_extractor="auto",
+                 fetch_mode="auto", domain_fetch_modes=None, screenshot_folder=None):
+        """
+        Initialize the browser with optional AntiCaptcha installation.
+        html_extractor: page text extractor, "lxml", "markdownify" or "auto" (lxml if installed)
+        fetch_mode: "auto" load static pages with a plain HTTP GET and the others in Chrome,
+                    "static" use the HTTP GET whenever it succeeds, "browser" always load pages in Chrome
+        domain_fetch_modes: fetch mode per domain, overriding fetch_mode
+        screenshot_folder: folder of the screenshots, .screenshots in the working directory by default
+        """
         self.js_scripts_folder = "./sources/web_scripts/" if not __name__ == "__main__" else "./web_scripts/"
         self.anticaptcha = "https://chrome.google.com/webstore/detail/nopecha-captcha-solver/dknlfmjaanfblgfdfebhijalfmhmjjjo/related"
         self.logger = Logger("browser.log")
-        self.screenshot_folder = os.path.join(os.getcwd(), ".screenshots")
+        self.screenshot_folder = screenshot_folder or os.path.join(os.getcwd(), ".screenshots")
         self.tabs = []
+        self.js_cache = {}
+        self.extractor = get_extractor(html_extractor)
+        self.max_text_chars = 32768
+        # DOM snapshot of the current page, reset by every action that can change the page
+        self.snapshot = None
+        # url of the current page when it was fetched without Chrome, None when Chrome shows it
+        self.static_url = None
+        self.min_static_chars = 500
+        # pages loaded in Chrome, Chrome memory grows with them
+        self.navigations = 0
+        # origins loaded in Chrome, their site storage is cleared with the session
+        self.visited_origins = set()
         try:
             self.driver = driver
             self.wait = WebDriverWait(self.driver, 10)
         except Exception as e:
             raise Exception(f"Failed to initialize browser: {str(e)}")
+        self.fetcher = StaticFetcher(fetch_mode, domain_fetch_modes, user_agent=self.get_user_agent())
+        self.prefetcher = Prefetcher(self.load_static)
         self.setup_tabs()
         self.patch_browser_fingerprint()
         if anticaptcha_manual_install:
             self.load_anticatpcha_manually()
+
+    def get_user_agent(self) -> str | None:
+        """User agent of the driver, so static fetches look like the browser."""
+        try:
+            user_agent = self.driver.execute_script("return navigator.userAgent;")
+        except Exception as e:
+            self.logger.warning(f"Could not read the browser user agent: {str(e)}")
+            return None
+        return user_agent if isinstance(user_agent, str) else None
     
     def setup_tabs(self):
         self.tabs = self.driver.window_handles
         try:
             self.driver.get("https://www.google.com")
+            self.remember_origin("https://www.google.com")
         except Exception as e:
             self.logger.log(f"Failed to setup initial tab:" + str(e))
             pass
         self.screenshot()
     
+    def is_alive(self) -> bool:
+        """Check the Chrome driver still answers."""
+        try:
+            self.driver.window_handles
+            return True
+        except Exception as e:
+            self.logger.warning(f"Browser is not responding: {str(e)}")
+            return False
+
+    def remember_origin(self, url: str) -> None:
+        """Record the origin of a page loaded in Chrome, so reset_session clears its storage."""
+        if not isinstance(url, str):
+            return
+        parsed = urlparse(url)
+        if parsed.scheme in ("http", "https") and parsed.netloc:
+            self.visited_origins.add(f"{parsed.scheme}://{parsed.netloc}")
+
+    def reset_session(self) -> None:
+        """Forget the browsing session: cookies, site storage of the visited origins, cache and the current page."""
+        self.prefetcher.clear()
+        self.fetcher.session.cookies.clear()
+        self.invalidate_snapshot()
+        self.static_url = None
+        self.remember_origin(self.driver.current_url)
+        self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        for origin in sorted(self.visited_origins):
+            self.driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        self.visited_origins.clear()
+        self.driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        self.driver.get("about:blank")
+
+    def close(self) -> None:
+        """Stop the background fetches and quit Chrome."""
+        self.prefetcher.close()
+        self.fetcher.close()
+        try:
+            self.driver.quit()
+        except Exception as e:
+            self.logger.warning(f"Error closing the browser: {str(e)}")
+
     def switch_control_tab(self):
         self.logger.log("Switching to control tab.")
         self.driver.switch_to.window(self.tabs[0])
@@ -220,11 +299,79 @@ class Browser:
         self.driver.execute_script(script)
     
     def go_to(self, url:str) -> bool:
-        """Navigate to a specified URL."""
+        """
+        Navigate to a specified URL.
+        Static pages are fetched with a plain HTTP GET, Chrome loads the pages that need javascript.
+        """
+        self.invalidate_snapshot()
+        self.static_url = None
+        if self.fetcher.mode_for(url) != "browser" and self.go_to_static(url):
+            return True
+        return self.go_to_rendered(url)
+
+    def go_to_static(self, url: str) -> bool:
+        """
+        Load a page without Chrome.
+        Returns:
+            bool: True if the static page is usable, False if Chrome should load it
+        """
+        start = time.time()
+        # wait for a pending prefetch, fetching the url again would only race the same request
+        prefetched, snapshot = self.prefetcher.take(url)
+        if not prefetched:
+            snapshot = self.load_static(url)
+        if snapshot is None:
+            return False
+        self.snapshot = snapshot
+        self.static_url = snapshot["url"]
+        self.logger.log(f"Fetched static page: {url} in {time.time() - start:.2f}s{' (prefetched)' if prefetched else ''}")
+        return True
+
+    def load_static(self, url: str) -> dict | None:
+        """
+        Fetch a page without Chrome and extract its text, safe to run on the prefetch threads.
+        Returns:
+            dict | None: the page snapshot with its extracted text lines, None if Chrome should load the page
+        """
+        page = self.fetcher.fetch(url)
+        if page is None:
+            return None
+        snapshot = page.snapshot()
+        snapshot["lines"] = self.extractor.extract(snapshot["html"], self.max_text_chars)
+        if self.fetcher.mode_for(url) == "auto":
+            text_chars = sum(len(line) for line in snapshot["lines"])
+            if text_chars < self.min_static_chars:
+                self.logger.info(f"Static page {url} has too little text ({text_chars} chars), loading it in Chrome.")
+                return None
+        return snapshot
+
+    def prefetch(self, urls: List[str]) -> int:
+        """
+        Start fetching pages the agent may navigate to next, go_to then use the prefetched page.
+        Returns:
+            int: number of pages being fetched
+        """
+        urls = [url for url in urls if url and url != self.get_current_url() and self.fetcher.mode_for(url) != "browser"]
+        return self.prefetcher.prefetch(urls)
+
+    def ensure_rendered(self) -> bool:
+        """Load the current page in Chrome if it was fetched statically, before interacting with it."""
+        if self.static_url is None:
+            return True
+        url = self.static_url
+        self.static_url = None
+        self.logger.info(f"Loading static page {url} in Chrome for interaction.")
+        return self.go_to_rendered(url)
+
+    def go_to_rendered(self, url: str) -> bool:
+        """Navigate to a specified URL with Chrome."""
         time.sleep(random.uniform(0.4, 2.5))
+        self.invalidate_snapshot()
         try:
             initial_handles = self.driver.window_handles
             self.driver.get(url)
+            self.navigations += 1
+            self.remember_origin(url)
             time.sleep(random.uniform(0.01, 0.3))
             try:
                 wait = WebDriverWait(self.driver, timeout=10)
@@ -237,8 +384,10 @@ class Browser:
             except TimeoutException:
                 self.logger.warning("Timeout while waiting for page to bypass 'checking your browser'")
             self.apply_web_safety()
+            self.remember_origin(self.driver.current_url)
             time.sleep(random.uniform(0.01, 0.2))
             self.human_scroll()
+            self.invalidate_snapshot()
             self.logger.log(f"Navigated to: {url}")
             return True
         except TimeoutException as e:
@@ -253,42 +402,45 @@ class Browser:
 
     def is_sentence(self, text:str) -> bool:
         """Check if the text qualifies as a meaningful sentence or contains important error codes."""
-        text = text.strip()
+        return is_sentence(text)
 
-        if any(c.isdigit() for c in text):
-            return True
-        words = re.findall(r'\w+', text, re.UNICODE)
-        word_count = len(words)
-        has_punctuation = any(text.endswith(p) for p in ['.', '，', ',', '!', '?', '。', '！', '？', '।', '۔'])
-        is_long_enough = word_count > 4
-        return (word_count >= 5 and (has_punctuation or is_long_enough))
+    def invalidate_snapshot(self) -> None:
+        self.snapshot = None
+
+    def get_snapshot(self) -> dict | None:
+        """
+        Get the snapshot of the current page: cleaned html, links, form inputs and buttons.
+        It is taken by a single injected script and cached until the page changes.
+        Returns:
+            dict: {"url", "title", "html", "links", "inputs", "buttons"}, None if the script failed
+        """
+        if self.snapshot is not None:
+            return self.snapshot
+        try:
+            snapshot = self.driver.execute_script(self.load_js("page_snapshot.js"))
+        except Exception as e:
+            self.logger.error(f"Error taking page snapshot: {str(e)}")
+            return None
+        if not isinstance(snapshot, dict):
+            self.logger.error("Page snapshot script returned no result.")
+            return None
+        self.logger.info(f"Page snapshot of {snapshot.get('url')}: {len(snapshot.get('links', []))} links, "
+                         f"{len(snapshot.get('inputs', []))} inputs, {len(snapshot.get('buttons', []))} buttons")
+        self.snapshot = snapshot
+        return snapshot
 
     def get_text(self) -> str | None:
         """Get page text as formatted Markdown"""
         try:
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            for element in soup(['script', 'style', 'noscript', 'meta', 'link']):
-                element.decompose()
-            markdown_converter = markdownify.MarkdownConverter(
-                heading_style="ATX",
-                strip=['a'],
-                autolinks=False,
-                bullets='•',
-                strong_em_symbol='*',
-                default_title=False,
-            )
-            markdown_text = markdown_converter.convert(str(soup.body))
-            lines = []
-            for line in markdown_text.splitlines():
-                stripped = line.strip()
-                if stripped and self.is_sentence(stripped):
-                    cleaned = ' '.join(stripped.split())
-                    lines.append(cleaned)
+            snapshot = self.get_snapshot()
+            if snapshot is None:
+                return None
+            # static pages are extracted when fetched
+            lines = snapshot.get("lines") or self.extractor.extract(snapshot["html"], self.max_text_chars)
             result = "[Start of page]\n\n" + "\n\n".join(lines) + "\n\n[End of page]"
-            result = re.sub(r'!\[(.*?)\]\(.*?\)', r'[IMAGE: \1]', result)
             self.logger.info(f"Extracted text: {result[:100]}...")
             self.logger.info(f"Extracted text length: {len(result)}")
-            return result[:32768]
+            return result[:self.max_text_chars]
         except Exception as e:
             self.logger.error(f"Error getting text: {str(e)}")
             return None
@@ -331,32 +483,26 @@ class Browser:
     def get_navigable(self) -> List[str]:
         """Get all navigable links on the current page."""
         try:
-            links = []
-            elements = self.driver.find_elements(By.TAG_NAME, "a")
-            
-            for element in elements:
-                href = element.get_attribute("href")
-                if href and href.startswith(("http", "https")):
-                    links.append({
-                        "url": href,
-                        "text": element.text.strip(),
-                        "is_displayed": element.is_displayed()
-                    })
-            
+            snapshot = self.get_snapshot()
+            if snapshot is None:
+                return []
+            links = [link for link in snapshot["links"] if link["url"] and link["url"].startswith(("http", "https"))]
             self.logger.info(f"Found {len(links)} navigable links")
-            return [self.clean_url(link['url']) for link in links if (link['is_displayed'] == True and self.is_link_valid(link['url']))]
+            return [self.clean_url(link['url']) for link in links if (link['displayed'] == True and self.is_link_valid(link['url']))]
         except Exception as e:
             self.logger.error(f"Error getting navigable links: {str(e)}")
             return []
 
     def click_element(self, xpath: str) -> bool:
         """Click an element specified by XPath."""
+        self.ensure_rendered()
         try:
             element = self.wait.until(EC.element_to_be_clickable((By.XPATH, xpath)))
             if not element.is_displayed():
                 return False
             if not element.is_enabled():
                 return False
+            self.invalidate_snapshot()
             try:
                 self.logger.error(f"Scrolling to element for click_element.")
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", element)
@@ -376,11 +522,14 @@ class Browser:
         
     def load_js(self, file_name: str) -> str:
         """Load javascript from script folder to inject to page."""
+        if file_name in self.js_cache:
+            return self.js_cache[file_name]
         path = os.path.join(self.js_scripts_folder, file_name)
         self.logger.info(f"Loading js at {path}")
         try:
             with open(path, 'r') as f:
-                return f.read()
+                self.js_cache[file_name] = f.read()
+                return self.js_cache[file_name]
         except FileNotFoundError as e:
             raise Exception(f"Could not find: {path}") from e
         except Exception as e:
@@ -403,7 +552,8 @@ class Browser:
     def get_form_inputs(self) -> List[str]:
         """Extract all input from the page and return them."""
         try:
-            input_elements = self.find_all_inputs()
+            snapshot = self.get_snapshot()
+            input_elements = snapshot["inputs"] if snapshot is not None else []
             if not input_elements:
                 self.logger.info("No input element on page.")
                 return ["No input forms found on the page."]
@@ -415,10 +565,7 @@ class Browser:
                     continue
                 input_name = element.get("text") or element.get("id") or input_type
                 if input_type == "checkbox" or input_type == "radio":
-                    try:
-                        checked_status = "checked" if element.is_selected() else "unchecked"
-                    except Exception as e:
-                        continue
+                    checked_status = "checked" if element.get("checked") else "unchecked"
                     form_strings.append(f"[{input_name}]({checked_status})")
                 else:
                     form_strings.append(f"[{input_name}]("")")
@@ -431,15 +578,14 @@ class Browser:
         """
         Find buttons and return their type and xpath.
         """
-        buttons = self.driver.find_elements(By.TAG_NAME, "button") + \
-                  self.driver.find_elements(By.XPATH, "//input[@type='submit']")
+        snapshot = self.get_snapshot()
+        buttons = snapshot["buttons"] if snapshot is not None else []
         result = []
-        for i, button in enumerate(buttons):
-            if not button.is_displayed() or not button.is_enabled():
+        for button in buttons:
+            if not button["displayed"] or not button["enabled"]:
                 continue
-            text = (button.text or button.get_attribute("value") or "").lower().replace(' ', '')
-            xpath = f"(//button | //input[@type='submit'])[{i + 1}]"
-            result.append((text, xpath))
+            text = (button["text"] or button["value"] or "").lower().replace(' ', '')
+            result.append((text, button["xpath"]))
         result.sort(key=lambda x: len(x[0]))
         return result
 
@@ -495,6 +641,8 @@ class Browser:
         Find and tick all checkboxes on the page.
         Returns True if successful, False if any issues occur.
         """
+        self.ensure_rendered()
+        self.invalidate_snapshot()
         try:
             checkboxes = self.driver.find_elements(By.XPATH, "//input[@type='checkbox']")
             if not checkboxes:
@@ -551,7 +699,9 @@ class Browser:
         if not isinstance(input_list, list):
             self.logger.error("input_list must be a list")
             return False
+        self.ensure_rendered()
         inputs = self.find_all_inputs()
+        self.invalidate_snapshot()
         try:
             for input_str in input_list:
                 match = re.match(r'\[(.*?)\]\((.*?)\)', input_str)
@@ -615,16 +765,22 @@ class Browser:
 
     def get_current_url(self) -> str:
         """Get the current URL of the page."""
+        if self.static_url is not None:
+            return self.static_url
         return self.driver.current_url
 
     def get_page_title(self) -> str:
         """Get the title of the current page."""
+        if self.static_url is not None and self.snapshot is not None:
+            return self.snapshot["title"]
         return self.driver.title
 
     def scroll_bottom(self) -> bool:
         """Scroll to the bottom of the page."""
         try:
             self.logger.info("Scrolling to the bottom of the page...")
+            self.ensure_rendered()
+            self.invalidate_snapshot()
             self.driver.execute_script(
                 "window.scrollTo(0, document.body.scrollHeight);"
             )
@@ -635,10 +791,13 @@ class Browser:
             return False
     
     def get_screenshot(self) -> str:
-        return self.screenshot_folder + "/updated_screen.png"
+        return os.path.join(self.screenshot_folder, "updated_screen.png")
 
     def screenshot(self, filename:str = 'updated_screen.png') -> bool:
         """Take a screenshot of the current page, attempt to capture the full page by zooming out."""
+        if self.static_url is not None:
+            self.logger.info(f"No screenshot of static page {self.static_url}, Chrome did not load it.")
+            return False
         self.logger.info("Taking full page screenshot...")
         time.sleep(0.1)
         try:
@@ -0,0 +1,178 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+from sources.browser import Browser, create_driver
+from sources.logger import Logger
+
+class BrowserPool:
+    """
+    Pool of Chrome browsers leased to the agents, so web tasks can run concurrently.
+    Each browser runs on its own Chrome profile and screenshot folder, its cookies and site storage are cleared between leases,
+    and it is replaced after max_navigations page loads to cap the Chrome memory growth.
+    Browsers are created on demand, up to size.
+    """
+    def __init__(self, size: int = 1, headless: bool = False, stealth_mode: bool = False, lang: str = "en",
+                 max_navigations: int = 50, browser_kwargs: dict = None,
+                 driver_factory: Callable[[str], object] = None):
+        """
+        Args:
+            size: maximum number of browsers
+            headless: run Chrome without a window, for servers and CI
+            stealth_mode: load the anticaptcha extension manually
+            lang: browser language
+            max_navigations: Chrome page loads before a browser is replaced
+            browser_kwargs: extra arguments of Browser (html_extractor, fetch_mode, domain_fetch_modes)
+            driver_factory: create a driver for a Chrome profile directory, create_driver by default
+        """
+        if size < 1:
+            raise ValueError("Browser pool size must be at least 1")
+        self.size = size
+        self.headless = headless
+        self.stealth_mode = stealth_mode
+        self.lang = lang
+        self.max_navigations = max_navigations
+        self.browser_kwargs = browser_kwargs or {}
+        self.driver_factory = driver_factory or self.create_driver
+        self.logger = Logger("browser_pool.log")
+        self.condition = threading.Condition()
+        self.idle: List[Browser] = []
+        self.leased: List[Browser] = []
+        self.profiles: Dict[int, str] = {} # id(browser) -> Chrome profile directory
+        self.screenshot_root = os.path.join(os.getcwd(), ".screenshots")
+        self.live = 0 # browsers idle, leased or being created
+        self.closed = False
+        self.stats = {"leases": 0, "created": 0, "recycled": 0, "unhealthy": 0}
+
+    def create_driver(self, profile_dir: str):
+        return create_driver(headless=self.headless, stealth_mode=self.stealth_mode, lang=self.lang, profile_dir=profile_dir)
+
+    def new_browser(self) -> Browser:
+        """Start Chrome on a new profile. The caller must have reserved its slot in live."""
+        profile_dir = tempfile.mkdtemp(prefix='chrome_profile_')
+        screenshot_folder = os.path.join(self.screenshot_root, os.path.basename(profile_dir))
+        try:
+            browser = Browser(self.driver_factory(profile_dir), anticaptcha_manual_install=self.stealth_mode,
+                              screenshot_folder=screenshot_folder, **self.browser_kwargs)
+        except Exception:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            with self.condition:
+                self.live -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.profiles[id(browser)] = profile_dir
+            self.stats["created"] += 1
+        self.logger.info(f"Browser created ({self.live}/{self.size}).")
+        return browser
+
+    def retire(self, browser: Browser) -> None:
+        """Quit a browser and delete its profile and screenshots, its slot stays reserved."""
+        browser.close()
+        with self.condition:
+            profile_dir = self.profiles.pop(id(browser), "")
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        shutil.rmtree(browser.screenshot_folder, ignore_errors=True)
+
+    def destroy(self, browser: Browser) -> None:
+        """Quit a browser and free its slot."""
+        self.retire(browser)
+        with self.condition:
+            self.live -= 1
+            self.condition.notify()
+
+    def needs_recycling(self, browser: Browser) -> bool:
+        if not browser.is_alive():
+            with self.condition:
+                self.stats["unhealthy"] += 1
+            return True
+        return browser.navigations >= self.max_navigations
+
+    def start(self, count: int = 1) -> None:
+        """Create browsers ahead of the first leases, so Chrome startup errors show early."""
+        for _ in range(min(count, self.size)):
+            with self.condition:
+                if self.live >= self.size:
+                    return
+                self.live += 1
+            browser = self.new_browser()
+            with self.condition:
+                self.idle.append(browser)
+                self.condition.notify()
+
+    def lease(self, timeout: float | None = None) -> Browser:
+        """
+        Take a browser from the pool, waiting for one to be returned when they are all leased.
+        Raises:
+            TimeoutError: no browser was available within timeout seconds
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("Browser pool is closed")
+                if self.idle:
+                    browser = self.idle.pop()
+                    break
+                if self.live < self.size:
+                    self.live += 1
+                    browser = None
+                    break
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No browser available after {timeout}s, all {self.size} are leased")
+                self.condition.wait(remaining)
+        if browser is not None and self.needs_recycling(browser):
+            self.logger.info(f"Recycling browser after {browser.navigations} navigations.")
+            with self.condition:
+                self.stats["recycled"] += 1
+            self.retire(browser)
+            browser = None
+        if browser is None:
+            browser = self.new_browser()
+        with self.condition:
+            self.leased.append(browser)
+            self.stats["leases"] += 1
+        return browser
+
+    def release(self, browser: Browser) -> None:
+        """Return a leased browser, its session is cleared for the next lease."""
+        with self.condition:
+            self.leased.remove(browser)
+        try:
+            if self.closed or not browser.is_alive():
+                raise RuntimeError("browser not reusable")
+            browser.reset_session()
+        except Exception as e:
+            self.logger.warning(f"Discarding browser on release: {str(e)}")
+            self.destroy(browser)
+            return
+        with self.condition:
+            self.idle.append(browser)
+            self.condition.notify()
+
+    @contextmanager
+    def browser(self, timeout: float | None = None):
+        """Lease a browser for the duration of a with block."""
+        browser = self.lease(timeout)
+        try:
+            yield browser
+        finally:
+            self.release(browser)
+
+    def status(self) -> dict:
+        with self.condition:
+            return {"size": self.size, "live": self.live, "idle": len(self.idle), "leased": len(self.leased), **self.stats}
+
+    def close(self) -> None:
+        """Quit the idle browsers, the leased ones are quit when returned."""
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.condition.notify_all()
+        for browser in idle:
+            self.destroy(browser)
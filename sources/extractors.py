@@ -0,0 +1,212 @@
+import re
+from abc import abstractmethod
+from typing import List
+
+import markdownify
+from bs4 import BeautifulSoup
+
+LXML_FOUND = True
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    LXML_FOUND = False
+
+def is_sentence(text: str) -> bool:
+    """Check if the text qualifies as a meaningful sentence or contains important error codes."""
+    text = text.strip()
+
+    if any(c.isdigit() for c in text):
+        return True
+    words = re.findall(r'\w+', text, re.UNICODE)
+    word_count = len(words)
+    has_punctuation = any(text.endswith(p) for p in ['.', '，', ',', '!', '?', '。', '！', '？', '।', '۔'])
+    is_long_enough = word_count > 4
+    return (word_count >= 5 and (has_punctuation or is_long_enough))
+
+class HtmlExtractor:
+    """
+    Extract the readable text of a web page as markdown lines.
+    """
+    name = "base"
+
+    @abstractmethod
+    def extract(self, html: str, max_chars: int) -> List[str]:
+        """
+        Extract the meaningful lines of a page.
+        Args:
+            html: the page html
+            max_chars: output budget, extraction may stop once the lines reach it
+        Returns:
+            List[str]: markdown lines, whitespace collapsed
+        """
+        pass
+
+class MarkdownifyExtractor(HtmlExtractor):
+    """
+    Convert the whole page body with markdownify over BeautifulSoup html.parser, pure Python.
+    """
+    name = "markdownify"
+
+    def extract(self, html: str, max_chars: int) -> List[str]:
+        soup = BeautifulSoup(html, 'html.parser')
+        for element in soup(['script', 'style', 'noscript', 'meta', 'link']):
+            element.decompose()
+        markdown_converter = markdownify.MarkdownConverter(
+            heading_style="ATX",
+            strip=['a'],
+            autolinks=False,
+            bullets='•',
+            strong_em_symbol='*',
+            default_title=False,
+        )
+        markdown_text = markdown_converter.convert(str(soup.body or soup))
+        lines = []
+        total = 0
+        for line in markdown_text.splitlines():
+            stripped = line.strip()
+            if stripped and is_sentence(stripped):
+                cleaned = ' '.join(stripped.split())
+                cleaned = re.sub(r'!\[(.*?)\]\(.*?\)', r'[IMAGE: \1]', cleaned)
+                lines.append(cleaned)
+                total += len(cleaned) + 2
+                if total >= max_chars:
+                    break
+        return lines
+
+class BudgetReached(Exception):
+    pass
+
+class LxmlExtractor(HtmlExtractor):
+    """
+    Fast extractor over the lxml C parser.
+    Keep the main content of the page (main, article or the densest text block) without navigation and
+    boilerplate, and walk it to markdown lines until the output budget is reached.
+    """
+    name = "lxml"
+    boilerplate_tags = ['script', 'style', 'noscript', 'meta', 'link', 'template', 'svg', 'iframe',
+                        'nav', 'aside', 'footer', 'button', 'select', 'input', 'textarea']
+    block_tags = {'address', 'article', 'aside', 'blockquote', 'body', 'br', 'dd', 'details', 'div', 'dl', 'dt',
+                  'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+                  'hr', 'li', 'main', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'tr', 'ul'}
+    prefixes = {'h1': '# ', 'h2': '## ', 'h3': '### ', 'h4': '#### ', 'h5': '##### ', 'h6': '###### ',
+                'li': '• ', 'blockquote': '> '}
+
+    def __init__(self, min_main_chars: int = 200, min_main_share: float = 0.3):
+        """
+        Args:
+            min_main_chars: minimum text length of a main content candidate
+            min_main_share: minimum share of the page paragraphs text for a dense text block to be the main content
+        """
+        if not LXML_FOUND:
+            raise ImportError("lxml is not installed, run: pip install lxml")
+        self.min_main_chars = min_main_chars
+        self.min_main_share = min_main_share
+
+    def extract(self, html: str, max_chars: int) -> List[str]:
+        if not html or not html.strip():
+            return []
+        try:
+            root = lxml.html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            return []
+        etree.strip_elements(root, etree.Comment, *self.boilerplate_tags, with_tail=False)
+        body = root.find('body')
+        content = self.main_content(body if body is not None else root)
+        lines = []
+        try:
+            self.walk(content, "", [], lines, [0, max_chars])
+        except BudgetReached:
+            pass
+        return lines
+
+    def text_length(self, element) -> int:
+        return len(''.join(element.itertext()).strip())
+
+    def main_content(self, body):
+        """
+        Find the element holding the main content of the page.
+        Use <main>, role=main or the longest <article> when they hold enough text,
+        otherwise the block containing most of the paragraphs text, otherwise the whole body.
+        """
+        for xpath in ['.//main', './/*[@role="main"]', './/article']:
+            candidates = [(self.text_length(element), element) for element in body.xpath(xpath)]
+            if candidates:
+                length, element = max(candidates, key=lambda candidate: candidate[0])
+                if length >= self.min_main_chars:
+                    return element
+        scores = {}
+        total = 0
+        for paragraph in body.iter('p'):
+            length = self.text_length(paragraph)
+            if length < 25:
+                continue
+            total += length
+            parent = paragraph.getparent()
+            if parent is None:
+                continue
+            scores[parent] = scores.get(parent, 0) + length
+            grandparent = parent.getparent()
+            if grandparent is not None:
+                scores[grandparent] = scores.get(grandparent, 0) + length / 2
+        if not scores:
+            return body
+        element, score = max(scores.items(), key=lambda item: item[1])
+        if score >= self.min_main_chars and score >= total * self.min_main_share:
+            return element
+        return body
+
+    def flush(self, parts: List[str], prefix: str, lines: List[str], budget: List[int]) -> None:
+        text = ' '.join(''.join(parts).split())
+        parts.clear()
+        if not text or not is_sentence(text):
+            return
+        lines.append(prefix + text)
+        budget[0] += len(prefix) + len(text) + 2
+        if budget[0] >= budget[1]:
+            raise BudgetReached()
+
+    def walk(self, element, prefix: str, parts: List[str], lines: List[str], budget: List[int]) -> None:
+        """
+        Append the markdown lines of an element, inline text is gathered until the end of its block.
+        budget is [chars written, max chars].
+        """
+        if not isinstance(element.tag, str):
+            return
+        tag = element.tag
+        if tag == 'img':
+            alt = element.get('alt', '')
+            parts.append(f" [IMAGE: {alt}] " if alt else "")
+            return
+        block = tag in self.block_tags
+        if block:
+            self.flush(parts, prefix, lines, budget)
+            prefix = self.prefixes.get(tag, prefix)
+        elif tag in ('td', 'th'):
+            parts.append(' | ')
+        if element.text:
+            parts.append(element.text)
+        for child in element:
+            self.walk(child, prefix, parts, lines, budget)
+            if child.tail:
+                parts.append(child.tail)
+        if block:
+            self.flush(parts, prefix, lines, budget)
+
+def get_extractor(extractor: str = "auto") -> HtmlExtractor:
+    """
+    Get an html extractor.
+    Args:
+        extractor: "markdownify", "lxml" or "auto"
+                   auto use lxml if installed, markdownify otherwise.
+    Returns:
+        HtmlExtractor: the extractor
+    """
+    if extractor == "auto":
+        return LxmlExtractor() if LXML_FOUND else MarkdownifyExtractor()
+    if extractor == "markdownify":
+        return MarkdownifyExtractor()
+    if extractor == "lxml":
+        return LxmlExtractor()
+    raise ValueError(f"Unknown html extractor: {extractor}")
@@ -0,0 +1,142 @@
+import re
+from typing import Dict
+from urllib.parse import urlparse, urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from sources.logger import Logger
+from sources.extractors import LXML_FOUND
+
+FETCH_MODES = ["auto", "static", "browser"]
+
+# pages rendered client side, or behind a bot check, need the browser
+JS_REQUIRED_PATTERNS = re.compile(
+    r"<noscript[^>]*>[^<]{0,200}(enable|activate|turn on)[^<]{0,40}javascript"
+    r"|you need to enable javascript"
+    r"|<div[^>]+id=[\"'](root|app|__next|__nuxt)[\"'][^>]*>\s*</div>"
+    r"|checking your browser|cf-browser-verification|challenge-platform|g-recaptcha|hcaptcha",
+    re.IGNORECASE
+)
+
+class StaticPage:
+    """A page fetched without the browser."""
+    def __init__(self, url: str, html: str):
+        self.url = url
+        self.html = html
+
+    def snapshot(self) -> dict:
+        """Snapshot of the page in the format of page_snapshot.js, without layout every element is displayed."""
+        soup = BeautifulSoup(self.html, "lxml" if LXML_FOUND else "html.parser")
+        links = [{"url": urljoin(self.url, a["href"]), "text": a.get_text(" ", strip=True), "displayed": True}
+                 for a in soup.find_all("a", href=True)]
+        inputs = [{"tagName": "INPUT", "text": element.get("name", ""), "type": element.get("type", "text"),
+                   "class": " ".join(element.get("class", [])), "xpath": "", "displayed": element.get("type") != "hidden",
+                   "checked": element.has_attr("checked")}
+                  for element in soup.find_all("input")]
+        return {
+            "url": self.url,
+            "title": soup.title.get_text(strip=True) if soup.title else "",
+            "html": self.html,
+            "links": links,
+            "inputs": inputs,
+            "buttons": []
+        }
+
+def parse_domain_modes(spec: str) -> Dict[str, str]:
+    """
+    Parse per domain fetch modes written as "domain:mode" separated by spaces, e.g. "wikipedia.org:static x.com:browser".
+    """
+    modes = {}
+    for item in spec.split():
+        domain, _, mode = item.rpartition(':')
+        if not domain or mode not in FETCH_MODES:
+            raise ValueError(f"Invalid domain fetch mode: {item}, expected domain:{'|'.join(FETCH_MODES)}")
+        modes[domain.lower()] = mode
+    return modes
+
+class StaticFetcher:
+    """
+    Plain HTTP fetch of web pages over a pooled session, to skip the browser rendering of static pages.
+    """
+    def __init__(self, mode: str = "auto", domain_modes: Dict[str, str] = None, user_agent: str = None,
+                 timeout: float = 8.0, max_bytes: int = 4 * 1024 * 1024, pool_size: int = 8):
+        """
+        Args:
+            mode: default fetch mode, "auto" fetch statically and fall back to the browser when the page needs it,
+                  "static" use the static page whenever the fetch succeeds, "browser" never fetch statically
+            domain_modes: fetch mode per domain, applied to its subdomains too
+            user_agent: user agent of the requests
+            timeout: connect and read timeout in seconds
+            max_bytes: pages larger than this are left to the browser
+            pool_size: connections kept open per host
+        """
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {mode}")
+        self.mode = mode
+        self.domain_modes = {domain.lower(): mode for domain, mode in (domain_modes or {}).items()}
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.logger = Logger("browser.log")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5",
+            "Accept-Language": "en-US,en;q=0.8",
+        })
+
+    def mode_for(self, url: str) -> str:
+        """Fetch mode of a url, the most specific configured domain wins."""
+        host = (urlparse(url).hostname or "").lower()
+        parts = host.split('.')
+        for i in range(len(parts)):
+            domain = '.'.join(parts[i:])
+            if domain in self.domain_modes:
+                return self.domain_modes[domain]
+        return self.mode
+
+    def needs_javascript(self, html: str) -> bool:
+        return JS_REQUIRED_PATTERNS.search(html) is not None
+
+    def fetch(self, url: str) -> StaticPage | None:
+        """
+        Fetch a page with a plain GET.
+        Returns:
+            StaticPage | None: the page, None if it is not a static html page, the browser should load it
+        """
+        if urlparse(url).scheme not in ["http", "https"]:
+            return None
+        try:
+            with self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=True) as response:
+                content_type = response.headers.get("Content-Type", "").lower()
+                if response.status_code != 200:
+                    self.logger.info(f"Static fetch of {url} returned {response.status_code}.")
+                    return None
+                if "html" not in content_type:
+                    self.logger.info(f"Static fetch of {url} skipped, content type {content_type}.")
+                    return None
+                blocks, size = [], 0
+                for block in response.iter_content(64 * 1024):
+                    blocks.append(block)
+                    size += len(block)
+                    if size > self.max_bytes:
+                        self.logger.info(f"Static fetch of {url} skipped, page larger than {self.max_bytes} bytes.")
+                        return None
+                # requests default to latin-1 when the charset is not given, most pages are utf-8
+                encoding = response.encoding if "charset=" in content_type else "utf-8"
+                html = b"".join(blocks).decode(encoding or "utf-8", errors="replace")
+                final_url = response.url
+        except requests.RequestException as e:
+            self.logger.warning(f"Static fetch of {url} failed: {str(e)}")
+            return None
+        if self.needs_javascript(html):
+            self.logger.info(f"Static fetch of {url}: page needs javascript.")
+            return None
+        return StaticPage(final_url, html)
+
+    def close(self) -> None:
+        self.session.close()
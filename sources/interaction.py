@@ -1,4 +1,5 @@
 import readline
+import asyncio
 import configparser
 from typing import List, Tuple, Type, Dict
 
@@ -37,7 +38,7 @@ class Interaction:
         if use_router:
             try:
                 self.router = AgentRouter(self.agents, supported_language=langs)
-                pretty_print("Router initialized successfully", color="success")
+                pretty_print("Router initialized, routing models are loading in background", color="success")
             except Exception as e:
                 pretty_print(f"Failed to initialize router: {str(e)}", color="failure")
                 pretty_print("Continuing without router. Will use default agent.", color="warning")
@@ -172,7 +173,7 @@ class Interaction:
             
         # Select agent - either through router or default to first agent
         if self.router:
-            agent = self.router.select_agent(self.last_query)
+            agent = await asyncio.to_thread(self.router.select_agent, self.last_query)
         else:
             # Default to first casual agent or just first agent if no casual agent
             agent = None
@@ -1,30 +1,76 @@
 from typing import List, Tuple, Type, Dict
 import re
-import langid
+import threading
+from collections import OrderedDict
+
+from langid.langid import LanguageIdentifier, model as langid_model
 from transformers import MarianMTModel, MarianTokenizer
 
 from sources.utility import pretty_print, animate_thinking
 from sources.logger import Logger
+from sources.models import get_model, load_onnx
 
 class LanguageUtility:
     """LanguageUtility for language, or emotion identification"""
-    def __init__(self, supported_language: List[str] = ["en", "fr", "zh"]):
+    def __init__(self, supported_language: List[str] = ["en", "fr", "zh"], cache_size: int = 1024, batch_size: int = 16):
         """
         Initialize the LanguageUtility class
         args:
             supported_language: list of languages for translation, determine which Helsinki-NLP model to load
+            cache_size: number of translations kept in the LRU cache
+            batch_size: maximum number of texts per translation forward pass
         """
-        self.translators_tokenizer = None 
-        self.translators_model = None
+        self.translators_tokenizer = {}
+        self.translators_model = {}
         self.logger = Logger("language.log")
         self.supported_language = supported_language
-        self.load_model()
+        self.identifier = None
+        self.translation_cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_lock = threading.Lock()
+        self.batch_size = batch_size
     
     def load_model(self) -> None:
-        animate_thinking("Loading language utility...", color="status")
-        self.translators_tokenizer = {lang: MarianTokenizer.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en") for lang in self.supported_language if lang != "en"}
-        self.translators_model = {lang: MarianMTModel.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en") for lang in self.supported_language if lang != "en"}
+        """Load the language identifier and the translation models of all supported languages."""
+        self.get_identifier()
+        for lang in self.supported_language:
+            if lang != "en":
+                self.get_translator(lang)
+
+    def get_translator(self, lang: str) -> tuple:
+        """
+        Get the tokenizer and model translating a language to english, loaded on first use.
+        The models are shared between all LanguageUtility instances.
+        """
+        if lang not in self.translators_model:
+            tokenizer, model = get_model(f"opus-mt-{lang}-en", lambda: self.load_translator(lang))
+            self.translators_tokenizer[lang] = tokenizer
+            self.translators_model[lang] = model
+        return self.translators_tokenizer[lang], self.translators_model[lang]
+
+    @staticmethod
+    def load_translator(lang: str) -> tuple:
+        animate_thinking(f"Loading {lang} translation model...", color="status")
+        tokenizer = MarianTokenizer.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en")
+        model = load_onnx(f"Helsinki-NLP/opus-mt-{lang}-en", "ORTModelForSeq2SeqLM")
+        if model is None:
+            model = MarianMTModel.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en")
+        return tokenizer, model
     
+    def get_identifier(self) -> LanguageIdentifier:
+        """
+        Get the langid identifier restricted to the supported languages, loaded on first use.
+        Restricting the languages rebuild the model mask, it is done once per language set.
+        """
+        if self.identifier is None:
+            languages = sorted(set(self.supported_language))
+            def load_identifier():
+                identifier = LanguageIdentifier.from_modelstring(langid_model, norm_probs=False)
+                identifier.set_languages(languages)
+                return identifier
+            self.identifier = get_model(f"langid-{'-'.join(languages)}", load_identifier, quantize=False)
+        return self.identifier
+
     def detect_language(self, text: str) -> str:
         """
         Detect the language of the given text using langdetect
@@ -33,8 +79,7 @@ class LanguageUtility:
             text: string to analyze
         Returns: ISO639-1 language code
         """
-        langid.set_languages(self.supported_language)
-        lang, score = langid.classify(text)
+        lang, score = self.get_identifier().classify(text)
         self.logger.info(f"Identified: {text} as {lang} with conf {score}")
         return lang
 
@@ -46,16 +91,61 @@ class LanguageUtility:
             origin_lang: ISO language code
         Returns: translated str
         """
-        if origin_lang == "en":
-            return text
-        if origin_lang not in self.translators_tokenizer:
-            pretty_print(f"Language {origin_lang} not supported for translation", color="error")
-            return text
-        tokenizer = self.translators_tokenizer[origin_lang]
-        inputs = tokenizer(text, return_tensors="pt", padding=True)
-        model = self.translators_model[origin_lang]
-        translation = model.generate(**inputs)
-        return tokenizer.decode(translation[0], skip_special_tokens=True)
+        return self.translate_batch([text], [origin_lang])[0]
+
+    def translate_batch(self, texts: List[str], origin_langs: List[str]) -> List[str]:
+        """
+        Translate several texts to English.
+        Cached translations are reused, the others are translated in padded batches, per language.
+        Args:
+            texts: strings to translate
+            origin_langs: ISO language code of each text
+        Returns: translated strs, in the same order
+        """
+        results = list(texts)
+        pending = {}
+        for i, (text, lang) in enumerate(zip(texts, origin_langs)):
+            if lang == "en":
+                continue
+            if lang not in self.supported_language:
+                pretty_print(f"Language {lang} not supported for translation", color="error")
+                continue
+            cached = self.cache_get((lang, text))
+            if cached is not None:
+                results[i] = cached
+                continue
+            # identical texts are translated once
+            pending.setdefault(lang, {}).setdefault(text, []).append(i)
+        for lang, by_text in pending.items():
+            unique_texts = list(by_text)
+            for start in range(0, len(unique_texts), self.batch_size):
+                batch = unique_texts[start:start + self.batch_size]
+                for text, translation in zip(batch, self.run_translation(lang, batch)):
+                    self.cache_put((lang, text), translation)
+                    for i in by_text[text]:
+                        results[i] = translation
+        return results
+
+    def run_translation(self, lang: str, texts: List[str]) -> List[str]:
+        """Translate a batch of texts of the same language with its Marian model."""
+        tokenizer, model = self.get_translator(lang)
+        inputs = tokenizer(texts, return_tensors="pt", padding=True)
+        translations = model.generate(**inputs)
+        return [tokenizer.decode(translation, skip_special_tokens=True) for translation in translations]
+
+    def cache_get(self, key: tuple) -> str | None:
+        with self.cache_lock:
+            if key not in self.translation_cache:
+                return None
+            self.translation_cache.move_to_end(key)
+            return self.translation_cache[key]
+
+    def cache_put(self, key: tuple, translation: str) -> None:
+        with self.cache_lock:
+            self.translation_cache[key] = translation
+            self.translation_cache.move_to_end(key)
+            while len(self.translation_cache) > self.cache_size:
+                self.translation_cache.popitem(last=False)
 
     def analyze(self, text):
         """
@@ -1,26 +1,48 @@
+import asyncio
+import json
 import os
 import platform
 import socket
 import subprocess
+import threading
 import time
+from typing import Callable
 from urllib.parse import urlparse
 
 import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from ollama import Client as OllamaClient
-from openai import OpenAI
+from ollama import AsyncClient as OllamaAsyncClient
+from openai import OpenAI, AsyncOpenAI
 
 from sources.logger import Logger
 from sources.utility import pretty_print, animate_thinking
 
+HTTP2_AVAILABLE = True
+
+try:
+    import h2
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 class Provider:
-    def __init__(self, provider_name, model, server_address="127.0.0.1:5000", is_local=False):
+    def __init__(self, provider_name, model, server_address="127.0.0.1:5000", is_local=False,
+                 pool_size: int = 8, connect_timeout: float = 10.0, read_timeout: float = 300.0):
         self.provider_name = provider_name.lower()
         self.model = model
         self.is_local = is_local
         self.server_ip = server_address
         self.server_address = server_address
+        self.server_streaming = True
+        # long-lived clients, created on first use and reused to keep connections alive across calls
+        self.clients = {}
+        self.clients_calls = {}
+        self.clients_lock = threading.Lock()
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
         self.available_providers = {
             "ollama": self.ollama_fn,
             "server": self.server_fn,
@@ -34,6 +56,15 @@ class Provider:
             "openrouter": self.openrouter_fn,
             "test": self.test_fn
         }
+        # providers with a native asyncio implementation, their generation can be cancelled while in-flight
+        self.async_providers = {
+            "ollama": self.ollama_async_fn,
+            "server": self.server_async_fn,
+            "openai": self.openai_async_fn,
+            "google": self.openai_async_fn,
+            "deepseek": self.openai_async_fn,
+            "openrouter": self.openai_async_fn,
+        }
         self.logger = Logger("provider.log")
         self.api_key = None
         self.unsafe_providers = ["openai", "deepseek", "dsk_deepseek", "together", "google", "openrouter"]
@@ -48,6 +79,105 @@ class Provider:
     def get_model_name(self) -> str:
         return self.model
 
+    def get_client(self, name: str, factory: Callable):
+        """
+        Return the long-lived client registered under name, create it with factory on first use.
+        """
+        with self.clients_lock:
+            if name not in self.clients:
+                self.logger.info(f"Creating pooled client {name}")
+                self.clients[name] = factory()
+                self.clients_calls[name] = 0
+            self.clients_calls[name] += 1
+            return self.clients[name]
+
+    def make_http_client(self, http2: bool = False) -> httpx.Client:
+        """
+        Create a httpx client with a keep-alive connection pool, HTTP/2 is used if h2 is installed.
+        """
+        return httpx.Client(
+            http2=http2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        )
+
+    def make_async_http_client(self, http2: bool = False) -> httpx.AsyncClient:
+        """
+        Create a httpx async client with the same pool and timeout settings as make_http_client.
+        """
+        return httpx.AsyncClient(
+            http2=http2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        )
+
+    def make_http_session(self) -> requests.Session:
+        """
+        Create a requests session with a keep-alive connection pool.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_http_session(self) -> requests.Session:
+        return self.get_client("http", self.make_http_session)
+
+    def get_openai_client(self, name: str, base_url: str = None) -> OpenAI:
+        """
+        Get a pooled OpenAI compatible client for the given base url.
+        """
+        return self.get_client(name, lambda: OpenAI(api_key=self.api_key,
+                                                    base_url=base_url,
+                                                    http_client=self.make_http_client(http2=True)))
+
+    def get_pool_stats(self) -> dict:
+        """
+        Get the number of calls and open connections of each pooled client.
+        """
+        stats = {}
+        with self.clients_lock:
+            for name, client in self.clients.items():
+                stats[name] = {"calls": self.clients_calls[name], **self.connection_stats(client)}
+        return stats
+
+    def connection_stats(self, client) -> dict:
+        """
+        Inspect the connection pool of a requests session or of a httpx based client.
+        """
+        if isinstance(client, requests.Session):
+            pools = []
+            for adapter in client.adapters.values():
+                manager = adapter.poolmanager
+                pools.extend(manager.pools[key] for key in manager.pools.keys())
+            return {
+                "pools": len(pools),
+                "connections": sum(pool.num_connections for pool in pools),
+                "requests": sum(pool.num_requests for pool in pools)
+            }
+        http_client = client if isinstance(client, httpx.Client) else getattr(client, "_client", None)
+        pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+        if pool is None:
+            return {}
+        connections = pool.connections
+        return {
+            "connections": len(connections),
+            "idle": sum(1 for connection in connections if connection.is_idle())
+        }
+
+    def close(self) -> None:
+        """
+        Close all pooled clients. Async clients are closed when their event loop shuts down.
+        """
+        with self.clients_lock:
+            for name, client in self.clients.items():
+                close = getattr(client, "close", None)
+                if close is not None and not asyncio.iscoroutinefunction(close):
+                    close()
+            self.clients.clear()
+            self.clients_calls.clear()
+
     def get_api_key(self, provider):
         load_dotenv()
         api_key_var = f"{provider.upper()}_API_KEY"
@@ -68,20 +198,45 @@ class Provider:
         except KeyboardInterrupt:
             self.logger.warning("User interrupted the operation with Ctrl+C")
             return "Operation interrupted by user. REQUEST_EXIT"
-        except ConnectionError as e:
+        except Exception as e:
+            return self.handle_provider_error(e)
+        return thought
+
+    async def respond_async(self, history, verbose=True):
+        """
+        Use the choosen provider to generate text without blocking the event loop.
+        Cancelling the awaiting task stops the generation for providers with an async client,
+        other providers run the blocking respond in a worker thread.
+        """
+        llm = self.async_providers.get(self.provider_name)
+        if llm is None:
+            return await asyncio.to_thread(self.respond, history, verbose)
+        self.logger.info(f"Using async provider: {self.provider_name} at {self.server_ip}")
+        try:
+            thought = await llm(history, verbose)
+        except asyncio.CancelledError:
+            self.logger.warning(f"Generation with {self.provider_name} cancelled")
+            raise
+        except Exception as e:
+            return self.handle_provider_error(e)
+        return thought
+
+    def handle_provider_error(self, e: Exception) -> str:
+        """
+        Turn a provider failure into an answer for the user or a more explicit exception.
+        """
+        if isinstance(e, ConnectionError):
             raise ConnectionError(f"{str(e)}\nConnection to {self.server_ip} failed.")
-        except AttributeError as e:
+        if isinstance(e, AttributeError):
             raise NotImplementedError(f"{str(e)}\nIs {self.provider_name} implemented ?")
-        except ModuleNotFoundError as e:
+        if isinstance(e, ModuleNotFoundError):
             raise ModuleNotFoundError(
                 f"{str(e)}\nA import related to provider {self.provider_name} was not found. Is it installed ?")
-        except Exception as e:
-            if "try again later" in str(e).lower():
-                return f"{self.provider_name} server is overloaded. Please try again later."
-            if "refused" in str(e):
-                return f"Server {self.server_ip} seem offline. Unable to answer."
-            raise Exception(f"Provider {self.provider_name} failed: {str(e)}") from e
-        return thought
+        if "try again later" in str(e).lower():
+            return f"{self.provider_name} server is overloaded. Please try again later."
+        if "refused" in str(e):
+            return f"Server {self.server_ip} seem offline. Unable to answer."
+        raise Exception(f"Provider {self.provider_name} failed: {str(e)}") from e
 
     def is_ip_online(self, address: str, timeout: int = 10) -> bool:
         """
@@ -110,10 +265,9 @@ class Provider:
     def server_fn(self, history, verbose=False):
         """
         Use a remote server with LLM to generate text.
+        Tokens are streamed from the /stream route, polling is kept as a fallback for older servers.
         """
-        thought = ""
         route_setup = f"{self.server_ip}/setup"
-        route_gen = f"{self.server_ip}/generate"
 
         print(f"CLIENT DEBUG: Using server at {self.server_ip}")
         print(f"CLIENT DEBUG: History: {history}")
@@ -121,14 +275,65 @@ class Provider:
         if not self.is_ip_online(self.server_ip):
             pretty_print(f"Server is offline at {self.server_ip}", color="failure")
 
+        setup_response = self.get_http_session().post(route_setup, json={"model": self.model},
+                                                      timeout=(self.connect_timeout, self.read_timeout))
+        print(f"CLIENT DEBUG: Setup response: {setup_response.status_code} - {setup_response.text}")
+
+        if self.server_streaming:
+            thought = self.server_stream_fn(history, verbose)
+            if thought is not None:
+                return thought
+            self.logger.warning(f"Server at {self.server_ip} does not support streaming, falling back to polling.")
+            self.server_streaming = False
+        return self.server_poll_fn(history, verbose)
+
+    def server_stream_fn(self, history, verbose=False) -> str | None:
+        """
+        Stream the generation of a remote server as newline-delimited JSON tokens.
+        Returns None if the server does not expose the /stream route.
+        """
+        thought = ""
+        route_stream = f"{self.server_ip}/stream"
+        session = self.get_http_session()
+        with session.post(route_stream, json={"messages": history, "model": self.model}, stream=True,
+                          timeout=(self.connect_timeout, self.read_timeout)) as response:
+            if response.status_code in (404, 405):
+                return None
+            if response.status_code == 402:
+                raise Exception(f"Server {self.server_ip} generation queue is full, try again later.")
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("error"):
+                    raise Exception(f"Error from server: {event['error']}")
+                token = event.get("token", "")
+                if verbose:
+                    print(token, end="", flush=True)
+                thought += token
+                if event.get("is_complete"):
+                    break
+        return thought
+
+    def server_poll_fn(self, history, verbose=False):
+        """
+        Start a generation on a remote server and poll the updated sentence until completion.
+        """
+        thought = ""
+        route_gen = f"{self.server_ip}/generate"
+        session = self.get_http_session()
+        timeout = (self.connect_timeout, self.read_timeout)
+
         try:
-            # Setup connection
-            setup_response = requests.post(route_setup, json={"model": self.model})
-            print(f"CLIENT DEBUG: Setup response: {setup_response.status_code} - {setup_response.text}")
-            
             # Generate request
-            gen_response = requests.post(route_gen, json={"messages": history})
+            gen_response = session.post(route_gen, json={"messages": history, "model": self.model}, timeout=timeout)
             print(f"CLIENT DEBUG: Generate response: {gen_response.status_code} - {gen_response.text}")
+            if gen_response.status_code == 402:
+                raise Exception(f"Server {self.server_ip} generation queue is full, try again later.")
+            # servers with concurrent generations return an id, older ones only expose the last generation
+            generation_id = gen_response.json().get("id")
+            route_status = f"{self.server_ip}/status/{generation_id}" if generation_id else f"{self.server_ip}/get_updated_sentence"
             
             is_complete = False
             poll_count = 0
@@ -138,7 +343,7 @@ class Provider:
                     poll_count += 1
                     print(f"CLIENT DEBUG: Polling attempt {poll_count}")
                     
-                    response = requests.get(f"{self.server_ip}/get_updated_sentence")
+                    response = session.get(route_status, timeout=timeout)
                     print(f"CLIENT DEBUG: Poll response: {response.status_code} - {response.text}")
                     
                     response_json = response.json()
@@ -182,13 +387,69 @@ class Provider:
         print(f"CLIENT DEBUG: Returning thought: '{thought}'")
         return thought
 
+    async def server_async_fn(self, history, verbose=False):
+        """
+        Stream the generation of a remote server without blocking the event loop.
+        If the awaiting task is cancelled the server is asked to stop the generation.
+        """
+        if not self.server_streaming:
+            return await asyncio.to_thread(self.server_fn, history, verbose)
+        client = self.get_client("http_async", self.make_async_http_client)
+        await client.post(f"{self.server_ip}/setup", json={"model": self.model})
+        thought = ""
+        generation_id = None
+        try:
+            async with client.stream("POST", f"{self.server_ip}/stream", json={"messages": history, "model": self.model}) as response:
+                if response.status_code in (404, 405):
+                    self.logger.warning(f"Server at {self.server_ip} does not support streaming, falling back to polling.")
+                    self.server_streaming = False
+                else:
+                    if response.status_code == 402:
+                        raise Exception(f"Server {self.server_ip} generation queue is full, try again later.")
+                    response.raise_for_status()
+                    generation_id = response.headers.get("X-Generation-Id")
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if event.get("error"):
+                            raise Exception(f"Error from server: {event['error']}")
+                        token = event.get("token", "")
+                        if verbose:
+                            print(token, end="", flush=True)
+                        thought += token
+                        if event.get("is_complete"):
+                            return thought
+        except asyncio.CancelledError:
+            if generation_id is not None:
+                await self.cancel_server_generation(generation_id)
+            raise
+        if not self.server_streaming:
+            return await asyncio.to_thread(self.server_poll_fn, history, verbose)
+        return thought
+
+    async def cancel_server_generation(self, generation_id: str) -> None:
+        """
+        Ask the remote server to stop a generation, failures are only logged.
+        """
+        try:
+            client = self.get_client("http_async", self.make_async_http_client)
+            await client.post(f"{self.server_ip}/cancel/{generation_id}", timeout=self.connect_timeout)
+            self.logger.info(f"Cancelled generation {generation_id} on {self.server_ip}")
+        except Exception as e:
+            self.logger.warning(f"Failed to cancel generation {generation_id}: {str(e)}")
+
     def ollama_fn(self, history, verbose=False):
         """
         Use local or remote Ollama server to generate text.
         """
         thought = ""
         host = "http://localhost:11434" if self.is_local else f"http://{self.server_address}"
-        client = OllamaClient(host=host)
+        client = self.get_client(f"ollama:{host}", lambda: OllamaClient(
+            host=host,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        ))
 
         try:
             stream = client.chat(
@@ -217,14 +478,47 @@ class Provider:
 
         return thought
 
+    async def ollama_async_fn(self, history, verbose=False):
+        """
+        Use local or remote Ollama server to generate text without blocking the event loop.
+        Cancelling the task closes the stream, which stops the generation on the Ollama server.
+        """
+        thought = ""
+        host = "http://localhost:11434" if self.is_local else f"http://{self.server_address}"
+        client = self.get_client(f"ollama_async:{host}", lambda: OllamaAsyncClient(
+            host=host,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        ))
+        try:
+            stream = await client.chat(
+                model=self.model,
+                messages=history,
+                stream=True,
+            )
+            async for chunk in stream:
+                if verbose:
+                    print(chunk["message"]["content"], end="", flush=True)
+                thought += chunk["message"]["content"]
+        except httpx.ConnectError as e:
+            raise Exception(
+                f"\nOllama connection failed at {host}. Check if the server is running."
+            ) from e
+        except Exception as e:
+            if hasattr(e, 'status_code') and e.status_code == 404:
+                # the blocking path handle the model download
+                return await asyncio.to_thread(self.ollama_fn, history, verbose)
+            raise e
+        return thought
+
     def huggingface_fn(self, history, verbose=False):
         """
         Use huggingface to generate text.
         """
         from huggingface_hub import InferenceClient
-        client = InferenceClient(
+        client = self.get_client("huggingface", lambda: InferenceClient(
             api_key=self.get_api_key("huggingface")
-        )
+        ))
         completion = client.chat.completions.create(
             model=self.model,
             messages=history,
@@ -239,9 +533,9 @@ class Provider:
         """
         base_url = self.server_ip
         if self.is_local:
-            client = OpenAI(api_key=self.api_key, base_url=f"http://{base_url}")
+            client = self.get_openai_client("openai:local", base_url=f"http://{base_url}")
         else:
-            client = OpenAI(api_key=self.api_key)
+            client = self.get_openai_client("openai")
 
         try:
             response = client.chat.completions.create(
@@ -257,13 +551,45 @@ class Provider:
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}") from e
 
+    async def openai_async_fn(self, history, verbose=False):
+        """
+        Use an OpenAI compatible API (openai, google, deepseek, openrouter) without blocking the event loop.
+        """
+        base_urls = {
+            "openai": f"http://{self.server_ip}" if self.is_local else None,
+            "google": "https://generativelanguage.googleapis.com/v1beta/openai/",
+            "deepseek": "https://api.deepseek.com",
+            "openrouter": "https://openrouter.ai/api/v1",
+        }
+        if self.is_local and self.provider_name != "openai":
+            raise Exception(f"{self.provider_name} is not available for local use. Change config.ini")
+        model = "deepseek-chat" if self.provider_name == "deepseek" else self.model
+        client = self.get_client(f"{self.provider_name}:async", lambda: AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=base_urls[self.provider_name],
+            http_client=self.make_async_http_client(http2=True)
+        ))
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=history,
+            )
+            if response is None:
+                raise Exception(f"{self.provider_name} response is empty.")
+            thought = response.choices[0].message.content
+            if verbose:
+                print(thought)
+            return thought
+        except Exception as e:
+            raise Exception(f"{self.provider_name} API error: {str(e)}") from e
+
     def anthropic_fn(self, history, verbose=False):
         """
         Use Anthropic to generate text.
         """
         from anthropic import Anthropic
 
-        client = Anthropic(api_key=self.api_key)
+        client = self.get_client("anthropic", lambda: Anthropic(api_key=self.api_key))
         system_message = None
         messages = []
         for message in history:
@@ -297,7 +623,7 @@ class Provider:
         if self.is_local:
             raise Exception("Google Gemini is not available for local use. Change config.ini")
 
-        client = OpenAI(api_key=self.api_key, base_url="https://generativelanguage.googleapis.com/v1beta/openai/")
+        client = self.get_openai_client("google", base_url="https://generativelanguage.googleapis.com/v1beta/openai/")
         try:
             response = client.chat.completions.create(
                 model=self.model,
@@ -317,7 +643,7 @@ class Provider:
         Use together AI for completion
         """
         from together import Together
-        client = Together(api_key=self.api_key)
+        client = self.get_client("together", lambda: Together(api_key=self.api_key))
         if self.is_local:
             raise Exception("Together AI is not available for local use. Change config.ini")
 
@@ -339,7 +665,7 @@ class Provider:
         """
         Use deepseek api to generate text.
         """
-        client = OpenAI(api_key=self.api_key, base_url="https://api.deepseek.com")
+        client = self.get_openai_client("deepseek", base_url="https://api.deepseek.com")
         if self.is_local:
             raise Exception("Deepseek (API) is not available for local use. Change config.ini")
         try:
@@ -369,7 +695,8 @@ class Provider:
             "model": self.model
         }
         try:
-            response = requests.post(route_start, json=payload)
+            response = self.get_http_session().post(route_start, json=payload,
+                                                    timeout=(self.connect_timeout, self.read_timeout))
             result = response.json()
             if verbose:
                 print("Response from LM Studio:", result)
@@ -384,7 +711,7 @@ class Provider:
         """
         Use OpenRouter API to generate text.
         """
-        client = OpenAI(api_key=self.api_key, base_url="https://openrouter.ai/api/v1")
+        client = self.get_openai_client("openrouter", base_url="https://openrouter.ai/api/v1")
         if self.is_local:
             # This case should ideally not be reached if unsafe_providers is set correctly
             # and is_local is False in config for openrouter
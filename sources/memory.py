@@ -4,12 +4,26 @@ import uuid
 import os
 import sys
 import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import List, Tuple, Type, Dict
 import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 
 from sources.utility import timer_decorator, pretty_print, animate_thinking
 from sources.logger import Logger
+from sources.models import get_model, load_onnx
+from sources.sessions import SessionStore
+from sources.retrieval import SentenceEmbedder, FlatIndex, BM25, text_key, split_chunks
+from sources.tokens import get_token_counter, MESSAGE_OVERHEAD
+
+# messages longer than this (in characters) get summarized by the compression
+COMPRESSION_MIN_CHARS = 1024
+# summarization runs on a single background thread shared by all memories,
+# the model inference is heavy and should not run twice at once
+compression_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-compression")
 
 class Memory():
     """
@@ -19,25 +33,54 @@ class Memory():
     def __init__(self, system_prompt: str,
                  recover_last_session: bool = False,
                  memory_compression: bool = True,
-                 model_provider: str = "deepseek-r1:14b"):
+                 model_provider: str = "deepseek-r1:14b",
+                 tokenizer: str = "auto",
+                 context_size: int | None = None,
+                 max_answer_tokens: int = 1024,
+                 semantic_retrieval: bool = False,
+                 recent_turns: int = 6,
+                 retrieved_turns: int = 4):
+        """
+        Args:
+            tokenizer: token counter used for the context budget, see sources.tokens.get_token_counter
+            context_size: model context size in tokens, estimated from the model name if None
+            max_answer_tokens: tokens kept free in the context for the model answer
+            semantic_retrieval: send only the recent messages and the older messages relevant to the last query
+            recent_turns: number of latest messages always sent when semantic_retrieval is on
+            retrieved_turns: number of older messages retrieved by similarity when semantic_retrieval is on
+        """
         self.memory = [{'role': 'system', 'content': system_prompt}]
         
         self.logger = Logger("memory.log")
+        self.token_counter = get_token_counter(tokenizer)
+        self.context_size = context_size
+        self.max_answer_tokens = max_answer_tokens
+        self.semantic_retrieval = semantic_retrieval
+        self.recent_turns = recent_turns
+        self.retrieved_turns = retrieved_turns
+        self.embedder = SentenceEmbedder() if semantic_retrieval else None
+        self.turn_index = FlatIndex()
         self.session_time = datetime.datetime.now()
         self.session_id = str(uuid.uuid4())
         self.conversation_folder = f"conversations/"
+        self.store = SessionStore(self.conversation_folder)
+        self.saved_count = 0 # messages already written to the session file
+        self.rewrite_needed = False # set when saved messages were changed or removed
         self.session_recovered = False
-        if recover_last_session:
-            self.load_memory()
-            self.session_recovered = True
         # memory compression system
         self.model = None
         self.tokenizer = None
         self.device = self.get_cuda_device()
         self.memory_compression = memory_compression
         self.model_provider = model_provider
-        if self.memory_compression:
-            self.download_model()
+        self.lock = threading.Lock()
+        self.summary_cache = OrderedDict()
+        self.summary_cache_size = 256
+        self.compression_future = None
+        self.compression_requested = False
+        if recover_last_session:
+            self.load_memory()
+            self.session_recovered = True
 
     def get_ideal_ctx(self, model_name: str) -> int | None:
         """
@@ -47,6 +90,11 @@ class Memory():
         import re
         import math
 
+        if self.context_size is not None:
+            return self.context_size
+        if model_name is None:
+            return None
+
         def extract_number_before_b(sentence: str) -> int:
             match = re.search(r'(\d+)b', sentence, re.IGNORECASE)
             return int(match.group(1)) if match else None
@@ -63,43 +111,45 @@ class Memory():
         return context_size
     
     def download_model(self):
-        """Download the model if not already downloaded."""
-        animate_thinking("Loading memory compression model...", color="status")
-        self.tokenizer = AutoTokenizer.from_pretrained("pszemraj/led-base-book-summary")
-        self.model = AutoModelForSeq2SeqLM.from_pretrained("pszemraj/led-base-book-summary")
+        """Get the summarization model, shared by all memories and loaded on first use."""
+        self.tokenizer, self.model = get_model("led-base-book-summary", self.load_summarizer)
         self.logger.info("Memory compression system initialized.")
+
+    @staticmethod
+    def load_summarizer() -> tuple:
+        animate_thinking("Loading memory compression model...", color="status")
+        tokenizer = AutoTokenizer.from_pretrained("pszemraj/led-base-book-summary")
+        model = load_onnx("pszemraj/led-base-book-summary", "ORTModelForSeq2SeqLM")
+        if model is None:
+            model = AutoModelForSeq2SeqLM.from_pretrained("pszemraj/led-base-book-summary")
+        return tokenizer, model
+
+    def summarizer_ready(self) -> bool:
+        """Load the summarization model if compression is enabled and it is not loaded yet."""
+        if self.memory_compression and (self.tokenizer is None or self.model is None):
+            self.download_model()
+        return self.tokenizer is not None and self.model is not None
     
     def get_filename(self) -> str:
         """Get the filename for the save file."""
         return f"memory_{self.session_time.strftime('%Y-%m-%d_%H-%M-%S')}.txt"
     
     def save_memory(self, agent_type: str = "casual_agent") -> None:
-        """Save the session memory to a file."""
-        if not os.path.exists(self.conversation_folder):
-            self.logger.info(f"Created folder {self.conversation_folder}.")
-            os.makedirs(self.conversation_folder)
-        save_path = os.path.join(self.conversation_folder, agent_type)
-        if not os.path.exists(save_path):
-            os.makedirs(save_path)
-        filename = self.get_filename()
-        path = os.path.join(save_path, filename)
-        json_memory = json.dumps(self.memory)
-        with open(path, 'w') as f:
-            self.logger.info(f"Saved memory json at {path}")
-            f.write(json_memory)
-    
-    def find_last_session_path(self, path) -> str:
-        """Find the last session path."""
-        saved_sessions = []
-        for filename in os.listdir(path):
-            if filename.startswith('memory_'):
-                date = filename.split('_')[1]
-                saved_sessions.append((filename, date))
-        saved_sessions.sort(key=lambda x: x[1], reverse=True)
-        if len(saved_sessions) > 0:
-            self.logger.info(f"Last session found at {saved_sessions[0][0]}")
-            return saved_sessions[0][0]
-        return None
+        """
+        Save the session memory.
+        Only the messages pushed since the last save are appended to the session file,
+        the file is rewritten if saved messages were changed (clear, compression...).
+        """
+        with self.lock:
+            rewrite = self.rewrite_needed or self.saved_count > len(self.memory)
+            messages = self.memory if rewrite else self.memory[self.saved_count:]
+            if not rewrite and not messages and self.saved_count > 0:
+                return
+            messages = [{key: value for key, value in message.items() if key != 'tokens'} for message in messages]
+            self.store.append(agent_type, self.get_filename(), messages,
+                              self.session_time.timestamp(), len(self.memory), rewrite=rewrite)
+            self.saved_count = len(self.memory)
+            self.rewrite_needed = False
     
     def save_json_file(self, path: str, json_memory: dict) -> None:
         """Save a JSON file."""
@@ -136,28 +186,39 @@ class Memory():
         if not os.path.exists(save_path):
             pretty_print("No memory to load.", color="success")
             return
-        filename = self.find_last_session_path(save_path)
-        if filename is None:
+        path = self.store.last_session_path(agent_type)
+        if path is None:
             pretty_print("Last session memory not found.", color="warning")
             return
-        path = os.path.join(save_path, filename)
-        self.memory = self.load_json_file(path) 
+        self.logger.info(f"Last session found at {path}")
+        messages = self.store.load(path)
+        if not messages:
+            pretty_print("Last session memory is empty.", color="warning")
+            return
+        with self.lock:
+            self.memory = messages
+            self.rewrite_needed = True
+        for message in self.memory:
+            message.pop('tokens', None) # may have been counted with another tokenizer
         if self.memory[-1]['role'] == 'user':
             self.memory.pop()
-        self.compress()
+        self.schedule_compression()
         pretty_print("Session recovered successfully", color="success")
     
     def reset(self, memory: list = []) -> None:
         self.logger.info("Memory reset performed.")
-        self.memory = memory
+        with self.lock:
+            self.memory = memory
+            self.rewrite_needed = True
     
     def push(self, role: str, content: str) -> int:
         """Push a message to the memory."""
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        if ideal_ctx is not None:
-            if self.memory_compression and len(content) > ideal_ctx * 1.5:
-                self.logger.info(f"Compressing memory: Content {len(content)} > {ideal_ctx} model context.")
-                self.compress()
+        budget = self.get_token_budget()
+        if budget is not None:
+            content_tokens = self.count_tokens(content)
+            if self.memory_compression and content_tokens > budget:
+                self.logger.info(f"Compressing memory: Content {content_tokens} tokens > {budget} tokens budget.")
+                self.schedule_compression()
         curr_idx = len(self.memory)
         if self.memory[curr_idx-1]['content'] == content:
             pretty_print("Warning: same message have been pushed twice to memory", color="error")
@@ -168,7 +229,9 @@ class Memory():
     def clear(self) -> None:
         """Clear all memory except system prompt"""
         self.logger.info("Memory clear performed.")
-        self.memory = self.memory[:1]
+        with self.lock:
+            self.memory = self.memory[:1]
+            self.rewrite_needed = True
     
     def clear_section(self, start: int, end: int) -> None:
         """
@@ -180,10 +243,88 @@ class Memory():
         self.logger.info(f"Clearing memory section {start} to {end}.")
         start = max(0, start) + 1
         end = min(end, len(self.memory)-1) + 2
-        self.memory = self.memory[:start] + self.memory[end:]
+        with self.lock:
+            self.memory = self.memory[:start] + self.memory[end:]
+            self.rewrite_needed = True
     
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens of a text with the memory tokenizer."""
+        return self.token_counter.count(text)
+
+    def message_tokens(self, message: dict) -> int:
+        """Token count of a message, memoized next to the message content."""
+        if message.get('tokens') is None:
+            message['tokens'] = self.count_tokens(message['content']) + MESSAGE_OVERHEAD
+        return message['tokens']
+
+    def get_token_budget(self) -> int | None:
+        """Number of tokens the history can use, the model context minus the room kept for the answer."""
+        ideal_ctx = self.get_ideal_ctx(self.model_provider)
+        if ideal_ctx is None:
+            return None
+        return max(ideal_ctx - self.max_answer_tokens, ideal_ctx // 2)
+
     def get(self) -> list:
-        return self.memory
+        """
+        Get the history to send to the model.
+        The system prompt and the most recent messages are kept within the token budget.
+        """
+        budget = self.get_token_budget()
+        messages = self.memory
+        if self.semantic_retrieval:
+            messages = self.select_relevant_turns(messages)
+        if budget is not None and len(messages) > 1:
+            messages = self.trim_to_budget(messages, budget)
+        return [{'role': message['role'], 'content': message['content']} for message in messages]
+
+    def select_relevant_turns(self, messages: list) -> list:
+        """
+        Keep the system prompt, the latest messages and the older messages most relevant to the last user query.
+        Older messages are embedded once and kept in a flat index keyed by content.
+        Returns:
+            list: the selected messages, in conversation order
+        """
+        if len(messages) - 1 <= self.recent_turns + self.retrieved_turns:
+            return messages
+        split = len(messages) - self.recent_turns
+        older, recent = messages[1:split], messages[split:]
+        query = next((message['content'] for message in reversed(messages) if message['role'] == 'user'), None)
+        if query is None:
+            return [messages[0]] + recent
+        keys = [text_key(message['content']) for message in older]
+        try:
+            missing = {key: message['content'] for key, message in zip(keys, older) if key not in self.turn_index}
+            if missing:
+                self.turn_index.add(list(missing.keys()), self.embedder.encode(list(missing.values())))
+            query_vector = self.embedder.encode([query])[0]
+        except Exception as e:
+            self.logger.warning(f"Semantic retrieval failed, sending the whole history: {str(e)}")
+            return messages
+        relevant = {key for key, _ in self.turn_index.search(query_vector, self.retrieved_turns, keys)}
+        retrieved = [message for key, message in zip(keys, older) if key in relevant]
+        self.logger.info(f"Retrieved {len(retrieved)} of {len(older)} older messages for the prompt.")
+        return [messages[0]] + retrieved + recent
+
+    def trim_to_budget(self, messages: list, budget: int) -> list:
+        """
+        Keep the first (system) message and as many of the latest messages as fit in the budget.
+        The last message is truncated if it does not fit on its own.
+        """
+        remaining = budget - self.message_tokens(messages[0])
+        kept = []
+        for message in reversed(messages[1:]):
+            tokens = self.message_tokens(message)
+            if tokens <= remaining:
+                kept.append(message)
+                remaining -= tokens
+                continue
+            if not kept:
+                content = self.token_counter.truncate(message['content'], remaining - MESSAGE_OVERHEAD)
+                kept.append({'role': message['role'], 'content': content})
+            break
+        if len(kept) < len(messages) - 1:
+            self.logger.info(f"History trimmed to {len(kept)} of {len(messages) - 1} messages to fit {budget} tokens.")
+        return [messages[0]] + kept[::-1]
 
     def get_cuda_device(self) -> str:
         if torch.backends.mps.is_available():
@@ -202,7 +343,7 @@ class Memory():
         Returns:
             str: The summarized text
         """
-        if self.tokenizer is None or self.model is None:
+        if not self.summarizer_ready():
             self.logger.warning("No tokenizer or model to perform summarization.")
             return text
         if len(text) < min_length*1.5:
@@ -224,41 +365,160 @@ class Memory():
         self.logger.info(f"Summarized text:\n{summary}")
         return summary
     
+    def content_hash(self, content: str) -> str:
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def cached_summarize(self, text: str) -> str:
+        """Summarize a text, reusing the summary of an identical text summarized before."""
+        key = self.content_hash(text)
+        with self.lock:
+            if key in self.summary_cache:
+                self.summary_cache.move_to_end(key)
+                return self.summary_cache[key]
+        summary = self.summarize(text)
+        with self.lock:
+            self.summary_cache[key] = summary
+            while len(self.summary_cache) > self.summary_cache_size:
+                self.summary_cache.popitem(last=False)
+        return summary
+
+    def pending_compression(self) -> list:
+        """Messages that are long enough to compress and were not summarized yet."""
+        with self.lock:
+            return [message for message in self.memory[1:]
+                    if message['role'] != 'system'
+                    and not message.get('summarized', False)
+                    and len(message['content']) > COMPRESSION_MIN_CHARS]
+
     #@timer_decorator
-    def compress(self) -> str:
+    def compress(self) -> None:
         """
         Compress (summarize) the memory using the model.
+        Only messages not summarized yet are processed. Each summary replaces its message
+        only if the message content did not change in the meantime.
         """
-        if self.tokenizer is None or self.model is None:
+        pending = self.pending_compression()
+        if not pending:
+            return
+        if not self.summarizer_ready():
             self.logger.warning("No tokenizer or model to perform memory compression.")
             return
-        for i in range(len(self.memory)):
-            if self.memory[i]['role'] == 'system':
-                continue
-            if len(self.memory[i]['content']) > 1024:
-                self.memory[i]['content'] = self.summarize(self.memory[i]['content'])
-    
-    def trim_text_to_max_ctx(self, text: str) -> str:
+        for message in pending:
+            content = message['content']
+            summary = self.cached_summarize(content)
+            with self.lock:
+                if message['content'] != content:
+                    continue
+                message['content'] = summary
+                message['summarized'] = True
+                message.pop('tokens', None)
+                self.rewrite_needed = True
+
+    def compression_worker(self) -> None:
+        """Run compression passes until no new compression was requested."""
+        while True:
+            with self.lock:
+                if not self.compression_requested:
+                    return
+                self.compression_requested = False
+            try:
+                self.compress()
+            except Exception as e:
+                self.logger.error(f"Memory compression failed: {str(e)}")
+
+    def schedule_compression(self) -> Future | None:
         """
-        Truncate a text to fit within the maximum context size of the model.
+        Request a compression of the memory on the background thread, never block the caller.
+        Returns:
+            Future: the compression job, None if compression is disabled.
         """
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        return text[:ideal_ctx] if ideal_ctx is not None else text
+        if not self.memory_compression:
+            return None
+        with self.lock:
+            self.compression_requested = True
+            if self.compression_future is not None and not self.compression_future.done():
+                return self.compression_future # the running worker will pick up the request
+            self.compression_future = compression_executor.submit(self.compression_worker)
+            return self.compression_future
+
+    def wait_compression(self, timeout: float | None = None) -> None:
+        """Wait for the background compression to finish."""
+        future = self.compression_future
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def trim_text_to_max_ctx(self, text: str, ratio: float = 0.5) -> str:
+        """
+        Truncate a text to a share of the token budget, leaving room for the rest of the prompt.
+        Args:
+            text (str): The text to truncate
+            ratio (float): The share of the budget the text can use
+        """
+        budget = self.get_token_budget()
+        if budget is None:
+            return text
+        return self.token_counter.truncate(text, int(budget * ratio))
     
+    def select_text_to_max_ctx(self, text: str, query: str, ratio: float = 0.5, chunk_chars: int = 1000) -> str:
+        """
+        Fit a text to a share of the token budget by keeping its chunks most relevant to a query.
+        Chunks are ranked with BM25, combined with embedding similarity when semantic retrieval is on.
+        The first chunk is always kept, the selected chunks are returned in text order.
+        Args:
+            text (str): The text to fit, e.g. a web page
+            query (str): What the text is read for
+            ratio (float): The share of the budget the text can use
+            chunk_chars (int): The maximum size of a chunk
+        """
+        budget = self.get_token_budget()
+        if budget is None or not text:
+            return text
+        budget = int(budget * ratio)
+        if self.count_tokens(text) <= budget:
+            return text
+        chunks = split_chunks(text, chunk_chars)
+        scores = BM25(chunks).scores(query)
+        if self.embedder is not None:
+            try:
+                vectors = self.embedder.encode(chunks + [query])
+                if scores.max() > 0:
+                    scores = scores / scores.max()
+                scores = scores + vectors[:-1] @ vectors[-1]
+            except Exception as e:
+                self.logger.warning(f"Chunk embedding failed, using BM25 only: {str(e)}")
+        ranking = [0] + sorted(range(1, len(chunks)), key=lambda i: (-scores[i], i))
+        selected = []
+        remaining = budget
+        for i in ranking:
+            tokens = self.count_tokens(chunks[i]) + 2
+            if tokens <= remaining:
+                selected.append(i)
+                remaining -= tokens
+        if not selected:
+            return self.token_counter.truncate(text, budget)
+        selected.sort()
+        parts = []
+        for previous, i in zip([-1] + selected, selected):
+            if i != previous + 1:
+                parts.append("[...]")
+            parts.append(chunks[i])
+        self.logger.info(f"Kept {len(selected)} of {len(chunks)} chunks relevant to the query to fit {budget} tokens.")
+        return "\n\n".join(parts)
+
     #@timer_decorator
     def compress_text_to_max_ctx(self, text) -> str:
         """
         Compress a text to fit within the maximum context size of the model.
         """
-        if self.tokenizer is None or self.model is None:
+        if not self.summarizer_ready():
             self.logger.warning("No tokenizer or model to perform memory compression.")
             return text
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        if ideal_ctx is None:
+        budget = self.get_token_budget()
+        if budget is None:
             self.logger.warning("No ideal context size found.")
             return text
-        while len(text) > ideal_ctx:
-            self.logger.info(f"Compressing text: {len(text)} > {ideal_ctx} model context.")
+        while self.count_tokens(text) > budget:
+            self.logger.info(f"Compressing text: {self.count_tokens(text)} tokens > {budget} tokens budget.")
             text = self.summarize(text)
         return text
 
@@ -290,7 +550,8 @@ Ensure the file exists in the specified location.
     memory.push('assistant', sample_text)
     
     print("\n---\nmemory before:", memory.get())
-    memory.compress()
+    memory.schedule_compression()
+    memory.wait_compression()
     print("\n---\nmemory after:", memory.get())
     #memory.save_memory()
     
\ No newline at end of file
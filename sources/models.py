@@ -0,0 +1,177 @@
+import os
+import glob
+import time
+import shutil
+import platform
+import threading
+from typing import Any, Callable, Dict
+
+from sources.logger import Logger
+
+TORCH_FOUND = True
+ONNX_FOUND = True
+
+try:
+    import torch
+except ImportError:
+    TORCH_FOUND = False
+
+try:
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+except ImportError:
+    ONNX_FOUND = False
+
+class ModelRegistry:
+    """
+    Process wide registry of the local models (summarizer, translators, router, speech to text).
+    Each model is loaded once, on first use, and shared by every agent of the process.
+    """
+    def __init__(self, quantize: bool = False, onnx: bool = False, onnx_dir: str = ".cache/onnx"):
+        """
+        Args:
+            quantize: default for dynamic int8 quantization of the models loaded on CPU
+            onnx: run the models supporting it with ONNX Runtime, int8 quantized
+            onnx_dir: folder of the exported ONNX models
+        """
+        self.quantize = quantize
+        self.onnx = onnx
+        self.onnx_dir = onnx_dir
+        self.models: Dict[str, Any] = {}
+        self.load_locks: Dict[str, threading.Lock] = {}
+        self.lock = threading.Lock()
+        self.logger = Logger("models.log")
+
+    def get(self, name: str, loader: Callable[[], Any], quantize: bool | None = None) -> Any:
+        """
+        Get a model, loading it on first use.
+        Concurrent callers asking for the same model wait for a single load.
+        Args:
+            name: unique name of the model in the registry
+            loader: function returning the model, called once
+            quantize: quantize the model to int8 if it runs on CPU, registry default if None
+        Returns:
+            the loaded model
+        """
+        if name in self.models:
+            return self.models[name]
+        with self.lock:
+            load_lock = self.load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            if name in self.models:
+                return self.models[name]
+            start = time.time()
+            model = loader()
+            if self.quantize if quantize is None else quantize:
+                model = self.quantize_model(model)
+            self.models[name] = model
+            self.logger.info(f"Loaded model {name} in {time.time() - start:.2f}s.")
+        return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self.models
+
+    def unload(self, name: str) -> None:
+        """Drop a model from the registry, it is loaded again on next use."""
+        with self.lock:
+            self.models.pop(name, None)
+
+    def quantize_model(self, model: Any) -> Any:
+        """
+        Apply dynamic int8 quantization to the linear layers of a model running on CPU.
+        Pipelines and (tokenizer, model) tuples are quantized in place, other objects are returned unchanged.
+        """
+        if not TORCH_FOUND:
+            return model
+        if isinstance(model, tuple):
+            return tuple(self.quantize_model(part) for part in model)
+        if hasattr(model, "model") and isinstance(model.model, torch.nn.Module):
+            model.model = self.quantize_model(model.model)
+            return model
+        if not isinstance(model, torch.nn.Module):
+            return model
+        param = next(model.parameters(), None)
+        if param is None or param.device.type != "cpu":
+            return model
+        self.logger.info(f"Quantizing {type(model).__name__} to int8.")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def use_onnx(self) -> bool:
+        return self.onnx and ONNX_FOUND
+
+    def load_onnx(self, model_id: str, ort_class: Any, **kwargs) -> Any | None:
+        """
+        Load a HuggingFace model with ONNX Runtime, dynamically quantized to int8.
+        The model is exported and quantized once in onnx_dir, then loaded from there.
+        Args:
+            model_id: HuggingFace model name
+            ort_class: optimum ORTModel class of the task, e.g. ORTModelForSeq2SeqLM
+        Returns:
+            the ONNX Runtime model, None if ONNX is disabled or failed, the caller then use PyTorch
+        """
+        if not self.use_onnx():
+            return None
+        export_dir = os.path.join(self.onnx_dir, model_id.replace("/", "--"))
+        quantized_dir = export_dir + "-int8"
+        try:
+            if not os.path.exists(os.path.join(quantized_dir, "config.json")):
+                self.export_quantized(model_id, ort_class, export_dir, quantized_dir)
+            model = ort_class.from_pretrained(quantized_dir, **kwargs)
+        except Exception as e:
+            self.logger.warning(f"ONNX Runtime unavailable for {model_id}, using PyTorch: {str(e)}")
+            return None
+        self.logger.info(f"Loaded {model_id} with ONNX Runtime int8.")
+        return model
+
+    def export_quantized(self, model_id: str, ort_class: Any, export_dir: str, quantized_dir: str) -> None:
+        """Export a model to ONNX and write its dynamic int8 quantized version."""
+        self.logger.info(f"Exporting {model_id} to ONNX.")
+        ort_class.from_pretrained(model_id, export=True).save_pretrained(export_dir)
+        if platform.machine().lower() in ["arm64", "aarch64"]:
+            qconfig = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+        else:
+            qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        tmp_dir = quantized_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        for onnx_path in glob.glob(os.path.join(export_dir, "*.onnx")):
+            quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=os.path.basename(onnx_path))
+            quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+        # the quantized files are suffixed, keep the exported names so the ORT classes find them
+        for quantized_path in glob.glob(os.path.join(tmp_dir, "*_quantized.onnx")):
+            os.replace(quantized_path, quantized_path.replace("_quantized.onnx", ".onnx"))
+        for path in glob.glob(os.path.join(export_dir, "*")):
+            target = os.path.join(tmp_dir, os.path.basename(path))
+            if not path.endswith(".onnx") and not os.path.exists(target) and os.path.isfile(path):
+                shutil.copy(path, target)
+        shutil.rmtree(quantized_dir, ignore_errors=True)
+        os.replace(tmp_dir, quantized_dir)
+
+registry = ModelRegistry()
+
+def get_model(name: str, loader: Callable[[], Any], quantize: bool | None = None) -> Any:
+    """Get a model from the process wide registry, see ModelRegistry.get."""
+    return registry.get(name, loader, quantize)
+
+def set_quantization(enabled: bool) -> None:
+    """Enable int8 quantization for the models loaded on CPU from now on."""
+    registry.quantize = enabled
+
+def set_onnx(enabled: bool) -> None:
+    """Run the models loaded from now on with ONNX Runtime int8 when possible."""
+    registry.onnx = enabled
+    if enabled and not ONNX_FOUND:
+        registry.logger.warning("ONNX Runtime requested but optimum is not installed, run: pip install optimum[onnxruntime]")
+
+def onnx_enabled() -> bool:
+    return registry.use_onnx()
+
+def load_onnx(model_id: str, ort_class_name: str, **kwargs) -> Any | None:
+    """
+    Load a model with ONNX Runtime int8 if enabled, see ModelRegistry.load_onnx.
+    Args:
+        ort_class_name: name of the optimum.onnxruntime class, e.g. "ORTModelForSeq2SeqLM"
+    """
+    if not registry.use_onnx():
+        return None
+    import optimum.onnxruntime
+    return registry.load_onnx(model_id, getattr(optimum.onnxruntime, ort_class_name), **kwargs)
@@ -0,0 +1,92 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Tuple
+
+from sources.logger import Logger
+
+class Prefetcher:
+    """
+    Load pages speculatively on a worker pool, while the agent is still choosing where to go.
+    The results are kept in a bounded cache, oldest first out, and expire after max_age seconds.
+    """
+    def __init__(self, load: Callable[[str], Any], workers: int = 4, cache_size: int = 16, max_age: float = 300.0):
+        """
+        Args:
+            load: load a url, run on the worker threads, its result is cached (None included)
+            workers: number of parallel loads
+            cache_size: maximum number of cached or pending urls
+            max_age: seconds a cached result stays valid
+        """
+        self.load = load
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.cache = OrderedDict() # url -> (submit time, future)
+        self.lock = threading.Lock()
+        self.logger = Logger("browser.log")
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, urls: List[str]) -> int:
+        """
+        Start loading the urls that are not cached yet.
+        Returns:
+            int: number of loads started
+        """
+        started = 0
+        with self.lock:
+            self.expire()
+            for url in urls[:self.cache_size]:
+                if url in self.cache:
+                    self.cache.move_to_end(url)
+                    continue
+                self.cache[url] = (time.time(), self.executor.submit(self.load, url))
+                started += 1
+            while len(self.cache) > self.cache_size:
+                _, (_, future) = self.cache.popitem(last=False)
+                future.cancel()
+        if started:
+            self.logger.info(f"Prefetching {started} pages.")
+        return started
+
+    def expire(self) -> None:
+        now = time.time()
+        for url in [url for url, (submitted, _) in self.cache.items() if now - submitted > self.max_age]:
+            self.cache.pop(url)[1].cancel()
+
+    def take(self, url: str, timeout: float | None = None) -> Tuple[bool, Any]:
+        """
+        Take the prefetched result of a url out of the cache, waiting for it if it is still loading.
+        Returns:
+            Tuple[bool, Any]: (True, result) if the url was prefetched, (False, None) otherwise
+        """
+        with self.lock:
+            self.expire()
+            entry = self.cache.pop(url, None)
+        if entry is None or entry[1].cancelled():
+            self.misses += 1
+            return False, None
+        future: Future = entry[1]
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.misses += 1
+            return False, None
+        except Exception as e:
+            self.logger.warning(f"Prefetch of {url} failed: {str(e)}")
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, result
+
+    def clear(self) -> None:
+        with self.lock:
+            for _, future in self.cache.values():
+                future.cancel()
+            self.cache.clear()
+
+    def close(self) -> None:
+        self.clear()
+        self.executor.shutdown(wait=False)
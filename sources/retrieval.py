@@ -0,0 +1,175 @@
+import re
+import math
+import hashlib
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+
+from sources.models import get_model
+
+TRANSFORMERS_FOUND = True
+
+try:
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+except ImportError:
+    TRANSFORMERS_FOUND = False
+
+# CJK characters are words on their own, the other scripts are split on non word characters
+WORD_PATTERN = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[^\\W_]+')
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def tokenize(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+def split_chunks(text: str, max_chars: int = 1000) -> List[str]:
+    """
+    Split a text in chunks of consecutive paragraphs, blank line separated, of at most max_chars.
+    Paragraphs longer than max_chars are cut in pieces.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph[start:start + max_chars] for start in range(0, len(paragraph), max_chars)]
+        for piece in pieces:
+            if current and size + len(piece) > max_chars:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+class SentenceEmbedder:
+    """
+    Small local sentence embedding model, mean pooled and L2 normalized embeddings.
+    """
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", max_length: int = 256):
+        self.model_name = model_name
+        self.max_length = max_length
+
+    def load(self) -> tuple:
+        if not TRANSFORMERS_FOUND:
+            raise ImportError("transformers is not installed, run: pip install transformers")
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModel.from_pretrained(self.model_name)
+        model.eval()
+        return tokenizer, model
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Embed texts.
+        Args:
+            texts: the texts to embed
+            batch_size: texts per forward pass
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dim), rows of unit norm
+        """
+        tokenizer, model = get_model(self.model_name, self.load)
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            inputs = tokenizer(batch, padding=True, truncation=True, max_length=self.max_length, return_tensors="pt")
+            with torch.no_grad():
+                hidden = model(**inputs).last_hidden_state
+            mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            embeddings.append(torch.nn.functional.normalize(pooled, dim=-1).cpu().numpy())
+        return np.concatenate(embeddings).astype(np.float32)
+
+class FlatIndex:
+    """
+    Exact nearest neighbours index over unit vectors, searched by inner product.
+    Vectors are keyed by an id, adding an existing id is a no-op.
+    """
+    def __init__(self):
+        self.keys: List[str] = []
+        self.positions = {}
+        self.vectors = None
+        self.size = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.positions
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, keys: List[str], vectors: np.ndarray) -> None:
+        new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self.positions]
+        if not new:
+            return
+        if self.vectors is None:
+            self.vectors = np.zeros((max(64, len(new)), vectors.shape[1]), dtype=np.float32)
+        if self.size + len(new) > len(self.vectors):
+            capacity = max(len(self.vectors) * 2, self.size + len(new))
+            grown = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        for key, vector in new:
+            self.positions[key] = self.size
+            self.keys.append(key)
+            self.vectors[self.size] = vector
+            self.size += 1
+
+    def search(self, query: np.ndarray, k: int, keys: List[str] = None) -> List[Tuple[str, float]]:
+        """
+        Find the k vectors most similar to the query.
+        Args:
+            query: unit vector
+            k: number of results
+            keys: restrict the search to these ids
+        Returns:
+            List[Tuple[str, float]]: (id, similarity) pairs, most similar first
+        """
+        if self.size == 0 or k <= 0:
+            return []
+        if keys is None:
+            keys = self.keys
+        rows = np.array([self.positions[key] for key in keys if key in self.positions], dtype=np.int64)
+        if len(rows) == 0:
+            return []
+        scores = self.vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.keys[rows[i]], float(scores[i])) for i in top]
+
+class BM25:
+    """
+    Okapi BM25 lexical scorer over a small set of documents, e.g. the chunks of a page.
+    """
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.frequencies = [Counter(tokenize(document)) for document in documents]
+        self.lengths = np.array([sum(frequency.values()) for frequency in self.frequencies], dtype=np.float32)
+        self.average_length = float(self.lengths.mean()) if len(documents) else 0.0
+        document_frequency = Counter(term for frequency in self.frequencies for term in frequency)
+        count = len(documents)
+        self.idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        Score every document against a query.
+        Returns:
+            np.ndarray: one score per document, 0 when no query term appears in it
+        """
+        scores = np.zeros(len(self.frequencies), dtype=np.float32)
+        if not self.frequencies or self.average_length == 0:
+            return scores
+        norms = self.k1 * (1 - self.b + self.b * self.lengths / self.average_length)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            tf = np.array([frequency.get(term, 0) for frequency in self.frequencies], dtype=np.float32)
+            scores += idf * tf * (self.k1 + 1) / (tf + norms)
+        return scores
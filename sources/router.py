@@ -1,10 +1,20 @@
 import os
+import re
 import sys
+import copy
+import glob
+import json
+import time
 import torch
 import random
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from contextlib import contextmanager
 from typing import List, Tuple, Type, Dict
 
-from transformers import pipeline
+from transformers import pipeline, AutoTokenizer
 from adaptive_classifier import AdaptiveClassifier
 
 from sources.agents.agent import Agent
@@ -15,21 +25,213 @@ from sources.agents.browser_agent import BrowserAgent
 from sources.language import LanguageUtility
 from sources.utility import pretty_print, animate_thinking, timer_decorator
 from sources.logger import Logger
+from sources.models import get_model, load_onnx, onnx_enabled
+
+class RoutingCache:
+    """
+    Bounded LRU cache of routing decisions with a time to live.
+    Entries are keyed by the query language and normalized first sentence,
+    the whole cache is dropped when the version (agents, few shots) change.
+    """
+    def __init__(self, max_entries: int = 512, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = re.sub(r"\s+", " ", text.strip().lower())
+        return text.rstrip(" .!?。！？")
+
+    def make_key(self, lang: str, sentence: str) -> tuple:
+        return (lang, self.normalize(sentence))
+
+    def check_version(self, version: str) -> None:
+        """Clear the cache if the routing setup changed since the entries were stored."""
+        with self.lock:
+            if version != self.version:
+                if self.entries:
+                    self.invalidations += 1
+                self.entries.clear()
+                self.version = version
+
+    def get(self, key: tuple) -> str | None:
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or now - entry[1] > self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: tuple, role: str) -> None:
+        with self.lock:
+            self.entries[key] = (role, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total > 0 else 0.0,
+                "invalidations": self.invalidations
+            }
+
+class RuleRouter:
+    """
+    Rule based pre-router, decide the unambiguous queries before the routing models.
+    A query is routed by the rules when the patterns and keywords of a single role match it,
+    queries matching several roles or a fall through pattern (multi step tasks) are left to the models.
+    """
+    def __init__(self, rules: dict = None):
+        """
+        Args:
+            rules: {"fall_through": {name: regex}, "patterns": {role: {name: regex}}, "keywords": {role: [phrases]}}
+        """
+        rules = rules or {}
+        self.fall_through = [(name, re.compile(pattern, re.IGNORECASE))
+                             for name, pattern in rules.get("fall_through", {}).items()]
+        self.rules: Dict[str, List[Tuple[str, re.Pattern]]] = {}
+        for role, patterns in rules.get("patterns", {}).items():
+            self.rules.setdefault(role, []).extend((name, re.compile(pattern, re.IGNORECASE))
+                                                   for name, pattern in patterns.items())
+        for role, keywords in rules.get("keywords", {}).items():
+            if not keywords:
+                continue
+            # ascii keywords match whole words, the others (CJK) anywhere
+            alternatives = [rf"(?<!\w){re.escape(keyword)}(?!\w)" if keyword.isascii() else re.escape(keyword)
+                            for keyword in keywords]
+            self.rules.setdefault(role, []).append(("keywords", re.compile("|".join(alternatives), re.IGNORECASE)))
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleRouter":
+        """Load the rules from a JSON file, no rules if the file does not exist."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def match(self, text: str, roles: List[str]) -> Tuple[str, str] | None:
+        """
+        Route a query with the rules.
+        Args:
+            text: The query
+            roles: The roles of the available agents
+        Returns:
+            Tuple[str, str] | None: (role, name of the matching rule), None if the rules can't decide
+        """
+        if any(pattern.search(text) for _, pattern in self.fall_through):
+            return None
+        matches = {}
+        for role, rules in self.rules.items():
+            if role not in roles:
+                continue
+            name = next((name for name, pattern in rules if pattern.search(text)), None)
+            if name is not None:
+                matches[role] = name
+        if len(matches) != 1:
+            return None
+        return next(iter(matches.items()))
 
 class AgentRouter:
     """
     AgentRouter is a class that selects the appropriate agent based on the user query.
     """
-    def __init__(self, agents: list, supported_language: List[str] = ["en", "fr", "zh"]):
+    # keywords of the fallback routing used while the models load
+    fallback_keywords = {
+        "web": ["search", "web", "browse", "online", "internet", "news", "find out", "look up", "latest",
+                "cherche", "recherche", "搜索", "网上", "新闻"],
+        "code": ["code", "script", "program", "python", "javascript", "java", "c++", "golang", "bash", "debug", "function",
+                 "écris un script", "programme", "代码", "脚本", "程序"],
+        "files": ["file", "folder", "directory", "drive", "documents", "downloads", "desktop",
+                  "fichier", "dossier", "文件", "文件夹"],
+        "mcp": ["mcp"],
+    }
+
+    def __init__(self, agents: list, supported_language: List[str] = ["en", "fr", "zh"], warm_up: bool = True):
+        """
+        Args:
+            agents: the agents to route between
+            supported_language: languages of the user queries
+            warm_up: load the routing models in a background thread right away,
+                     otherwise they are loaded by the first call to load_models
+        """
         self.agents = agents
         self.logger = Logger("router.log")
+        self.router_path = "../llm_router" if __name__ == "__main__" else "./llm_router"
         self.lang_analysis = LanguageUtility(supported_language=supported_language)
-        self.pipelines = self.load_pipelines()
-        self.talk_classifier = self.load_llm_router()
-        self.complexity_classifier = self.load_llm_router()
-        self.learn_few_shots_tasks()
-        self.learn_few_shots_complexity()
+        self.pipelines = None
+        self.talk_classifier = None
+        self.complexity_classifier = None
+        self.ready = threading.Event()
+        self.embedding_lock = threading.Lock()
+        # below this task confidence the BART zero-shot model breaks the tie
+        self.tiebreak_confidence = 0.6
+        self.load_error = None
+        self.load_thread = None
         self.asked_clarify = False
+        self.cache = RoutingCache()
+        self.few_shots_version = None
+        self.rules = RuleRouter.from_file(os.path.join(self.router_path, "rules.json"))
+        # number of queries decided by each path: rules, cache, models or fallback
+        self.decisions = {"rules": 0, "cache": 0, "models": 0, "fallback": 0}
+        if warm_up:
+            self.load_thread = threading.Thread(target=self.load_models, daemon=True, name="router-warm-up")
+            self.load_thread.start()
+
+    def load_models(self) -> None:
+        """
+        Load the routing and translation models, routing switch from the keyword fallback once done.
+        """
+        try:
+            pipelines = self.load_pipelines()
+            # the adaptive classifiers keep their learned examples, they are not quantized
+            talk_classifier, complexity_classifier = get_model("llm_router_heads", self.load_router_heads, quantize=False)
+            self.lang_analysis.load_model()
+        except Exception as e:
+            self.load_error = str(e)
+            self.logger.error(f"Failed to load the routing models: {str(e)}")
+            pretty_print(f"Router models failed to load, using keyword routing: {str(e)}", color="failure")
+            return
+        self.pipelines = pipelines
+        self.talk_classifier = talk_classifier
+        self.complexity_classifier = complexity_classifier
+        self.few_shots_version = self.few_shots_hash()
+        self.ready.set()
+        self.logger.info("Router models ready.")
+
+    def is_ready(self) -> bool:
+        return self.ready.is_set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Wait for the routing models, return True if they are ready."""
+        return self.ready.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "loading": self.load_thread is not None and self.load_thread.is_alive(),
+            "error": self.load_error
+        }
     
     def load_pipelines(self) -> Dict[str, Type[pipeline]]:
         """
@@ -37,9 +239,15 @@ class AgentRouter:
         returns:
             Dict[str, Type[pipeline]]: The loaded pipelines
         """
-        animate_thinking("Loading zero-shot pipeline...", color="status")
+        def load_bart():
+            animate_thinking("Loading zero-shot pipeline...", color="status")
+            model = load_onnx("facebook/bart-large-mnli", "ORTModelForSequenceClassification")
+            if model is not None:
+                tokenizer = AutoTokenizer.from_pretrained("facebook/bart-large-mnli")
+                return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+            return pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
         return {
-            "bart": pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+            "bart": get_model("bart-large-mnli", load_bart)
         }
 
     def load_llm_router(self) -> AdaptiveClassifier:
@@ -50,14 +258,32 @@ class AgentRouter:
         exceptions:
             Exception: If the safetensors fails to load
         """
-        path = "../llm_router" if __name__ == "__main__" else "./llm_router"
         try:
             animate_thinking("Loading LLM router model...", color="status")
-            talk_classifier = AdaptiveClassifier.from_pretrained(path)
+            # adaptive-classifier picks ONNX on CPU by default, follow use_onnx instead
+            talk_classifier = AdaptiveClassifier.from_pretrained(self.router_path, use_onnx=onnx_enabled())
         except Exception as e:
             raise Exception("Failed to load the routing model. Please run the dl_safetensors.sh script inside llm_router/ directory to download the model.")
         return talk_classifier
 
+    def load_router_heads(self) -> Tuple[AdaptiveClassifier, AdaptiveClassifier]:
+        """
+        Load the LLM router model once and build the tasks and complexity classifiers from it.
+        Both share the encoder, they score the same query embedding.
+        returns:
+            Tuple[AdaptiveClassifier, AdaptiveClassifier]: the tasks and complexity classifiers
+        """
+        task_classifier = self.load_llm_router()
+        complexity_classifier = self.share_encoder(task_classifier)
+        self.learn_few_shots_tasks(task_classifier)
+        self.learn_few_shots_complexity(complexity_classifier)
+        return task_classifier, complexity_classifier
+
+    def share_encoder(self, classifier: AdaptiveClassifier) -> AdaptiveClassifier:
+        """Copy a classifier with its own examples and head, on the same encoder and tokenizer."""
+        shared = {id(classifier.model): classifier.model, id(classifier.tokenizer): classifier.tokenizer}
+        return copy.deepcopy(classifier, shared)
+
     def get_device(self) -> str:
         if torch.backends.mps.is_available():
             return "mps"
@@ -66,322 +292,183 @@ class AgentRouter:
         else:
             return "cpu"
     
-    def learn_few_shots_complexity(self) -> None:
+    def learn_few_shots_complexity(self, classifier: AdaptiveClassifier) -> None:
         """
         Few shot learning for complexity estimation.
         Use the build in add_examples method of the Adaptive_classifier.
         """
-        few_shots = [
-            ("hi", "LOW"),
-            ("How it's going ?", "LOW"),
-            ("What’s the weather like today?", "LOW"),
-            ("Can you find a file named ‘notes.txt’ in my Documents folder?", "LOW"),
-            ("Write a Python script to generate a random password", "LOW"),
-            ("Debug this JavaScript code that’s not running properly", "LOW"),
-            ("Search the web for the cheapest laptop under $500", "LOW"),
-            ("Locate a file called ‘report_2024.pdf’ on my drive", "LOW"),
-            ("Check if a folder named ‘Backups’ exists on my system", "LOW"),
-            ("Can you find ‘family_vacation.mp4’ in my Videos folder?", "LOW"),
-            ("Search my drive for a file named ‘todo_list.xlsx’", "LOW"),
-            ("Write a Python function to check if a string is a palindrome", "LOW"),
-            ("Can you search the web for startups in Berlin?", "LOW"),
-            ("Find recent articles on blockchain technology online", "LOW"),
-            ("Check if ‘Personal_Projects’ folder exists on my desktop", "LOW"),
-            ("Create a bash script to list all running processes", "LOW"),
-            ("Debug this Python script that’s crashing on line 10", "LOW"),
-            ("Browse the web to find out who invented Python", "LOW"),
-            ("Locate a file named ‘shopping_list.txt’ on my system", "LOW"),
-            ("Search the web for tips on staying productive", "LOW"),
-            ("Find ‘sales_pitch.pptx’ in my Downloads folder", "LOW"),
-            ("can you find a file called resume.docx on my drive?", "LOW"),
-            ("can you write a python script to check if the device on my network is connected to the internet", "LOW"),
-            ("can you debug this Java code? It’s not working.", "LOW"),
-            ("can you find the old_project.zip file somewhere on my drive?", "LOW"),
-            ("can you locate the backup folder I created last month on my system?", "LOW"),
-            ("could you check if the presentation.pdf file exists in my downloads?", "LOW"),
-            ("search my drive for a file called vacation_photos_2023.jpg.", "LOW"),
-            ("help me organize my desktop files into folders by type.", "LOW"),
-            ("make a blackjack in golang", "LOW"),
-            ("write a python script to ping a website", "LOW"),
-            ("write a simple Java program to print 'Hello World'", "LOW"),
-            ("write a Java program to calculate the area of a circle", "LOW"),
-            ("write a Python function to sort a list of dictionaries by key", "LOW"),
-            ("can you search for startup in tokyo?", "LOW"),
-            ("find the latest updates on quantum computing on the web", "LOW"),
-            ("check if the folder ‘Work_Projects’ exists on my desktop", "LOW"),
-            (" can you browse the web, use overpass-turbo to show fountains in toulouse", "LOW"),
-            ("search the web for the best budget smartphones of 2025", "LOW"),
-            ("write a Python script to download all images from a webpage", "LOW"),
-            ("create a bash script to monitor CPU usage", "LOW"),
-            ("debug this C++ code that keeps crashing", "LOW"),
-            ("can you browse the web to find out who fosowl is ?", "LOW"),
-            ("find the file ‘important_notes.txt’", "LOW"),
-            ("search the web for the best ways to learn a new language", "LOW"),
-            ("locate the file ‘presentation.pptx’ in my Documents folder", "LOW"),
-            ("Make a 3d game in javascript using three.js", "LOW"),
-            ("Find the latest research papers on AI and build save in a file", "HIGH"),
-            ("Make a web server in go that serve a simple html page", "LOW"),
-            ("Search the web for the cheapest 4K monitor and provide a link", "LOW"),
-            ("Write a JavaScript function to reverse a string", "LOW"),
-            ("Can you locate a file called ‘budget_2025.xlsx’ on my system?", "LOW"),
-            ("Search the web for recent articles on space exploration", "LOW"),
-            ("when is the exam period for master student in france?", "LOW"),
-            ("Check if a folder named ‘Photos_2024’ exists on my desktop", "LOW"),
-            ("Can you look up some nice knitting patterns on that web thingy?", "LOW"),
-            ("Goodness, check if my ‘Photos_Grandkids’ folder is still on the desktop", "LOW"),
-            ("Create a Python script to rename all files in a folder based on their creation date", "LOW"),
-            ("Can you find a file named ‘meeting_notes.txt’ in my Downloads folder?", "LOW"),
-            ("Write a Go program to check if a port is open on a network", "LOW"),
-            ("Search the web for the latest electric car reviews", "LOW"),
-            ("Write a Python function to merge two sorted lists", "LOW"),
-            ("Create a bash script to monitor disk space and alert via text file", "LOW"),
-            ("What’s out there on the web about cheap travel spots?", "LOW"),
-            ("Search X for posts about AI ethics and summarize them", "LOW"),
-            ("Check if a file named ‘project_proposal.pdf’ exists in my Documents", "LOW"),
-            ("Search the web for tips on improving coding skills", "LOW"),
-            ("Write a Python script to count words in a text file", "LOW"),
-            ("Search the web for restaurant", "LOW"),
-            ("Use a MCP to find the latest stock market data", "LOW"),
-            ("Use a MCP to send an email to my boss", "LOW"),
-            ("Could you use a MCP to find the latest news on climate change?", "LOW"),
-            ("Create a simple HTML page with CSS styling", "LOW"),
-            ("Use file.txt and then use it to ...", "HIGH"),
-            ("Yo, what’s good? Find my ‘mixtape.mp3’ real quick", "LOW"),
-            ("Can you follow the readme and install the project", "HIGH"),
-            ("Man, write me a dope Python script to flex some random numbers", "LOW"),
-            ("Search the web for peer-reviewed articles on gene editing", "LOW"),
-            ("Locate ‘meeting_notes.docx’ in Downloads, I’m late for this call", "LOW"),
-            ("Make the game less hard", "LOW"),
-            ("Why did it fail?", "LOW"),
-            ("Write a Python script to list all .pdf files in my Documents", "LOW"),
-            ("Write a Python thing to sort my .jpg files by date", "LOW"),
-            ("make a snake game please", "LOW"),
-            ("Find ‘gallery_list.pdf’, then build a web app to show my pics", "HIGH"),
-            ("Find ‘budget_2025.xlsx’, analyze it, and make a chart for my boss", "HIGH"),
-            ("I want you to make me a plan to travel to Tainan", "HIGH"),
-            ("Retrieve the latest publications on CRISPR and develop a web application to display them", "HIGH"),
-            ("Bro dig up a music API and build me a tight app for the hottest tracks", "HIGH"),
-            ("Find a public API for sports scores and build a web app to show live updates", "HIGH"),
-            ("Find a public API for book data and create a Flask app to list bestsellers", "HIGH"),
-            ("Organize my desktop files by extension and then write a script to list them", "HIGH"),
-            ("Find the latest research on renewable energy and build a web app to display it", "HIGH"),
-            ("search online for popular sci-fi movies from 2024 and pick three to watch tonight. Save the list in movie_night.txt", "HIGH"),
-            ("can you find vitess repo, clone it and install by following the readme", "HIGH"),
-            ("Create a JavaScript game using Phaser.js with multiple levels", "HIGH"),
-            ("Search the web for the latest trends in web development and build a sample site", "HIGH"),
-            ("Use my research_note.txt file, double check the informations on the web", "HIGH"),
-            ("Make a web server in go that query a flight API and display them in a app", "HIGH"),
-            ("Search the web for top cafes in Rennes, France, and save a list of three with their addresses in rennes_cafes.txt.", "HIGH"),
-            ("Search the web for the latest trends in AI and demo it in pytorch", "HIGH"),
-            ("can you lookup for api that track flight and build a web flight tracking app", "HIGH"),
-            ("Find the file toto.pdf then use its content to reply to Jojo on superforum.com", "HIGH"),
-            ("Create a whole web app in python using the flask framework that query news API", "HIGH"),
-            ("Create a bash script that monitor the CPU usage and send an email if it's too high", "HIGH"),
-            ("Make a web search for latest news on the stock market and display them with python", "HIGH"),
-            ("Find my resume file, apply to job that might fit online", "HIGH"),
-            ("Can you find a weather API and build a Python app to display current weather", "HIGH"),
-            ("Create a Python web app using Flask to track cryptocurrency prices from an API", "HIGH"),
-            ("Search the web for tutorials on machine learning and build a simple ML model in Python", "HIGH"),
-            ("Find a public API for movie data and build a web app to display movie ratings", "HIGH"),
-            ("Create a Node.js server that queries a public API for traffic data and displays it", "HIGH"),
-            ("can you find api and build a python web app with it ?", "HIGH"),
-            ("do a deep search of current AI player for 2025 and make me a report in a file", "HIGH"),
-            ("Find a public API for recipe data and build a web app to display recipes", "HIGH"),
-            ("Search the web for recent space mission updates and build a Flask app", "HIGH"),
-            ("Create a Python script to scrape a website and save data to a database", "HIGH"),
-            ("Find a shakespear txt then train a transformers on it to generate text", "HIGH"),
-            ("Find a public API for fitness tracking and build a web app to show stats", "HIGH"),
-            ("Search the web for tutorials on web development and build a sample site", "HIGH"),
-            ("Create a Node.js app to query a public API for event listings and display them", "HIGH"),
-            ("Find a file named ‘budget.xlsx’, analyze its data, and generate a chart", "HIGH"),
-        ]
-        random.shuffle(few_shots)
-        texts = [text for text, _ in few_shots]
-        labels = [label for _, label in few_shots]
-        self.complexity_classifier.add_examples(texts, labels)
-
-    def learn_few_shots_tasks(self) -> None:
+        self.learn_few_shots(classifier, "complexity")
+
+    def learn_few_shots_tasks(self, classifier: AdaptiveClassifier) -> None:
         """
         Few shot learning for tasks classification.
         Use the build in add_examples method of the Adaptive_classifier.
         """
-        few_shots = [
-            ("Write a python script to check if the device on my network is connected to the internet", "coding"),
-            ("Hey could you search the web for the latest news on the tesla stock market ?", "web"),
-            ("I would like you to search for weather api", "web"),
-            ("Plan a 3-day trip to New York, including flights and hotels.", "web"),
-            ("Find on the web the latest research papers on AI.", "web"),
-            ("Can you debug this Java code? It’s not working.", "code"),
-            ("Can you browse the web and find me a 4090 for cheap?", "web"),
-            ("i would like to setup a new AI project, index as mark2", "files"),
-            ("Hey, can you find the old_project.zip file somewhere on my drive?", "files"),
-            ("Tell me a funny story", "talk"),
-            ("can you make a snake game in python", "code"),
-            ("Can you locate the backup folder I created last month on my system?", "files"),
-            ("Share a random fun fact about space.", "talk"),
-            ("Write a script to rename all files in a directory to lowercase.", "files"),
-            ("Could you check if the presentation.pdf file exists in my downloads?", "files"),
-            ("Tell me about the weirdest dream you’ve ever heard of.", "talk"),
-            ("Search my drive for a file called vacation_photos_2023.jpg.", "files"),
-            ("Help me organize my desktop files into folders by type.", "files"),
-            ("What’s your favorite movie and why?", "talk"),
-            ("what directory are you in ?", "files"),
-            ("what files you seing rn ?", "files"),
-            ("When is the period of university exam in france ?", "web"),
-            ("Search my drive for a file named budget_2024.xlsx", "files"),
-            ("Write a Python function to sort a list of dictionaries by key", "code"),
-            ("Find the latest updates on quantum computing on the web", "web"),
-            ("Check if the folder ‘Work_Projects’ exists on my desktop", "files"),
-            ("Create a bash script to monitor CPU usage", "code"),
-            ("Search online for the best budget smartphones of 2025", "web"),
-            ("What’s the strangest food combination you’ve heard of?", "talk"),
-            ("Move all .txt files from Downloads to a new folder called Notes", "files"),
-            ("Debug this C++ code that keeps crashing", "code"),
-            ("can you browse the web to find out who fosowl is ?", "web"),
-            ("Find the file ‘important_notes.txt’", "files"),
-            ("Find out the latest news on the upcoming Mars mission", "web"),
-            ("Write a Java program to calculate the area of a circle", "code"),
-            ("Search the web for the best ways to learn a new language", "web"),
-            ("Locate the file ‘presentation.pptx’ in my Documents folder", "files"),
-            ("Write a Python script to download all images from a webpage", "code"),
-            ("Search the web for the latest trends in AI and machine learning", "web"),
-            ("Tell me about a time when you had to solve a difficult problem", "talk"),
-            ("Organize all image files on my desktop into a folder called ‘Pictures’", "files"),
-            ("Generate a Ruby script to calculate Fibonacci numbers up to 100", "code"),
-            ("Find out what device are connected to my network", "code"),
-            ("Show me how much disk space is left on my drive", "code"),
-            ("Look up recent posts on X about climate change", "web"),
-            ("Find the photo I took last week named sunset_beach.jpg", "files"),
-            ("Write a JavaScript snippet to fetch data from an API", "code"),
-            ("Search the web for tutorials on machine learning with Python", "web"),
-            ("Locate the file ‘meeting_notes.docx’ in my Documents folder", "files"),
-            ("Write a Python script to scrape a website’s title and links", "code"),
-            ("Search the web for the latest breakthroughs in fusion energy", "web"),
-            ("Tell me about a historical event that sounds too wild to be true", "talk"),
-            ("Organize all image files on my desktop into a folder called ‘Pictures’", "files"),
-            ("Generate a Ruby script to calculate Fibonacci numbers up to 100", "code"),
-            ("Find recent X posts about SpaceX’s next rocket launch", "web"),
-            ("What’s the funniest misunderstanding you’ve seen between humans and AI?", "talk"),
-            ("Check if ‘backup_032025.zip’ exists anywhere on my drive", "files" ),
-            ("Create a shell script to automate backups of a directory", "code"),
-            ("Look up the top AI conferences happening in 2025 online", "web"),
-            ("Write a C# program to simulate a basic calculator", "code"),
-            ("Browse the web for open-source alternatives to Photoshop", "web"),
-            ("Hey how are you", "talk"),
-            ("Write a Python script to ping a website", "code"),
-            ("Search the web for the latest iPhone release", "web"),
-            ("What’s the weather like today?", "web"),
-            ("Hi, how’s your day going?", "talk"),
-            ("Can you find a file called resume.docx on my drive?", "files"),
-            ("Write a simple Java program to print 'Hello World'", "code"),
-            ("can you find the current stock of Tesla?", "web"),
-            ("Tell me a quick joke", "talk"),
-            ("Search online for the best coffee shops in Seattle", "web"),
-            ("Check if ‘project_plan.pdf’ exists in my Downloads folder", "files"),
-            ("What’s your favorite color?", "talk"),
-            ("Write a bash script to list all files in a directory", "code"),
-            ("Find recent X posts about electric cars", "web"),
-            ("Hey, you doing okay?", "talk"),
-            ("Locate the file ‘family_photo.jpg’ on my system", "files"),
-            ("Search the web for beginner guitar lessons", "web"),
-            ("Write a Python function to reverse a string", "code"),
-            ("What’s the weirdest animal you know of?", "talk"),
-            ("Organize all .pdf files on my desktop into a ‘Documents’ folder", "files"),
-            ("Browse the web for the latest space mission updates", "web"),
-            ("Hey, what’s up with you today?", "talk"),
-            ("Write a JavaScript function to add two numbers", "code"),
-            ("Find the file ‘notes.txt’ in my Documents folder", "files"),
-            ("Tell me something random about the ocean", "talk"),
-            ("Search the web for cheap flights to Paris", "web"),
-            ("Check if ‘budget.xlsx’ is on my drive", "files"),
-            ("Write a Python script to count words in a text file", "code"),
-            ("How’s it going today?", "talk"),
-            ("Find recent X posts about AI advancements", "web"),
-            ("Move all .jpg files from Downloads to a ‘Photos’ folder", "files"),
-            ("Search online for the best laptops of 2025", "web"),
-            ("What’s the funniest thing you’ve heard lately?", "talk"),
-            ("Write a Ruby script to generate random numbers", "code"),
-            ("Hey, how’s everything with you?", "talk"),
-            ("Locate ‘meeting_agenda.docx’ in my system", "files"),
-            ("Search the web for tips on growing indoor plants", "web"),
-            ("Write a C++ program to calculate the sum of an array", "code"),
-            ("Tell me a fun fact about dogs", "talk"),
-            ("Check if the folder ‘Old_Projects’ exists on my desktop", "files"),
-            ("Browse the web for the latest gaming console reviews", "web"),
-            ("Hi, how are you feeling today?", "talk"),
-            ("Write a Python script to check disk space", "code"),
-            ("Find the file ‘vacation_itinerary.pdf’ on my drive", "files"),
-            ("Search the web for news on renewable energy", "web"),
-            ("What’s the strangest thing you’ve learned recently?", "talk"),
-            ("Organize all video files into a ‘Videos’ folder", "files"),
-            ("Write a shell script to delete temporary files", "code"),
-            ("Hey, how’s your week been so far?", "talk"),
-            ("Search online for the top movies of 2025", "web"),
-            ("Locate ‘taxes_2024.xlsx’ in my Documents folder", "files"),
-            ("Tell me about a cool invention from history", "talk"),
-            ("Write a Java program to check if a number is even or odd", "code"),
-            ("Find recent X posts about cryptocurrency trends", "web"),
-            ("Hey, you good today?", "talk"),
-            ("Search the web for easy dinner recipes", "web"),
-            ("Check if ‘photo_backup.zip’ exists on my drive", "files"),
-            ("Write a Python script to rename files with a timestamp", "code"),
-            ("What’s your favorite thing about space?", "talk"),
-            ("search for GPU with at least 24gb vram", "web"),
-            ("Browse the web for the latest fitness trends", "web"),
-            ("Move all .docx files to a ‘Work’ folder", "files"),
-            ("I would like to make a new project called 'new_project'", "files"),
-            ("I would like to setup a new project index as mark2", "files"),
-            ("can you create a 3d js game that run in the browser", "code"),
-            ("can you make a web app in python that use the flask framework", "code"),
-            ("can you build a web server in go that serve a simple html page", "code"),
-            ("can you find out who Jacky yougouri is ?", "web"),
-            ("Can you use MCP to find stock market for IBM ?", "mcp"),
-            ("Can you use MCP to to export my contacts to a csv file?", "mcp"),
-            ("Can you use a MCP to find write notes to flomo", "mcp"),
-            ("Can you use a MCP to query my calendar and find the next meeting?", "mcp"),
-            ("Can you use a mcp to get the distance between Shanghai and Paris?", "mcp"),
-            ("Setup a new flutter project called 'new_flutter_project'", "files"),
-            ("can you create a new project called 'new_project'", "files"),
-            ("can you make a simple web app that display a list of files in my dir", "code"),
-            ("can you build a simple web server in python that serve a html page", "code"),
-            ("find and buy me the latest rtx 4090", "web"),
-            ("What are some good netflix show like Altered Carbon ?", "web"),
-            ("can you find the latest research paper on AI", "web"),
-            ("can you find research.pdf in my drive", "files"),
-            ("hi", "talk"),
-            ("hello", "talk"),
-        ]
-        random.shuffle(few_shots)
-        texts = [text for text, _ in few_shots]
-        labels = [label for _, label in few_shots]
-        self.talk_classifier.add_examples(texts, labels)
-
-    def llm_router(self, text: str) -> tuple:
+        self.learn_few_shots(classifier, "tasks")
+
+    def load_few_shots(self, name: str) -> List[Tuple[str, str]]:
+        """
+        Load a few shots set from llm_router/few_shots.json.
+        Args:
+            name: the set name, "tasks" or "complexity"
+        Returns:
+            List[Tuple[str, str]]: (text, label) pairs
+        """
+        with open(os.path.join(self.router_path, "few_shots.json"), 'r', encoding='utf-8') as f:
+            return [(text, label) for text, label in json.load(f)[name]]
+
+    def few_shots_hash(self) -> str | None:
+        """Hash of the few shots file, None if it cannot be read."""
+        try:
+            with open(os.path.join(self.router_path, "few_shots.json"), 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def routing_version(self) -> str:
+        """Identify the routing setup, the agents and the few shots the classifiers learned."""
+        agents = [(agent.type, agent.role, agent.agent_name) for agent in self.agents]
+        return json.dumps([agents, self.few_shots_version], default=str)
+
+    def invalidate_cache(self) -> None:
+        """Forget the cached routing decisions, to call after teaching the classifiers new examples."""
+        self.few_shots_version = self.few_shots_hash()
+        self.cache.clear()
+
+    def few_shots_cache_path(self, name: str, few_shots: List[Tuple[str, str]]) -> str:
+        """
+        Path of the embeddings cache of a few shots set, next to the router model.
+        The name holds a hash of the router model files and a hash of the examples,
+        a change of either gives a new path.
+        """
+        model_hash = hashlib.sha256()
+        for filename in ["config.json", "model.safetensors"]:
+            with open(os.path.join(self.router_path, filename), 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    model_hash.update(chunk)
+        set_hash = hashlib.sha256(json.dumps(few_shots, ensure_ascii=False).encode('utf-8'))
+        return os.path.join(self.router_path, f"few_shots_{name}_{model_hash.hexdigest()[:12]}_{set_hash.hexdigest()[:12]}.npy")
+
+    def embed_few_shots(self, classifier: AdaptiveClassifier, name: str, few_shots: List[Tuple[str, str]]) -> np.ndarray:
+        """
+        Embeddings of a few shots set, memory mapped from the cache or computed and saved on first use.
+        Returns:
+            np.ndarray: one embedding row per example, in the few shots order
+        """
+        path = self.few_shots_cache_path(name, few_shots)
+        if os.path.exists(path):
+            embeddings = np.load(path, mmap_mode='r')
+            if embeddings.shape[0] == len(few_shots):
+                return embeddings
+        animate_thinking(f"Embedding {name} few shots examples...", color="status")
+        embeddings = np.stack([emb.numpy() for emb in classifier._get_embeddings([text for text, _ in few_shots])])
+        for stale in glob.glob(os.path.join(self.router_path, f"few_shots_{name}_*.npy")):
+            os.remove(stale)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, embeddings.astype(np.float32))
+        os.replace(tmp_path, path)
+        self.logger.info(f"Saved {name} few shots embeddings at {path}")
+        return embeddings
+
+    def learn_few_shots(self, classifier: AdaptiveClassifier, name: str) -> None:
+        """
+        Teach a few shots set to the classifier with cached embeddings.
+        Only the examples are read at startup, they are embedded again only when the set or the model change.
+        """
+        few_shots = self.load_few_shots(name)
+        embeddings = self.embed_few_shots(classifier, name, few_shots)
+        order = list(range(len(few_shots)))
+        random.shuffle(order)
+        texts = [few_shots[i][0] for i in order]
+        labels = [few_shots[i][1] for i in order]
+        cached = [torch.from_numpy(np.array(embeddings[i])) for i in order]
+        with self.precomputed_embeddings(classifier, cached):
+            classifier.add_examples(texts, labels)
+
+    @contextmanager
+    def precomputed_embeddings(self, classifier: AdaptiveClassifier, embeddings: list):
+        """
+        Make the classifier use the given embeddings instead of running its encoder.
+        add_examples and predict embed the texts themselves, this serves them embeddings computed once.
+        It relies on adaptive-classifier embedding through its private _get_embeddings (pinned in requirements.txt),
+        raise if the classifier did not ask for the embeddings, it would have run the encoder again.
+        """
+        requests = []
+        def get_embeddings(texts):
+            requests.append(len(texts))
+            return embeddings
+        with self.embedding_lock:
+            classifier._get_embeddings = get_embeddings
+            try:
+                yield classifier
+            finally:
+                del classifier._get_embeddings
+        if requests != [len(embeddings)]:
+            raise RuntimeError(f"adaptive-classifier did not embed through _get_embeddings as expected ({requests}), "
+                               "the installed version is not supported, see requirements.txt.")
+
+    def encode(self, text: str) -> torch.Tensor:
+        """Embed a query with the router encoder, shared by the tasks and complexity classifiers."""
+        with self.embedding_lock:
+            return self.talk_classifier._get_embeddings([text])[0]
+
+    def predict(self, classifier: AdaptiveClassifier, text: str, embedding: torch.Tensor = None) -> list:
+        """Predictions of a classifier, from the query embedding if given."""
+        if embedding is None:
+            return classifier.predict(text)
+        with self.precomputed_embeddings(classifier, [embedding]):
+            return classifier.predict(text)
+
+    def llm_router(self, text: str, embedding: torch.Tensor = None) -> tuple:
         """
         Inference of the LLM router model.
         Args:
             text: The input text
+            embedding: The query embedding, computed if None
+        Returns:
+            tuple: (label, confidence, confidence relative to the other task labels)
         """
-        predictions = self.talk_classifier.predict(text)
+        predictions = self.predict(self.talk_classifier, text, embedding)
         predictions = [pred for pred in predictions if pred[0] not in ["HIGH", "LOW"]]
         predictions = sorted(predictions, key=lambda x: x[1], reverse=True)
-        return predictions[0]
+        total = sum(pred[1] for pred in predictions)
+        label, confidence = predictions[0]
+        return label, confidence, confidence / total if total > 0 else 0.0
     
-    def router_vote(self, text: str, labels: list, log_confidence:bool = False) -> str:
+    def router_vote(self, text: str, labels: list, log_confidence:bool = False, embedding: torch.Tensor = None) -> str:
         """
-        Vote between the LLM router and BART model.
+        Select the label with the LLM router, BART zero-shot vote only when the LLM router is not confident.
         Args:
             text: The input text
             labels: The labels to classify
+            embedding: The query embedding, computed if None
         Returns:
             str: The selected label
         """
         if len(text) <= 8:
             return "talk"
+        llm_router, confidence_llm_router, relative_confidence = self.llm_router(text, embedding)
+        if relative_confidence >= self.tiebreak_confidence:
+            self.logger.info(f"Routing for text {text}: LLM-router: {llm_router} ({relative_confidence})")
+            if log_confidence:
+                pretty_print(f"Agent choice -> LLM-router: {llm_router} ({relative_confidence})")
+            return llm_router
         result_bart = self.pipelines['bart'](text, labels)
-        result_llm_router = self.llm_router(text)
-        bart, confidence_bart = result_bart['labels'][0], result_bart['scores'][0]
+        return self.combine_votes(text, (llm_router, confidence_llm_router), result_bart, log_confidence)
+
+    def combine_votes(self, text: str, result_llm_router: tuple, result_bart: dict, log_confidence: bool = False) -> str:
+        """
+        Vote between the LLM router and BART model.
+        Args:
+            text: The input text
+            result_llm_router: (label, confidence) of the LLM router
+            result_bart: output of the BART zero-shot pipeline
+        Returns:
+            str: The selected label
+        """
         llm_router, confidence_llm_router = result_llm_router[0], result_llm_router[1]
+        bart, confidence_bart = result_bart['labels'][0], result_bart['scores'][0]
         final_score_bart = confidence_bart / (confidence_bart + confidence_llm_router)
         final_score_llm = confidence_llm_router / (confidence_bart + confidence_llm_router)
         self.logger.info(f"Routing Vote for text {text}: BART: {bart} ({final_score_bart}) LLM-router: {llm_router} ({final_score_llm})")
@@ -398,16 +485,17 @@ class AgentRouter:
             first_sentence = text
         return first_sentence
     
-    def estimate_complexity(self, text: str) -> str:
+    def estimate_complexity(self, text: str, embedding: torch.Tensor = None) -> str:
         """
         Estimate the complexity of the text.
         Args:
             text: The input text
+            embedding: The query embedding, computed if None
         Returns:
         str: The estimated complexity
         """
         try:
-            predictions = self.complexity_classifier.predict(text)
+            predictions = self.predict(self.complexity_classifier, text, embedding)
         except Exception as e:
             pretty_print(f"Error in estimate_complexity: {str(e)}", color="failure")
             return "LOW"
@@ -449,20 +537,59 @@ class AgentRouter:
         assert len(self.agents) > 0, "No agents available."
         if len(self.agents) == 1:
             return self.agents[0]
+        role = self.rule_route(text)
+        if role is not None:
+            return self.agent_for_role(role)
+        if not self.is_ready():
+            self.record_decision("fallback", text)
+            return self.fallback_select_agent(text)
         lang = self.lang_analysis.detect_language(text)
         text = self.find_first_sentence(text)
-        text = self.lang_analysis.translate(text, lang)
-        labels = [agent.role for agent in self.agents]
-        complexity = self.estimate_complexity(text)
-        if complexity == "HIGH":
+        self.cache.check_version(self.routing_version())
+        cache_key = self.cache.make_key(lang, text)
+        best_agent = self.cache.get(cache_key)
+        if best_agent is not None:
+            self.record_decision("cache", text, best_agent)
+        else:
+            best_agent = self.route(text, lang)
+            self.record_decision("models", text, best_agent)
+            if best_agent is not None:
+                self.cache.put(cache_key, best_agent)
+        return self.agent_for_role(best_agent)
+
+    def rule_route(self, text: str) -> str | None:
+        """
+        Route a query with the rule based pre-router.
+        Args:
+            text (str): The query
+        Returns:
+            str | None: The role, None if the rules can't decide
+        """
+        match = self.rules.match(text, [agent.role for agent in self.agents])
+        if match is None:
+            return None
+        role, rule = match
+        self.record_decision("rules", text, role, rule)
+        return role
+
+    def record_decision(self, path: str, text: str, role: str = None, rule: str = None) -> None:
+        """Count and log which path decided a query, to tune the rules."""
+        self.decisions[path] += 1
+        self.logger.info(f"Routing decided by {path}{f' ({rule})' if rule else ''} for {text}: {role}")
+
+    def agent_for_role(self, role: str) -> Agent:
+        """
+        Find the agent of a routing decision.
+        Args:
+            role (str): The selected role, "planification" for complex tasks
+        Returns:
+            Agent: The agent with this role, None if there is none
+        """
+        if role == "planification":
             pretty_print(f"Complex task detected, routing to planner agent.", color="info")
             return self.find_planner_agent()
-        try:
-            best_agent = self.router_vote(text, labels, log_confidence=False)
-        except Exception as e:
-            raise e
         for agent in self.agents:
-            if best_agent == agent.role:
+            if role == agent.role:
                 role_name = agent.role
                 pretty_print(f"Selected agent: {agent.agent_name} (roles: {role_name})", color="warning")
                 return agent
@@ -470,6 +597,126 @@ class AgentRouter:
         self.logger.error("No agent selected.")
         return None
 
+    def select_agents(self, texts: List[str]) -> List[Agent]:
+        """
+        Select the agents of several queries at once.
+        Translation, encoding and the BART tiebreak run as batches, the decisions are those of select_agent.
+        Args:
+            texts (List[str]): The queries
+        Returns:
+            List[Agent]: The selected agent of each query
+        """
+        assert len(self.agents) > 0, "No agents available."
+        if len(self.agents) == 1:
+            return [self.agents[0] for _ in texts]
+        roles = [self.rule_route(text) for text in texts]
+        if not self.is_ready():
+            agents = []
+            for text, role in zip(texts, roles):
+                if role is not None:
+                    agents.append(self.agent_for_role(role))
+                    continue
+                self.record_decision("fallback", text)
+                agents.append(self.fallback_select_agent(text))
+            return agents
+        self.cache.check_version(self.routing_version())
+        sentences, langs, keys = {}, {}, {}
+        for i, text in enumerate(texts):
+            if roles[i] is not None:
+                continue
+            langs[i] = self.lang_analysis.detect_language(text)
+            sentences[i] = self.find_first_sentence(text)
+            keys[i] = self.cache.make_key(langs[i], sentences[i])
+            roles[i] = self.cache.get(keys[i])
+            if roles[i] is not None:
+                self.record_decision("cache", sentences[i], roles[i])
+        pending = [i for i, role in enumerate(roles) if role is None]
+        if pending:
+            routed = self.route_batch([sentences[i] for i in pending], [langs[i] for i in pending])
+            for i, role in zip(pending, routed):
+                roles[i] = role
+                self.record_decision("models", sentences[i], role)
+                if role is not None:
+                    self.cache.put(keys[i], role)
+        return [self.agent_for_role(role) for role in roles]
+
+    def route_batch(self, texts: List[str], langs: List[str], batch_size: int = 16) -> List[str]:
+        """
+        Batched version of route.
+        Args:
+            texts (List[str]): The first sentences of the queries
+            langs (List[str]): The language of each query
+            batch_size (int): The batch size of the BART zero-shot pipeline
+        Returns:
+            List[str]: The selected role of each query
+        """
+        texts = self.lang_analysis.translate_batch(texts, langs)
+        labels = [agent.role for agent in self.agents]
+        with self.embedding_lock:
+            embeddings = self.talk_classifier._get_embeddings(texts)
+        roles = [None] * len(texts)
+        undecided = {}
+        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
+            if self.estimate_complexity(text, embedding) == "HIGH":
+                roles[i] = "planification"
+                continue
+            if len(text) <= 8:
+                roles[i] = "talk"
+                continue
+            llm_router, confidence, relative_confidence = self.llm_router(text, embedding)
+            if relative_confidence >= self.tiebreak_confidence:
+                roles[i] = llm_router
+                continue
+            undecided[i] = (llm_router, confidence)
+        if undecided:
+            results_bart = self.pipelines['bart']([texts[i] for i in undecided], labels, batch_size=batch_size)
+            if isinstance(results_bart, dict):
+                results_bart = [results_bart]
+            for (i, result_llm_router), result_bart in zip(undecided.items(), results_bart):
+                roles[i] = self.combine_votes(texts[i], result_llm_router, result_bart)
+        return roles
+
+    def route(self, text: str, lang: str) -> str:
+        """
+        Run the routing models on the first sentence of a query.
+        Args:
+            text (str): The first sentence of the query
+            lang (str): The language of the query
+        Returns:
+            str: The selected agent role, "planification" for complex tasks
+        """
+        text = self.lang_analysis.translate(text, lang)
+        labels = [agent.role for agent in self.agents]
+        # one encoder pass, shared by the complexity and the tasks heads
+        embedding = self.encode(text)
+        complexity = self.estimate_complexity(text, embedding)
+        if complexity == "HIGH":
+            return "planification"
+        return self.router_vote(text, labels, log_confidence=False, embedding=embedding)
+
+    def fallback_select_agent(self, text: str) -> Agent:
+        """
+        Cheap keyword based routing, used until the routing models are ready.
+        Args:
+            text (str): The text to select the agent from
+        Returns:
+            Agent: The agent whose keywords match the most, the casual agent if none match
+        """
+        text = self.find_first_sentence(text).lower()
+        scores = {}
+        for role, keywords in self.fallback_keywords.items():
+            scores[role] = sum(1 for keyword in keywords if re.search(rf"(?<!\w){re.escape(keyword)}(?!\w)", text)
+                               or (not keyword.isascii() and keyword in text))
+        best_role = max(scores, key=scores.get)
+        if scores[best_role] == 0:
+            best_role = "talk"
+        for agent in self.agents:
+            if agent.role == best_role:
+                pretty_print(f"Selected agent: {agent.agent_name} (keyword routing, models loading)", color="warning")
+                self.logger.info(f"Keyword routing of {text} to {best_role}.")
+                return agent
+        return next((agent for agent in self.agents if agent.role == "talk"), self.agents[0])
+
 if __name__ == "__main__":
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     agents = [
@@ -479,6 +726,7 @@ if __name__ == "__main__":
         FileAgent("file", "../prompts/base/coder_agent.txt", None)
     ]
     router = AgentRouter(agents)
+    router.wait_ready()
     texts = [
         "hi",
         "你好",
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import List
+
+from sources.logger import Logger
+
+class SessionStore:
+    """
+    Append-only storage of the conversation sessions.
+    Each session is a JSONL file, one message per line, under <folder>/<agent_type>/.
+    A SQLite index of the sessions per agent type keep the last session lookup constant time.
+    """
+    def __init__(self, folder: str = "conversations/", index_file: str = "sessions.db"):
+        self.folder = folder
+        self.index_path = os.path.join(folder, index_file)
+        self.lock = threading.Lock()
+        self.logger = Logger("memory.log")
+
+    def connect(self) -> sqlite3.Connection:
+        os.makedirs(self.folder, exist_ok=True)
+        conn = sqlite3.connect(self.index_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                agent_type TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                started REAL NOT NULL,
+                updated REAL NOT NULL,
+                messages INTEGER NOT NULL,
+                PRIMARY KEY (agent_type, filename)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_updated ON sessions(agent_type, updated)")
+        return conn
+
+    def session_path(self, agent_type: str, filename: str) -> str:
+        return os.path.join(self.folder, agent_type, filename)
+
+    def append(self, agent_type: str, filename: str, messages: List[dict],
+               started: float, total: int, rewrite: bool = False) -> str:
+        """
+        Write messages to a session file and update the index.
+        Args:
+            agent_type: the agent owning the session
+            filename: the session file name
+            messages: the messages to append, or the whole session if rewrite
+            started: session start timestamp
+            total: number of messages in the session after the write
+            rewrite: replace the session file instead of appending
+        Returns:
+            str: path of the session file
+        """
+        path = self.session_path(agent_type, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lines = "".join(json.dumps(message, ensure_ascii=False) + "\n" for message in messages)
+        with self.lock:
+            if rewrite:
+                tmp_path = path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(lines)
+                os.replace(tmp_path, path)
+            else:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+            with self.connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO sessions (agent_type, filename, started, updated, messages) VALUES (?, ?, ?, ?, ?)",
+                             (agent_type, filename, started, time.time(), total))
+            conn.close()
+        self.logger.info(f"Saved {len(messages)} messages to {path} ({'rewrite' if rewrite else 'append'}).")
+        return path
+
+    def last_session_path(self, agent_type: str) -> str | None:
+        """Path of the most recently saved session of an agent type, None if there is none."""
+        with self.lock:
+            conn = self.connect()
+            try:
+                rows = conn.execute("SELECT filename FROM sessions WHERE agent_type = ? ORDER BY updated DESC LIMIT 8",
+                                    (agent_type,)).fetchall()
+            finally:
+                conn.close()
+        for (filename,) in rows:
+            path = self.session_path(agent_type, filename)
+            if os.path.exists(path):
+                return path
+        return self.scan_last_session_path(agent_type)
+
+    def scan_last_session_path(self, agent_type: str) -> str | None:
+        """Find the last session by listing the folder, for sessions saved before the index existed."""
+        save_path = os.path.join(self.folder, agent_type)
+        if not os.path.exists(save_path):
+            return None
+        # memory_<date>_<time>.txt, date and time sort lexicographically
+        saved_sessions = sorted((filename for filename in os.listdir(save_path)
+                                 if filename.startswith('memory_') and not filename.endswith('.tmp')),
+                                key=lambda filename: filename.split('_', 1)[1], reverse=True)
+        if len(saved_sessions) == 0:
+            return None
+        return os.path.join(save_path, saved_sessions[0])
+
+    def load(self, path: str) -> List[dict]:
+        """
+        Load the messages of a session file.
+        Sessions saved as a single JSON list by older versions are supported.
+        """
+        messages = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            self.logger.warning(f"File not found: {path}")
+            return []
+        if content.lstrip().startswith('['):
+            try:
+                return json.loads(content)
+            except json.JSONDecodeError:
+                self.logger.warning(f"Error decoding JSON from file: {path}")
+                return []
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                messages.append(json.loads(line))
+            except json.JSONDecodeError:
+                # a write interrupted mid line, keep what was saved before
+                self.logger.warning(f"Skipping corrupted line in {path}")
+        return messages
@@ -5,6 +5,8 @@ import threading
 import numpy as np
 import time
 
+from sources.models import get_model
+
 IMPORT_FOUND = True
 
 try:
@@ -89,6 +91,10 @@ class Transcript:
             print(Fore.RED + "Transcript: Speech to Text is disabled." + Fore.RESET)
             return
         self.last_read = None
+        self.pipe = get_model("distil-whisper-medium.en", self.load_pipeline)
+
+    def load_pipeline(self):
+        """Load the speech recognition pipeline, shared through the model registry."""
         device = self.get_device()
         torch_dtype = torch.float16 if device == "cuda" else torch.float32
         model_id = "distil-whisper/distil-medium.en"
@@ -99,7 +105,7 @@ class Transcript:
         model.to(device)
         processor = AutoProcessor.from_pretrained(model_id)
         
-        self.pipe = pipeline(
+        return pipeline(
             "automatic-speech-recognition",
             model=model,
             tokenizer=processor.tokenizer,
@@ -0,0 +1,131 @@
+import re
+import math
+from abc import abstractmethod
+
+from sources.logger import Logger
+
+TIKTOKEN_FOUND = True
+HF_TOKENIZERS_FOUND = True
+
+try:
+    import tiktoken
+except ImportError:
+    TIKTOKEN_FOUND = False
+
+try:
+    from transformers import AutoTokenizer
+except ImportError:
+    HF_TOKENIZERS_FOUND = False
+
+# per message overhead of chat templates (role and separators)
+MESSAGE_OVERHEAD = 4
+
+class TokenCounter:
+    """
+    Count tokens of a text for context budgeting.
+    """
+    name = "base"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        pass
+
+    @abstractmethod
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Keep the beginning of the text that fit within max_tokens."""
+        pass
+
+class ApproxTokenCounter(TokenCounter):
+    """
+    Fast approximate counter, about 4 characters per token for latin text and one token per CJK character.
+    """
+    name = "approx"
+    cjk_pattern = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]')
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        cjk = len(self.cjk_pattern.findall(text))
+        return cjk + math.ceil((len(text) - cjk) / self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        # every character cost at most one token, start from the optimistic cut and shrink
+        end = min(len(text), int(max_tokens * self.chars_per_token))
+        while end > 0 and self.count(text[:end]) > max_tokens:
+            excess = self.count(text[:end]) - max_tokens
+            end -= max(1, excess)
+        return text[:max(end, 0)]
+
+class TiktokenCounter(TokenCounter):
+    """
+    BPE counter using a tiktoken encoding.
+    """
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        if not TIKTOKEN_FOUND:
+            raise ImportError("tiktoken is not installed, run: pip install tiktoken")
+        self.encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max(max_tokens, 0)])
+
+class HFTokenCounter(TokenCounter):
+    """
+    Counter using the tokenizer of a HuggingFace model.
+    """
+    name = "hf"
+
+    def __init__(self, model_name: str):
+        if not HF_TOKENIZERS_FOUND:
+            raise ImportError("transformers is not installed, run: pip install transformers")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.tokenizer.encode(text, add_special_tokens=False)
+        if len(tokens) <= max_tokens:
+            return text
+        return self.tokenizer.decode(tokens[:max(max_tokens, 0)], skip_special_tokens=True)
+
+def get_token_counter(tokenizer: str = "auto") -> TokenCounter:
+    """
+    Get a token counter.
+    Args:
+        tokenizer: "approx", "tiktoken", "tiktoken:<encoding>", "hf:<model name>" or "auto"
+                   auto use tiktoken if installed and its encoding loads, the approximate counter otherwise.
+    Returns:
+        TokenCounter: the token counter
+    """
+    if tokenizer == "auto":
+        if not TIKTOKEN_FOUND:
+            return ApproxTokenCounter()
+        try:
+            return TiktokenCounter()
+        except Exception as e:
+            # the encoding is downloaded on first use, offline hosts fall back to the approximation
+            Logger("memory.log").warning(f"Could not load the tiktoken encoding, using approximate token counts: {str(e)}")
+            return ApproxTokenCounter()
+    if tokenizer == "approx":
+        return ApproxTokenCounter()
+    if tokenizer.startswith("tiktoken"):
+        _, _, encoding = tokenizer.partition(":")
+        return TiktokenCounter(encoding or "cl100k_base")
+    if tokenizer.startswith("hf:"):
+        return HFTokenCounter(tokenizer[3:])
+    raise ValueError(f"Unknown tokenizer: {tokenizer}")
@@ -0,0 +1,91 @@
+// Snapshot of the page in a single round trip: cleaned html, links, inputs and buttons.
+function isElementDisplayed(element) {
+    const style = window.getComputedStyle(element);
+    if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') {
+        return false;
+    }
+    return element.getClientRects().length > 0;
+}
+
+// function to get the XPath of an element
+function getXPath(element) {
+    if (!element) return '';
+    if (element.id !== '') return '//*[@id="' + element.id + '"]';
+    if (element === document.body) return '/html/body';
+
+    let ix = 0;
+    const siblings = element.parentNode ? element.parentNode.childNodes : [];
+    for (let i = 0; i < siblings.length; i++) {
+        const sibling = siblings[i];
+        if (sibling === element) {
+            return getXPath(element.parentNode) + '/' + element.tagName.toLowerCase() + '[' + (ix + 1) + ']';
+        }
+        if (sibling.nodeType === 1 && sibling.tagName === element.tagName) {
+            ix++;
+        }
+    }
+    return '';
+}
+
+function findInputs(element, result = []) {
+    element.querySelectorAll('input').forEach(input => {
+        result.push({
+            tagName: input.tagName,
+            text: input.name || '',
+            type: input.type || '',
+            class: input.className || '',
+            xpath: getXPath(input),
+            displayed: isElementDisplayed(input),
+            checked: input.checked === true
+        });
+    });
+    element.querySelectorAll('*').forEach(el => {
+        if (el.shadowRoot) {
+            findInputs(el.shadowRoot, result);
+        }
+    });
+    return result;
+}
+
+function findLinks() {
+    const links = [];
+    document.querySelectorAll('a[href]').forEach(a => {
+        links.push({
+            url: a.href,
+            text: (a.innerText || '').trim(),
+            displayed: isElementDisplayed(a)
+        });
+    });
+    return links;
+}
+
+// same order as the (//button | //input[@type='submit']) xpath, document order
+function findButtons() {
+    const buttons = [];
+    document.querySelectorAll("button, input[type='submit']").forEach((button, i) => {
+        buttons.push({
+            text: button.innerText || '',
+            value: button.value || '',
+            xpath: "(//button | //input[@type='submit'])[" + (i + 1) + "]",
+            displayed: isElementDisplayed(button),
+            enabled: !button.disabled
+        });
+    });
+    return buttons;
+}
+
+function cleanedHtml() {
+    if (!document.body) return '';
+    const body = document.body.cloneNode(true);
+    body.querySelectorAll('script, style, noscript, meta, link').forEach(el => el.remove());
+    return body.outerHTML;
+}
+
+return {
+    url: window.location.href,
+    title: document.title,
+    html: cleanedHtml(),
+    links: findLinks(),
+    inputs: document.body ? findInputs(document.body) : [],
+    buttons: findButtons()
+};
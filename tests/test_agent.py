@@ -0,0 +1,68 @@
+import unittest
+import asyncio
+import os
+import sys
+import time
+import threading
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.agents.casual_agent import CasualAgent
+
+class TestLlmRequest(unittest.TestCase):
+    def setUp(self):
+        self.provider = MagicMock()
+        self.provider.get_model_name.return_value = "deepseek-r1:14b"
+        prompt_path = os.path.join(os.path.dirname(__file__), '..', 'prompts', 'base', 'casual_agent.txt')
+        self.agent = CasualAgent("jarvis", prompt_path, self.provider)
+
+    def test_semantic_retrieval_opt_in(self):
+        self.assertFalse(self.agent.memory.semantic_retrieval)
+        self.assertIsNone(self.agent.memory.embedder)
+
+    def test_llm_request(self):
+        async def respond_async(history, verbose):
+            return "<think>hmm</think>Hello"
+        self.provider.respond_async = respond_async
+        answer, reasoning = asyncio.run(self.agent.llm_request())
+        self.assertEqual(answer, "Hello")
+        self.assertEqual(reasoning, "<think>hmm</think>")
+        self.assertEqual(self.agent.memory.get()[-1]['content'], "Hello")
+
+    def test_request_stop_cancel_generation(self):
+        started = asyncio.Event()
+        async def respond_async(history, verbose):
+            started.set()
+            await asyncio.sleep(60)
+            return "never"
+        self.provider.respond_async = respond_async
+
+        async def run():
+            request = asyncio.ensure_future(self.agent.llm_request())
+            await started.wait()
+            self.agent.request_stop()
+            return await asyncio.wait_for(request, timeout=5)
+        answer, _ = asyncio.run(run())
+        self.assertIn("REQUEST_EXIT", answer)
+        self.assertIsNone(self.agent.llm_task)
+
+    def test_request_stop_during_context_building(self):
+        building = threading.Event()
+        def slow_get():
+            building.set()
+            time.sleep(0.5)
+            return []
+        self.agent.memory.get = slow_get
+        self.provider.respond_async = MagicMock()
+
+        async def run():
+            request = asyncio.ensure_future(self.agent.llm_request())
+            await asyncio.get_running_loop().run_in_executor(None, building.wait)
+            self.agent.request_stop()
+            return await asyncio.wait_for(request, timeout=5)
+        answer, _ = asyncio.run(run())
+        self.assertIn("REQUEST_EXIT", answer)
+        self.provider.respond_async.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
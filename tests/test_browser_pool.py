@@ -0,0 +1,165 @@
+import unittest
+import os
+import sys
+import shutil
+import asyncio
+import threading
+from unittest.mock import patch, MagicMock, PropertyMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.browser import Browser, create_driver
+from sources.browser_pool import BrowserPool
+
+CHROME_FOUND = any(shutil.which(name) for name in ["google-chrome", "chromium", "chromium-browser", "chrome"])
+
+class FakeDrivers:
+    """Driver factory of mock drivers, remembers the profile directory of each."""
+    def __init__(self):
+        self.drivers = []
+        self.profiles = []
+        self.fail = False
+
+    def __call__(self, profile_dir: str):
+        if self.fail:
+            raise RuntimeError("chrome failed to start")
+        driver = MagicMock()
+        driver.execute_script.return_value = None
+        self.drivers.append(driver)
+        self.profiles.append(profile_dir)
+        return driver
+
+class TestBrowserPool(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(Browser, 'screenshot')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = FakeDrivers()
+        self.pool = BrowserPool(size=2, max_navigations=3, driver_factory=self.factory)
+        self.addCleanup(self.pool.close)
+
+    def test_lazy_creation_and_reuse(self):
+        self.assertEqual(self.pool.status()["live"], 0)
+        browser = self.pool.lease()
+        self.assertEqual(len(self.factory.drivers), 1)
+        self.pool.release(browser)
+        self.assertIs(self.pool.lease(), browser)
+        self.assertEqual(len(self.factory.drivers), 1)
+        self.assertEqual(self.pool.status()["leases"], 2)
+
+    def test_session_cleared_between_leases(self):
+        with self.pool.browser() as browser:
+            browser.static_url = "https://example.com"
+            browser.remember_origin("https://example.com/page?q=1")
+        driver = self.factory.drivers[0]
+        driver.execute_cdp_cmd.assert_any_call("Network.clearBrowserCookies", {})
+        for origin in ["https://example.com", "https://www.google.com"]:
+            driver.execute_cdp_cmd.assert_any_call("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        self.assertEqual(browser.visited_origins, set())
+        self.assertIsNone(browser.static_url)
+
+    def test_release_keeps_healthy_browser(self):
+        def execute_cdp_cmd(command, params):
+            if params.get("origin") == "*":
+                raise Exception("invalid origin") # Chrome only accepts real origins
+        browser = self.pool.lease()
+        self.factory.drivers[0].execute_cdp_cmd.side_effect = execute_cdp_cmd
+        browser.remember_origin("https://example.com")
+        self.pool.release(browser)
+        self.assertEqual(self.pool.status()["idle"], 1)
+        self.assertIs(self.pool.lease(), browser)
+        self.factory.drivers[0].quit.assert_not_called()
+        self.assertEqual(self.pool.status()["created"], 1)
+
+    def test_screenshot_folder_per_browser(self):
+        first, second = self.pool.lease(), self.pool.lease()
+        self.assertNotEqual(first.get_screenshot(), second.get_screenshot())
+        self.pool.release(first)
+        self.pool.release(second)
+
+    def test_separate_profiles(self):
+        first, second = self.pool.lease(), self.pool.lease()
+        self.assertIsNot(first, second)
+        self.assertEqual(len(set(self.factory.profiles)), 2)
+        self.assertTrue(all(os.path.isdir(profile) for profile in self.factory.profiles))
+        self.pool.release(first)
+        self.pool.release(second)
+        self.pool.close()
+        self.assertFalse(any(os.path.exists(profile) for profile in self.factory.profiles))
+        for driver in self.factory.drivers:
+            driver.quit.assert_called_once()
+
+    def test_wait_for_release(self):
+        self.pool.lease()
+        second = self.pool.lease()
+        with self.assertRaises(TimeoutError):
+            self.pool.lease(timeout=0.05)
+        threading.Timer(0.05, self.pool.release, args=[second]).start()
+        self.assertIs(self.pool.lease(timeout=5), second)
+        self.assertEqual(len(self.factory.drivers), 2)
+
+    def test_recycle_after_max_navigations(self):
+        with self.pool.browser() as browser:
+            browser.navigations = 3
+        with self.pool.browser() as recycled:
+            self.assertIsNot(recycled, browser)
+        self.factory.drivers[0].quit.assert_called_once()
+        self.assertFalse(os.path.exists(self.factory.profiles[0]))
+        self.assertEqual(self.pool.status()["recycled"], 1)
+        self.assertEqual(self.pool.status()["live"], 1)
+
+    def test_unhealthy_browser_replaced(self):
+        browser = self.pool.lease()
+        self.pool.release(browser)
+        type(self.factory.drivers[0]).window_handles = PropertyMock(side_effect=Exception("chrome not reachable"))
+        self.assertIsNot(self.pool.lease(), browser)
+        self.assertEqual(self.pool.status()["unhealthy"], 1)
+        self.assertEqual(self.pool.status()["live"], 1)
+
+    def test_failed_start_frees_slot(self):
+        self.factory.fail = True
+        with self.assertRaises(RuntimeError):
+            self.pool.lease()
+        self.assertEqual(self.pool.status()["live"], 0)
+        self.factory.fail = False
+        self.assertIsNotNone(self.pool.lease(timeout=1))
+
+    def test_start(self):
+        self.pool.start(count=5)
+        self.assertEqual(self.pool.status()["idle"], 2)
+
+    def test_browser_agent_leases_per_task(self):
+        with patch('sources.agents.browser_agent.searxSearch'):
+            from sources.agents.browser_agent import BrowserAgent
+            agent = BrowserAgent("Browser", "prompts/base/browser_agent.txt", None, browser=self.pool)
+        self.assertIsNone(agent.browser)
+        leased = []
+        async def browse(user_prompt, speech_module):
+            leased.append(agent.browser)
+            return "answer", ""
+        with patch.object(agent, 'browse', side_effect=browse):
+            self.assertEqual(asyncio.run(agent.process("find", None)), ("answer", ""))
+        self.assertIsInstance(leased[0], Browser)
+        self.assertIsNone(agent.browser)
+        self.assertEqual(self.pool.status()["leased"], 0)
+
+class TestHeadless(unittest.TestCase):
+    @patch('sources.browser.webdriver.Chrome')
+    def test_headless_option(self, chrome):
+        create_driver(headless=True, stealth_mode=False, profile_dir="/tmp/profile")
+        arguments = chrome.call_args.kwargs["options"].arguments
+        self.assertIn("--headless=new", arguments)
+        self.assertIn("--user-data-dir=/tmp/profile", arguments)
+
+    @unittest.skipUnless(CHROME_FOUND, "Chrome is not installed")
+    def test_headless_pool(self):
+        pool = BrowserPool(size=2, headless=True, browser_kwargs={"fetch_mode": "browser"})
+        try:
+            with pool.browser(timeout=120) as first, pool.browser(timeout=120) as second:
+                self.assertTrue(first.is_alive() and second.is_alive())
+                self.assertIsNot(first.driver, second.driver)
+            self.assertEqual(pool.status()["idle"], 2)
+        finally:
+            pool.close()
+
+if __name__ == '__main__':
+    unittest.main()
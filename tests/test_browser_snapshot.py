@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.browser import Browser
+
+SNAPSHOT = {
+    "url": "https://example.com/",
+    "title": "Example",
+    "html": "<body><h1>Example Domain</h1><p>This domain is for use in illustrative examples in documents.</p>"
+            "<p>menu</p></body>",
+    "links": [
+        {"url": "https://example.com/about", "text": "About", "displayed": True},
+        {"url": "https://example.com/hidden", "text": "Hidden", "displayed": False},
+        {"url": "https://example.com/logo.png", "text": "", "displayed": True},
+        {"url": "mailto:contact@example.com", "text": "Contact", "displayed": True},
+    ],
+    "inputs": [
+        {"tagName": "INPUT", "text": "username", "type": "text", "xpath": "//*[@id=\"user\"]", "displayed": True, "checked": False},
+        {"tagName": "INPUT", "text": "remember", "type": "checkbox", "xpath": "//*[@id=\"rem\"]", "displayed": True, "checked": True},
+        {"tagName": "INPUT", "text": "token", "type": "hidden", "xpath": "//*[@id=\"tok\"]", "displayed": False, "checked": False},
+    ],
+    "buttons": [
+        {"text": "Log in", "value": "", "xpath": "(//button | //input[@type='submit'])[1]", "displayed": True, "enabled": True},
+        {"text": "", "value": "Disabled", "xpath": "(//button | //input[@type='submit'])[2]", "displayed": True, "enabled": False},
+    ],
+}
+
+class TestBrowserSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.driver = MagicMock()
+        with patch.object(Browser, 'screenshot'):
+            self.browser = Browser(self.driver, fetch_mode="browser")
+        self.driver.execute_script.reset_mock()
+        self.driver.execute_script.side_effect = lambda script, *args: dict(SNAPSHOT) if "findLinks" in script else None
+
+    def snapshot_calls(self) -> int:
+        return sum(1 for call in self.driver.execute_script.call_args_list if "findLinks" in call[0][0])
+
+    def test_one_round_trip_per_page(self):
+        text = self.browser.get_text()
+        links = self.browser.get_navigable()
+        inputs = self.browser.get_form_inputs()
+        buttons = self.browser.get_buttons_xpath()
+        self.assertIn("illustrative examples", text)
+        self.assertNotIn("menu", text)
+        self.assertEqual(links, ["https://example.com/about"])
+        self.assertEqual(inputs, ["[username]()", "[remember](checked)"])
+        self.assertEqual(buttons, [("login", "(//button | //input[@type='submit'])[1]")])
+        self.assertEqual(self.snapshot_calls(), 1)
+        self.driver.find_elements.assert_not_called()
+
+    @patch('sources.browser.time.sleep')
+    def test_navigation_invalidates_snapshot(self, _):
+        self.browser.get_navigable()
+        with patch.object(Browser, 'human_scroll'), patch('sources.browser.WebDriverWait'):
+            self.assertTrue(self.browser.go_to("https://example.com/about"))
+        self.browser.get_navigable()
+        self.assertEqual(self.snapshot_calls(), 2)
+
+    def test_snapshot_failure(self):
+        self.driver.execute_script.side_effect = Exception("no such window")
+        self.assertIsNone(self.browser.get_text())
+        self.assertEqual(self.browser.get_navigable(), [])
+        self.assertEqual(self.browser.get_form_inputs(), ["No input forms found on the page."])
+
+if __name__ == '__main__':
+    unittest.main()
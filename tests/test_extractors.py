@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+import sources.extractors
+from sources.extractors import MarkdownifyExtractor, LxmlExtractor, get_extractor, is_sentence, LXML_FOUND
+
+PAGE = """<html><head><title>t</title><script>var tracking = "Tracking script content that is long enough.";</script></head>
+<body>
+<nav><a href="/">Home page of the example website</a> <a href="/about">About the example website team</a></nav>
+<main>
+<h1>Release notes of version 2</h1>
+<p>This release makes the router <b>much faster</b> on CPU only hosts, with <a href="/bench">benchmarks</a> included.</p>
+<img src="chart.png" alt="Latency chart">
+<ul><li>The translation models are loaded lazily on first use.</li><li>Batched routing of several queries at once.</li></ul>
+<p>Upgrading requires no configuration change for existing installs.</p>
+<table><tr><td>router</td><td>120 ms</td></tr></table>
+</main>
+<footer><p>Copyright of the example website, all rights reserved.</p></footer>
+</body></html>"""
+
+@unittest.skipUnless(LXML_FOUND, "lxml is not installed")
+class TestLxmlExtractor(unittest.TestCase):
+    def setUp(self):
+        self.extractor = LxmlExtractor(min_main_chars=50)
+
+    def test_main_content_to_markdown(self):
+        lines = self.extractor.extract(PAGE, 32768)
+        self.assertEqual(lines, [
+            "# Release notes of version 2",
+            "This release makes the router much faster on CPU only hosts, with benchmarks included.",
+            "• The translation models are loaded lazily on first use.",
+            "• Batched routing of several queries at once.",
+            "Upgrading requires no configuration change for existing installs.",
+            "| router | 120 ms",
+        ])
+
+    def test_dense_block_without_main_tag(self):
+        page = PAGE.replace("<main>", "<div class='menu'><p>Sign in to see more of the website content.</p></div><div id='post'>") \
+                   .replace("</main>", "</div>")
+        lines = self.extractor.extract(page, 32768)
+        self.assertIn("Upgrading requires no configuration change for existing installs.", lines)
+        self.assertNotIn("Sign in to see more of the website content.", lines)
+
+    def test_stops_at_budget(self):
+        page = "<html><body><article>" + "".join(f"<p>Paragraph number {i} of a very long page.</p>" for i in range(10000)) \
+               + "</article></body></html>"
+        lines = self.extractor.extract(page, 1000)
+        self.assertLess(len(lines), 40)
+        self.assertGreaterEqual(sum(len(line) + 2 for line in lines), 1000)
+
+    def test_empty_page(self):
+        self.assertEqual(self.extractor.extract("", 1000), [])
+
+class TestExtractors(unittest.TestCase):
+    def test_markdownify_whole_page(self):
+        lines = MarkdownifyExtractor().extract(PAGE, 32768)
+        self.assertIn("Copyright of the example website, all rights reserved.", lines)
+        self.assertFalse(any("Tracking" in line for line in lines))
+
+    def test_get_extractor(self):
+        self.assertIsInstance(get_extractor("markdownify"), MarkdownifyExtractor)
+        with patch.object(sources.extractors, 'LXML_FOUND', False):
+            self.assertIsInstance(get_extractor("auto"), MarkdownifyExtractor)
+        with self.assertRaises(ValueError):
+            get_extractor("unknown")
+
+    def test_is_sentence(self):
+        self.assertTrue(is_sentence("Error 404"))
+        self.assertTrue(is_sentence("This is a complete sentence."))
+        self.assertFalse(is_sentence("Home About"))
+
+if __name__ == '__main__':
+    unittest.main()
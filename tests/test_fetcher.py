@@ -0,0 +1,186 @@
+import unittest
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.fetcher import StaticFetcher, parse_domain_modes
+from sources.browser import Browser
+
+ARTICLE = ("<html><head><title>Static article</title></head><body><nav><a href='/'>Home</a></nav>"
+           "<main><h1>Static article</h1>"
+           + "<p>The static fetcher reads this paragraph without starting the browser at all.</p>" * 12
+           + "<a href='/next'>Next article</a><input type='text' name='q'></main></body></html>")
+JS_APP = ("<html><head><title>App</title><script src='/bundle.js'></script></head>"
+          "<body><noscript>You need to enable JavaScript to run this app.</noscript><div id=\"root\"></div></body></html>")
+SHORT = "<html><head><title>Short</title></head><body><p>Loading, please wait a few more seconds.</p></body></html>"
+
+PAGES = {
+    "/article": (200, "text/html; charset=utf-8", ARTICLE),
+    "/app": (200, "text/html", JS_APP),
+    "/short": (200, "text/html", SHORT),
+    "/paper.pdf": (200, "application/pdf", "%PDF-1.4"),
+    "/api": (200, "application/json", '{"static": true}'),
+    "/redirect": (302, "text/html", ""),
+    "/slow": (200, "text/html", ARTICLE),
+}
+HITS = Counter()
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        HITS[self.path] += 1
+        status, content_type, body = PAGES.get(self.path, (404, "text/html", "<p>Not found</p>"))
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if status == 302:
+            self.send_header("Location", "/article")
+        self.end_headers()
+        if self.path == "/slow":
+            # each chunk arrives within the read timeout, the whole page after several
+            for start in range(0, len(data), len(data) // 6 + 1):
+                threading.Event().wait(0.06) # time.sleep is patched while the browser navigates
+                self.wfile.write(data[start:start + len(data) // 6 + 1])
+                self.wfile.flush()
+            return
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class LocalServerTestCase(unittest.TestCase):
+    """Serve the test pages on a local port for the whole test case."""
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+class TestStaticFetcher(LocalServerTestCase):
+    def setUp(self):
+        self.fetcher = StaticFetcher()
+
+    def tearDown(self):
+        self.fetcher.close()
+
+    def test_fetch_static_page(self):
+        page = self.fetcher.fetch(f"{self.base_url}/article")
+        self.assertIsNotNone(page)
+        snapshot = page.snapshot()
+        self.assertEqual(snapshot["title"], "Static article")
+        self.assertIn("without starting the browser", snapshot["html"])
+        self.assertIn(f"{self.base_url}/next", [link["url"] for link in snapshot["links"]])
+        self.assertEqual([i["text"] for i in snapshot["inputs"]], ["q"])
+
+    def test_follow_redirect(self):
+        page = self.fetcher.fetch(f"{self.base_url}/redirect")
+        self.assertIsNotNone(page)
+        self.assertEqual(page.url, f"{self.base_url}/article")
+
+    def test_pages_left_to_browser(self):
+        for path in ["/app", "/paper.pdf", "/api", "/missing"]:
+            self.assertIsNone(self.fetcher.fetch(f"{self.base_url}{path}"), path)
+        self.assertIsNone(self.fetcher.fetch("file:///etc/hosts"))
+
+    def test_max_bytes(self):
+        fetcher = StaticFetcher(max_bytes=100)
+        self.assertIsNone(fetcher.fetch(f"{self.base_url}/article"))
+        fetcher.close()
+
+    def test_mode_per_domain(self):
+        fetcher = StaticFetcher("auto", parse_domain_modes("wikipedia.org:static en.wikipedia.org:browser x.com:browser"))
+        self.assertEqual(fetcher.mode_for("https://fr.wikipedia.org/wiki/Paris"), "static")
+        self.assertEqual(fetcher.mode_for("https://en.wikipedia.org/wiki/Paris"), "browser")
+        self.assertEqual(fetcher.mode_for("https://x.com/home"), "browser")
+        self.assertEqual(fetcher.mode_for("https://example.com"), "auto")
+        with self.assertRaises(ValueError):
+            parse_domain_modes("example.com:fast")
+        with self.assertRaises(ValueError):
+            StaticFetcher("fast")
+
+class TestBrowserFetchMode(LocalServerTestCase):
+    def make_browser(self, fetch_mode="auto", domain_fetch_modes=None) -> Browser:
+        self.driver = MagicMock()
+        self.driver.execute_script.return_value = None
+        with patch.object(Browser, 'screenshot'):
+            browser = Browser(self.driver, fetch_mode=fetch_mode, domain_fetch_modes=domain_fetch_modes)
+        self.driver.get.reset_mock()
+        return browser
+
+    def go_to(self, browser: Browser, path: str) -> bool:
+        with patch('sources.browser.time.sleep'), patch.object(Browser, 'human_scroll'), \
+             patch('sources.browser.WebDriverWait'):
+            return browser.go_to(f"{self.base_url}{path}")
+
+    def test_static_page_skips_chrome(self):
+        browser = self.make_browser()
+        self.assertTrue(self.go_to(browser, "/article"))
+        self.driver.get.assert_not_called()
+        self.assertEqual(browser.get_current_url(), f"{self.base_url}/article")
+        self.assertEqual(browser.get_page_title(), "Static article")
+        self.assertIn("without starting the browser", browser.get_text())
+        self.assertIn(f"{self.base_url}/next", browser.get_navigable())
+
+    def test_fallback_to_chrome(self):
+        browser = self.make_browser()
+        for path in ["/app", "/short", "/paper.pdf"]:
+            self.assertTrue(self.go_to(browser, path))
+            self.driver.get.assert_called_once_with(f"{self.base_url}{path}")
+            self.assertIsNone(browser.static_url)
+            self.driver.get.reset_mock()
+
+    def test_static_mode_keeps_short_pages(self):
+        browser = self.make_browser(fetch_mode="static")
+        self.assertTrue(self.go_to(browser, "/short"))
+        self.driver.get.assert_not_called()
+
+    def test_browser_mode_per_domain(self):
+        browser = self.make_browser(domain_fetch_modes={"127.0.0.1": "browser"})
+        self.assertTrue(self.go_to(browser, "/article"))
+        self.driver.get.assert_called_once_with(f"{self.base_url}/article")
+
+    def test_prefetched_page(self):
+        browser = self.make_browser()
+        urls = [f"{self.base_url}/article", f"{self.base_url}/app", "https://x.com/home"]
+        browser.fetcher.domain_modes["x.com"] = "browser"
+        self.assertEqual(browser.prefetch(urls), 2)
+        browser.prefetcher.executor.shutdown(wait=True)
+        with patch.object(browser.fetcher, 'fetch') as fetch:
+            self.assertTrue(self.go_to(browser, "/article"))
+            self.assertTrue(self.go_to(browser, "/app"))
+            fetch.assert_not_called()
+        self.driver.get.assert_called_once_with(f"{self.base_url}/app")
+        self.assertEqual(browser.prefetcher.hits, 2)
+
+    def test_slow_prefetch_not_fetched_twice(self):
+        browser = self.make_browser()
+        browser.fetcher.timeout = 0.1 # the page takes longer than twice the read timeout
+        HITS["/slow"] = 0
+        browser.prefetch([f"{self.base_url}/slow"])
+        time.sleep(0.05)
+        self.assertTrue(self.go_to(browser, "/slow"))
+        self.assertEqual(HITS["/slow"], 1)
+        self.assertIsNotNone(browser.static_url)
+
+    def test_interaction_loads_chrome(self):
+        browser = self.make_browser()
+        self.assertTrue(self.go_to(browser, "/article"))
+        with patch('sources.browser.time.sleep'), patch.object(Browser, 'human_scroll'), \
+             patch('sources.browser.WebDriverWait'):
+            browser.scroll_bottom()
+        self.driver.get.assert_called_once_with(f"{self.base_url}/article")
+        self.assertIsNone(browser.static_url)
+
+if __name__ == '__main__':
+    unittest.main()
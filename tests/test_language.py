@@ -0,0 +1,57 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.language import LanguageUtility
+
+class TestLanguageUtility(unittest.TestCase):
+    def setUp(self):
+        self.language = LanguageUtility(supported_language=["en", "fr", "zh"], cache_size=2)
+        self.batches = []
+        def run_translation(lang, texts):
+            self.batches.append((lang, list(texts)))
+            return [f"en({text})" for text in texts]
+        self.language.run_translation = run_translation
+
+    def test_translation_cached(self):
+        self.assertEqual(self.language.translate("bonjour", "fr"), "en(bonjour)")
+        self.assertEqual(self.language.translate("bonjour", "fr"), "en(bonjour)")
+        self.assertEqual(len(self.batches), 1)
+
+    def test_language_is_part_of_key(self):
+        self.language.translate("chat", "fr")
+        self.language.translate("chat", "zh")
+        self.assertEqual(self.batches, [("fr", ["chat"]), ("zh", ["chat"])])
+
+    def test_lru_eviction(self):
+        for text in ["un", "deux", "un", "trois"]:
+            self.language.translate(text, "fr")
+        self.assertEqual(list(self.language.translation_cache), [("fr", "un"), ("fr", "trois")])
+
+    def test_batch_grouped_by_language(self):
+        results = self.language.translate_batch(["bonjour", "hello", "你好", "salut", "bonjour"],
+                                                ["fr", "en", "zh", "fr", "fr"])
+        self.assertEqual(results, ["en(bonjour)", "hello", "en(你好)", "en(salut)", "en(bonjour)"])
+        self.assertEqual(self.batches, [("fr", ["bonjour", "salut"]), ("zh", ["你好"])])
+
+    def test_unsupported_language_unchanged(self):
+        self.assertEqual(self.language.translate("hola", "es"), "hola")
+        self.assertEqual(self.batches, [])
+
+    def test_languages_restricted_once(self):
+        identifier = MagicMock()
+        identifier.classify.return_value = ("fr", -10.0)
+        with patch('sources.language.get_model', return_value=identifier) as get_model:
+            self.assertEqual(self.language.detect_language("bonjour"), "fr")
+            self.language.detect_language("salut")
+        get_model.assert_called_once()
+        self.assertEqual(get_model.call_args[0][0], "langid-en-fr-zh")
+
+    def test_detect_language(self):
+        self.assertEqual(self.language.detect_language("Bonjour, comment vas-tu aujourd'hui ?"), "fr")
+        self.assertEqual(self.language.detect_language("Hello, how are you doing today?"), "en")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from llm_server.sources.cache import Cache
+from llm_server.sources.generator import GeneratorLLM
+
+HISTORY = [{"role": "user", "content": "Hello"}]
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def make_cache(self, **kwargs) -> Cache:
+        cache = Cache(cache_dir=self.tmp.name, **kwargs)
+        self.addCleanup(cache.conn.close)
+        return cache
+
+    def test_make_key(self):
+        key = Cache.make_key("model-a", HISTORY, {"temperature": 0.2, "top_p": 0.9})
+        self.assertEqual(key, Cache.make_key("model-a", [dict(HISTORY[0])], {"top_p": 0.9, "temperature": 0.2}))
+        self.assertEqual(len(key), 64)
+        self.assertNotEqual(key, Cache.make_key("model-b", HISTORY, {"temperature": 0.2, "top_p": 0.9}))
+        self.assertNotEqual(key, Cache.make_key("model-a", HISTORY, {"temperature": 0.7, "top_p": 0.9}))
+        self.assertNotEqual(key, Cache.make_key("model-a", HISTORY + [{"role": "assistant", "content": "Hi"}]))
+        self.assertEqual(Cache.make_key("model-a", HISTORY), Cache.make_key("model-a", HISTORY, {}))
+
+    def test_get_put(self):
+        cache = self.make_cache()
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", "response")
+        cache.put("key", "updated")
+        self.assertEqual(cache.get("key"), "updated")
+        self.assertEqual(cache.stats(), {"entries": 1, "hits": 1, "misses": 1})
+
+    def test_lru_eviction(self):
+        cache = self.make_cache(max_entries=2)
+        cache.put("a", "1")
+        time.sleep(0.01)
+        cache.put("b", "2")
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.put("c", "3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_age_eviction(self):
+        cache = self.make_cache(max_age=0.05)
+        cache.put("old", "1")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("old"))
+        cache.put("new", "2")
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.get("new"), "2")
+
+    def test_persistence(self):
+        cache = self.make_cache()
+        cache.put("key", "response")
+        cache.conn.close()
+        reopened = self.make_cache()
+        self.assertEqual(reopened.stats()["entries"], 1)
+        self.assertEqual(reopened.get("key"), "response")
+
+class EchoLLM(GeneratorLLM):
+    def __init__(self, **kwargs):
+        super().__init__(use_cache=False, **kwargs)
+        self.calls = 0
+
+    def generate(self, history, state):
+        self.calls += 1
+        with state.lock:
+            state.current_buffer = f"{state.model} {state.params}"
+
+class TestGeneratorCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.generator = EchoLLM()
+        self.generator.cache = Cache(cache_dir=self.tmp.name)
+        self.addCleanup(self.generator.cache.conn.close)
+        self.generator.set_model("model-a")
+
+    def run_generation(self, **kwargs) -> str:
+        generation_id = self.generator.start(HISTORY, **kwargs)
+        return "".join(self.generator.stream_updates(generation_id))
+
+    def test_cached_per_model_and_params(self):
+        self.assertEqual(self.run_generation(params={"temperature": 0.2}), "model-a {'temperature': 0.2}")
+        self.assertEqual(self.run_generation(params={"temperature": 0.2}), "model-a {'temperature': 0.2}")
+        self.assertEqual(self.generator.calls, 1)
+        self.assertEqual(self.run_generation(params={"temperature": 0.7}), "model-a {'temperature': 0.7}")
+        self.assertEqual(self.run_generation(model="model-b", params={"temperature": 0.2}), "model-b {'temperature': 0.2}")
+        self.assertEqual(self.generator.calls, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from llm_server.sources.generator import GeneratorLLM
+
+class FakeLLM(GeneratorLLM):
+    """Generator writing the model name token by token, held until released."""
+    def __init__(self, **kwargs):
+        super().__init__(use_cache=False, **kwargs)
+        self.release = threading.Event()
+        self.running = 0
+        self.peak = 0
+        self.count_lock = threading.Lock()
+
+    def generate(self, history, state):
+        with self.count_lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            self.release.wait(timeout=5)
+            for token in [state.model, " answer"]:
+                if state.is_cancelled:
+                    break
+                with state.lock:
+                    state.current_buffer += token
+                    state.updated.notify_all()
+        finally:
+            with self.count_lock:
+                self.running -= 1
+
+def wait_finished(generator: GeneratorLLM, generation_id: str, timeout: float = 5) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = generator.get_status(generation_id)
+        if status["is_complete"]:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"generation {generation_id} did not finish")
+
+class TestGenerator(unittest.TestCase):
+    def setUp(self):
+        self.generator = FakeLLM(max_concurrent=2, max_queue=1)
+        self.generator.set_model("model-a")
+        self.addCleanup(self.generator.release.set)
+
+    def test_full_queue_returns_none(self):
+        ids = [self.generator.start([{"role": "user", "content": str(i)}]) for i in range(3)]
+        self.assertTrue(all(ids))
+        self.assertIsNone(self.generator.start([{"role": "user", "content": "refused"}]))
+        self.generator.release.set()
+        for generation_id in ids:
+            wait_finished(self.generator, generation_id)
+        self.assertIsNotNone(self.generator.start([{"role": "user", "content": "accepted"}]))
+
+    def test_max_concurrent(self):
+        ids = [self.generator.start([]) for _ in range(3)]
+        time.sleep(0.2)
+        self.assertEqual(self.generator.running, 2)
+        queued = [self.generator.get_status(generation_id)["is_queued"] for generation_id in ids]
+        self.assertEqual(queued.count(True), 1)
+        self.generator.release.set()
+        for generation_id in ids:
+            wait_finished(self.generator, generation_id)
+        self.assertEqual(self.generator.peak, 2)
+
+    def test_status_per_generation(self):
+        first = self.generator.start([])
+        self.generator.set_model("model-b")
+        second = self.generator.start([], model="model-c")
+        self.generator.release.set()
+        self.assertEqual(wait_finished(self.generator, first)["sentence"], "model-a answer")
+        self.assertEqual(wait_finished(self.generator, second)["sentence"], "model-c answer")
+        self.assertIsNone(self.generator.get_status("unknown"))
+
+    def test_model_fixed_when_queued(self):
+        generation_id = self.generator.start([])
+        self.generator.set_model("model-b")
+        self.generator.release.set()
+        self.assertEqual(wait_finished(self.generator, generation_id)["sentence"], "model-a answer")
+
+    def test_cancel_queued_generation(self):
+        running = [self.generator.start([]) for _ in range(2)]
+        time.sleep(0.1)
+        queued = self.generator.start([])
+        self.assertTrue(self.generator.get_status(queued)["is_queued"])
+        self.assertTrue(self.generator.cancel(queued))
+        self.assertFalse(self.generator.cancel("unknown"))
+        self.generator.release.set()
+        self.assertEqual(wait_finished(self.generator, queued)["sentence"], "")
+        for generation_id in running:
+            self.assertEqual(wait_finished(self.generator, generation_id)["sentence"], "model-a answer")
+
+    def test_stream_updates(self):
+        generation_id = self.generator.start([])
+        self.generator.release.set()
+        self.assertEqual("".join(self.generator.stream_updates(generation_id)), "model-a answer")
+
+    def test_purge_finished(self):
+        self.generator.retention = 0.05
+        self.generator.release.set()
+        generation_id = self.generator.start([])
+        wait_finished(self.generator, generation_id)
+        self.generator.purge_finished()
+        self.assertIsNotNone(self.generator.get_status(generation_id))
+        time.sleep(0.1)
+        self.generator.purge_finished()
+        self.assertIsNone(self.generator.get_status(generation_id))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,8 @@ import os
 import sys
 import json
 import datetime
+from unittest.mock import MagicMock
+import numpy as np
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
 from sources.memory import Memory
@@ -79,6 +81,126 @@ class TestMemory(unittest.TestCase):
         self.memory.reset(new_memory)
         self.assertEqual(self.memory.memory, new_memory)
 
+    def test_get_within_token_budget(self):
+        memory = Memory(self.system_prompt, memory_compression=False,
+                        tokenizer="approx", context_size=64, max_answer_tokens=16)
+        for i in range(10):
+            memory.push("user", f"message number {i} " * 4)
+        history = memory.get()
+        self.assertEqual(history[0]['content'], self.system_prompt)
+        self.assertEqual(history[-1]['content'], memory.memory[-1]['content'])
+        self.assertLess(len(history), len(memory.memory))
+        used = sum(memory.count_tokens(msg['content']) + 4 for msg in history)
+        self.assertLessEqual(used, memory.get_token_budget())
+        self.assertNotIn('tokens', history[-1])
+
+    def test_trim_text_to_max_ctx(self):
+        memory = Memory(self.system_prompt, memory_compression=False,
+                        tokenizer="approx", context_size=2048, max_answer_tokens=1024)
+        text = "word " * 4000
+        trimmed = memory.trim_text_to_max_ctx(text)
+        self.assertEqual(memory.count_tokens(trimmed), 512)
+        self.assertTrue(text.startswith(trimmed))
+
+    def test_select_text_to_max_ctx(self):
+        memory = Memory(self.system_prompt, memory_compression=False,
+                        tokenizer="approx", context_size=2048, max_answer_tokens=1024)
+        filler = [f"Section {i} is about gardening, soil and the watering of tomato plants in summer. " * 6 for i in range(40)]
+        relevant = "The Eiffel Tower is 330 metres tall and was completed in 1889 for the World's Fair."
+        text = "\n\n".join(["[Start of page]"] + filler[:30] + [relevant] + filler[30:] + ["[End of page]"])
+        selected = memory.select_text_to_max_ctx(text, "How tall is the Eiffel Tower?")
+        self.assertLessEqual(memory.count_tokens(selected), 512)
+        self.assertTrue(selected.startswith("[Start of page]"))
+        self.assertIn(relevant, selected)
+        self.assertIn("[...]", selected)
+        # head truncation never reaches it
+        self.assertNotIn(relevant, memory.trim_text_to_max_ctx(text))
+        short = "\n\n".join(filler[:2])
+        self.assertEqual(memory.select_text_to_max_ctx(short, "Eiffel Tower"), short)
+
+    def test_background_compression(self):
+        memory = Memory(self.system_prompt, memory_compression=False)
+        memory.memory_compression = True
+        memory.model, memory.tokenizer = MagicMock(), MagicMock()
+        memory.summarize = MagicMock(side_effect=lambda text: "summary")
+        long_text = "long message " * 100
+        memory.push("user", long_text)
+        memory.push("assistant", "short answer")
+        memory.schedule_compression()
+        memory.wait_compression(timeout=5)
+        self.assertEqual(memory.memory[1]['content'], "summary")
+        self.assertEqual(memory.memory[2]['content'], "short answer")
+        # already summarized messages are skipped, identical texts reuse the cached summary
+        memory.push("user", long_text)
+        memory.schedule_compression()
+        memory.wait_compression(timeout=5)
+        self.assertEqual(memory.memory[3]['content'], "summary")
+        self.assertEqual(memory.summarize.call_count, 1)
+
+    def test_semantic_retrieval(self):
+        topics = ["cooking", "python", "travel", "music"]
+        def fake_encode(texts):
+            vectors = np.array([[float(topic in text) for topic in topics] for text in texts], dtype=np.float32)
+            return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+        memory = Memory(self.system_prompt, memory_compression=False, semantic_retrieval=True,
+                        recent_turns=2, retrieved_turns=1)
+        memory.embedder = MagicMock()
+        memory.embedder.encode.side_effect = fake_encode
+        for topic in topics:
+            memory.push("user", f"question about {topic}")
+            memory.push("assistant", f"answer about {topic} stuff")
+        memory.push("user", "more about python please")
+        history = memory.get()
+        contents = [msg['content'] for msg in history]
+        self.assertEqual(contents[0], self.system_prompt)
+        self.assertEqual(len(history), 4)
+        self.assertIn("python", contents[1])
+        self.assertEqual(contents[-1], "more about python please")
+        # older messages are embedded once
+        memory.get()
+        embedded = sum(len(call.args[0]) for call in memory.embedder.encode.call_args_list)
+        self.assertEqual(embedded, 7 + 2)
+
+    def test_save_appends_new_messages(self):
+        self.memory.push("user", "Hello")
+        self.memory.save_memory()
+        self.memory.push("assistant", "Hi")
+        self.memory.save_memory()
+        path = os.path.join(self.memory.conversation_folder, "casual_agent", self.memory.get_filename())
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[-1])['content'], "Hi")
+        # changed messages rewrite the session file
+        self.memory.clear()
+        self.memory.save_memory()
+        with open(path) as f:
+            self.assertEqual(len(f.read().splitlines()), 1)
+
+    def test_load_last_session_from_index(self):
+        old = Memory(self.system_prompt, memory_compression=False)
+        old.session_time = datetime.datetime(2024, 1, 1, 9, 0, 0)
+        old.push("user", "old question")
+        old.push("assistant", "old answer")
+        old.save_memory()
+        self.memory.session_time = datetime.datetime(2024, 1, 1, 18, 0, 0)
+        self.memory.push("user", "new question")
+        self.memory.push("assistant", "new answer")
+        self.memory.save_memory()
+        new_memory = Memory(self.system_prompt, recover_last_session=True, memory_compression=False)
+        self.assertEqual(new_memory.memory[1]['content'], "new question")
+
+    def test_load_legacy_json_session(self):
+        save_path = os.path.join(self.memory.conversation_folder, "casual_agent")
+        os.makedirs(save_path)
+        legacy = [{'role': 'system', 'content': self.system_prompt},
+                  {'role': 'user', 'content': "Hello"},
+                  {'role': 'assistant', 'content': "Hi"}]
+        with open(os.path.join(save_path, "memory_2024-01-01_10-00-00.txt"), 'w') as f:
+            json.dump(legacy, f)
+        new_memory = Memory(self.system_prompt, recover_last_session=True, memory_compression=False)
+        self.assertEqual(new_memory.memory, legacy)
+
     def test_save_and_load_memory(self):
         self.memory.push("user", "Hello")
         self.memory.push("assistant", "Hi")
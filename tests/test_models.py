@@ -0,0 +1,47 @@
+import unittest
+import os
+import sys
+import threading
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.models import ModelRegistry
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+
+    def test_loads_once(self):
+        loader = MagicMock(return_value="model")
+        self.assertEqual(self.registry.get("test", loader), "model")
+        self.assertEqual(self.registry.get("test", loader), "model")
+        loader.assert_called_once()
+        self.assertTrue(self.registry.is_loaded("test"))
+
+    def test_concurrent_loads_once(self):
+        loader = MagicMock(return_value="model")
+        threads = [threading.Thread(target=self.registry.get, args=("test", loader)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        loader.assert_called_once()
+
+    def test_unload(self):
+        loader = MagicMock(return_value="model")
+        self.registry.get("test", loader)
+        self.registry.unload("test")
+        self.assertFalse(self.registry.is_loaded("test"))
+        self.registry.get("test", loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_quantize_cpu_model(self):
+        import torch
+        model = torch.nn.Sequential(torch.nn.Linear(8, 8))
+        quantized = self.registry.get("linear", lambda: model, quantize=True)
+        self.assertIsNot(quantized, model)
+        self.assertNotIsInstance(quantized[0], torch.nn.Linear)
+        self.assertEqual(quantized(torch.zeros(1, 8)).shape, (1, 8))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+import random
+import torch
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.models import ModelRegistry, ONNX_FOUND
+from sources.router import AgentRouter
+
+ROLES = ["talk", "code", "files", "web", "mcp"]
+
+def make_router(onnx: bool) -> AgentRouter:
+    agents = []
+    for role in ROLES:
+        agent = MagicMock()
+        agent.role = role
+        agents.append(agent)
+    random.seed(0)
+    torch.manual_seed(0)
+    with patch('sources.models.registry', ModelRegistry(onnx=onnx)):
+        router = AgentRouter(agents, supported_language=["en"], warm_up=False)
+        router.load_models()
+    if not router.is_ready():
+        raise Exception(router.load_error)
+    return router
+
+@unittest.skipUnless(ONNX_FOUND, "optimum[onnxruntime] is not installed")
+class TestOnnxRoutingParity(unittest.TestCase):
+    """The ONNX int8 router should take the same decisions as the PyTorch router on the few shots sets."""
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.torch_router = make_router(onnx=False)
+            cls.onnx_router = make_router(onnx=True)
+        except Exception as e:
+            raise unittest.SkipTest(f"Router models unavailable: {str(e)}")
+
+    def agreement(self, decide, texts) -> float:
+        same = sum(decide(self.torch_router, text) == decide(self.onnx_router, text) for text in texts)
+        return same / len(texts)
+
+    def test_tasks_parity(self):
+        texts = [text for text, _ in self.torch_router.load_few_shots("tasks")]
+        agreement = self.agreement(lambda router, text: router.router_vote(text, ROLES), texts)
+        self.assertGreaterEqual(agreement, 0.95)
+
+    def test_complexity_parity(self):
+        texts = [text for text, _ in self.torch_router.load_few_shots("complexity")]
+        agreement = self.agreement(lambda router, text: router.estimate_complexity(text), texts)
+        self.assertGreaterEqual(agreement, 0.95)
+
+if __name__ == '__main__':
+    unittest.main()
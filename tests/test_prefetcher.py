@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.prefetcher import Prefetcher
+
+class SlowLoader:
+    """Load a url in `delay` seconds, record the calls and the peak number of parallel loads."""
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url: str):
+        with self.lock:
+            self.calls.append(url)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        if "fail" in url:
+            raise RuntimeError("connection reset")
+        return None if "dynamic" in url else f"text of {url}"
+
+class TestPrefetcher(unittest.TestCase):
+    def setUp(self):
+        self.loader = SlowLoader()
+        self.prefetcher = Prefetcher(self.loader, workers=4, cache_size=4)
+
+    def tearDown(self):
+        self.prefetcher.close()
+
+    def test_parallel_prefetch(self):
+        urls = [f"https://example.com/{i}" for i in range(4)]
+        start = time.time()
+        self.assertEqual(self.prefetcher.prefetch(urls), 4)
+        results = [self.prefetcher.take(url) for url in urls]
+        self.assertLess(time.time() - start, 0.2 * 3)
+        self.assertEqual(self.loader.peak, 4)
+        self.assertEqual(results, [(True, f"text of {url}") for url in urls])
+        self.assertEqual(self.prefetcher.hits, 4)
+
+    def test_no_duplicate_loads(self):
+        self.prefetcher.prefetch(["https://example.com/a"])
+        self.assertEqual(self.prefetcher.prefetch(["https://example.com/a", "https://example.com/b"]), 1)
+        self.prefetcher.take("https://example.com/b")
+        self.assertEqual(sorted(self.loader.calls), ["https://example.com/a", "https://example.com/b"])
+
+    def test_results_are_cached_including_none(self):
+        self.prefetcher.prefetch(["https://example.com/dynamic"])
+        self.assertEqual(self.prefetcher.take("https://example.com/dynamic"), (True, None))
+        self.assertEqual(self.prefetcher.take("https://example.com/dynamic"), (False, None))
+        self.assertEqual(self.prefetcher.take("https://example.com/never"), (False, None))
+
+    def test_failed_load_is_a_miss(self):
+        self.prefetcher.prefetch(["https://example.com/fail"])
+        self.assertEqual(self.prefetcher.take("https://example.com/fail"), (False, None))
+
+    def test_take_timeout(self):
+        self.prefetcher.prefetch(["https://example.com/slow"])
+        self.assertEqual(self.prefetcher.take("https://example.com/slow", timeout=0.01), (False, None))
+
+    def test_bounded_cache(self):
+        urls = [f"https://example.com/{i}" for i in range(6)]
+        self.prefetcher.prefetch(urls[:3])
+        self.prefetcher.prefetch(urls[3:])
+        self.assertEqual(len(self.prefetcher.cache), 4)
+        self.assertEqual(list(self.prefetcher.cache), urls[2:])
+        self.assertFalse(self.prefetcher.take(urls[0])[0])
+
+    def test_expired_results(self):
+        prefetcher = Prefetcher(self.loader, max_age=0.0)
+        prefetcher.prefetch(["https://example.com/a"])
+        time.sleep(0.01)
+        self.assertEqual(prefetcher.take("https://example.com/a"), (False, None))
+        prefetcher.close()
+
+if __name__ == '__main__':
+    unittest.main()
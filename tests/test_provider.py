@@ -1,4 +1,7 @@
 import unittest
+import asyncio
+import json
+import httpx
 from unittest.mock import patch, MagicMock
 import os, sys
 import socket
@@ -66,5 +69,95 @@ class TestIsIpOnline(unittest.TestCase):
             result = self.checker.is_ip_online(address)
             self.assertTrue(result)
 
+class TestServerStreaming(unittest.TestCase):
+    def setUp(self):
+        self.provider = Provider("server", "deepseek-r1:32b", "http://127.0.0.1:3333")
+
+    def stream_response(self, lines, status_code=200):
+        response = MagicMock(status_code=status_code)
+        response.iter_lines.return_value = lines
+        response.__enter__.return_value = response
+        return response
+
+    def test_stream_tokens(self):
+        """Test tokens are concatenated from the /stream route"""
+        lines = ['{"token": "Hello"}', '', '{"token": " world"}', '{"is_complete": true}']
+        session = MagicMock()
+        session.post.return_value = self.stream_response(lines)
+        with patch.object(self.provider, 'get_http_session', return_value=session):
+            result = self.provider.server_stream_fn([{"role": "user", "content": "hi"}])
+        self.assertEqual(result, "Hello world")
+
+    def test_stream_not_supported(self):
+        """Test an older server without /stream return None"""
+        session = MagicMock()
+        session.post.return_value = self.stream_response([], status_code=404)
+        with patch.object(self.provider, 'get_http_session', return_value=session):
+            result = self.provider.server_stream_fn([{"role": "user", "content": "hi"}])
+        self.assertIsNone(result)
+
+    def test_fallback_to_polling(self):
+        """Test server_fn fall back to polling when streaming is unavailable"""
+        with patch.object(self.provider, 'get_http_session', return_value=MagicMock()), \
+             patch.object(self.provider, 'server_stream_fn', return_value=None), \
+             patch.object(self.provider, 'server_poll_fn', return_value="polled") as poll:
+            result = self.provider.server_fn([{"role": "user", "content": "hi"}])
+        self.assertEqual(result, "polled")
+        self.assertFalse(self.provider.server_streaming)
+        poll.assert_called_once()
+
+class TestRespondAsync(unittest.TestCase):
+    def test_thread_fallback(self):
+        """Test providers without async client run the blocking path"""
+        provider = Provider("test", "test-model")
+        result = asyncio.run(provider.respond_async([{"role": "user", "content": "hi"}]))
+        self.assertIn("plan", result)
+
+    def test_async_provider(self):
+        """Test providers with an async client are awaited directly"""
+        provider = Provider("server", "deepseek-r1:32b", "http://127.0.0.1:3333")
+        async def server_async_fn(history, verbose):
+            return "streamed"
+        provider.async_providers["server"] = server_async_fn
+        result = asyncio.run(provider.respond_async([{"role": "user", "content": "hi"}]))
+        self.assertEqual(result, "streamed")
+
+    def test_server_async_sends_model(self):
+        """Test the async /stream request names the model, so the server does not use its global one"""
+        provider = Provider("server", "deepseek-r1:32b", "http://127.0.0.1:3333")
+        bodies = {}
+        def handler(request):
+            bodies[request.url.path] = json.loads(request.content)
+            return httpx.Response(200, text='{"token": "Hello"}\n{"is_complete": true}\n')
+        async def run():
+            provider.clients["http_async"] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            provider.clients_calls["http_async"] = 0
+            return await provider.server_async_fn([{"role": "user", "content": "hi"}])
+        self.assertEqual(asyncio.run(run()), "Hello")
+        self.assertEqual(bodies["/stream"], {"messages": [{"role": "user", "content": "hi"}], "model": "deepseek-r1:32b"})
+
+class TestClientPool(unittest.TestCase):
+    def setUp(self):
+        self.provider = Provider("server", "deepseek-r1:32b", "http://127.0.0.1:3333")
+
+    def tearDown(self):
+        self.provider.close()
+
+    def test_client_reused(self):
+        """Test a client is created once and reused across calls"""
+        factory = MagicMock(side_effect=lambda: MagicMock())
+        first = self.provider.get_client("test", factory)
+        second = self.provider.get_client("test", factory)
+        self.assertIs(first, second)
+        factory.assert_called_once()
+
+    def test_pool_stats(self):
+        """Test pool statistics count calls and connections of the http session"""
+        self.provider.get_http_session()
+        self.provider.get_http_session()
+        stats = self.provider.get_pool_stats()
+        self.assertEqual(stats["http"]["calls"], 2)
+        self.assertEqual(stats["http"]["connections"], 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
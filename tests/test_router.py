@@ -0,0 +1,318 @@
+import unittest
+import os
+import sys
+import json
+import glob
+import tempfile
+import torch
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.router import AgentRouter, RuleRouter
+
+def make_agent(role: str, name: str) -> MagicMock:
+    agent = MagicMock()
+    agent.role = role
+    agent.agent_name = name
+    return agent
+
+class TestAgentRouter(unittest.TestCase):
+    def setUp(self):
+        self.agents = [make_agent("talk", "jarvis"), make_agent("code", "coder"),
+                       make_agent("files", "file"), make_agent("web", "browser")]
+        self.router = AgentRouter(self.agents, warm_up=False)
+
+    def test_fallback_routing_before_ready(self):
+        self.assertFalse(self.router.is_ready())
+        self.assertEqual(self.router.select_agent("write a python script to ping a website").role, "code")
+        self.assertEqual(self.router.select_agent("search the web for the latest news").role, "web")
+        self.assertEqual(self.router.select_agent("find the file notes.txt in my documents folder").role, "files")
+        self.assertEqual(self.router.select_agent("hey how are you doing?").role, "talk")
+
+    def test_load_models_switch_to_ready(self):
+        with patch.object(AgentRouter, 'load_pipelines', return_value={"bart": MagicMock()}), \
+             patch('sources.router.get_model', return_value=(MagicMock(), MagicMock())), \
+             patch.object(self.router.lang_analysis, 'load_model'):
+            self.router.load_models()
+        self.assertTrue(self.router.is_ready())
+        self.assertEqual(self.router.status(), {"ready": True, "loading": False, "error": None})
+
+    def test_llm_router_follows_onnx_setting(self):
+        for onnx in [False, True]:
+            with patch('sources.router.onnx_enabled', return_value=onnx), \
+                 patch('sources.router.AdaptiveClassifier.from_pretrained') as from_pretrained:
+                self.router.load_llm_router()
+            from_pretrained.assert_called_once_with(self.router.router_path, use_onnx=onnx)
+
+    def test_load_models_failure_keeps_fallback(self):
+        with patch.object(AgentRouter, 'load_pipelines', side_effect=Exception("no model")):
+            self.router.load_models()
+        self.assertFalse(self.router.is_ready())
+        self.assertEqual(self.router.status()["error"], "no model")
+        self.assertEqual(self.router.select_agent("debug this C++ code").role, "code")
+
+class ReadyRouterTestCase(unittest.TestCase):
+    """Router with fake classifiers, ready to route."""
+    def setUp(self):
+        self.agents = [make_agent("talk", "jarvis"), make_agent("code", "coder"), make_agent("web", "browser")]
+        self.router = AgentRouter(self.agents, warm_up=False)
+        # the queries go to the routing models
+        self.router.rules = RuleRouter()
+        self.router.talk_classifier = FakeClassifier(predictions=[("code", 0.8), ("web", 0.1), ("HIGH", 0.1)])
+        self.router.complexity_classifier = FakeClassifier(predictions=[("LOW", 0.9), ("HIGH", 0.1)])
+        self.router.pipelines = {"bart": MagicMock(return_value={"labels": ["web"], "scores": [0.9]})}
+        self.router.lang_analysis = MagicMock()
+        self.router.lang_analysis.detect_language.return_value = "en"
+        self.router.lang_analysis.translate.side_effect = lambda text, lang: text
+        self.router.ready.set()
+
+class TestSingleEncoderRouting(ReadyRouterTestCase):
+    def test_one_encoder_pass_without_tiebreak(self):
+        agent = self.router.select_agent("write a python script to ping a website")
+        self.assertEqual(agent.role, "code")
+        self.assertEqual(self.router.talk_classifier.embed_calls, 1)
+        self.assertEqual(self.router.complexity_classifier.embed_calls, 0)
+        self.router.pipelines["bart"].assert_not_called()
+
+    def test_bart_tiebreak_on_low_confidence(self):
+        self.router.talk_classifier.predictions = [("code", 0.4), ("web", 0.35), ("talk", 0.25)]
+        agent = self.router.select_agent("look at this thing for me please")
+        self.assertEqual(agent.role, "web")
+        self.router.pipelines["bart"].assert_called_once()
+
+class TestRoutingCache(ReadyRouterTestCase):
+    def test_repeated_query_hits_cache(self):
+        self.router.select_agent("Write a python script to ping a website")
+        agent = self.router.select_agent("write a  python script to ping a website!")
+        self.assertEqual(agent.role, "code")
+        self.assertEqual(self.router.talk_classifier.embed_calls, 1)
+        stats = self.router.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_language_is_part_of_key(self):
+        self.router.select_agent("write a python script")
+        self.router.lang_analysis.detect_language.return_value = "fr"
+        self.router.select_agent("write a python script")
+        self.assertEqual(self.router.talk_classifier.embed_calls, 2)
+
+    def test_agents_change_invalidates(self):
+        self.router.select_agent("write a python script")
+        self.router.agents = self.router.agents[:2]
+        self.router.select_agent("write a python script")
+        self.assertEqual(self.router.talk_classifier.embed_calls, 2)
+        self.assertEqual(self.router.cache.stats()["invalidations"], 1)
+
+    def test_ttl_expiry(self):
+        self.router.cache.ttl = 0
+        self.router.select_agent("write a python script")
+        self.router.select_agent("write a python script")
+        self.assertEqual(self.router.talk_classifier.embed_calls, 2)
+
+class TestBatchedRouting(ReadyRouterTestCase):
+    queries = ["write a python script to ping a website", "hi", "look at this thing for me please",
+               "write a python script to ping a website"]
+
+    def setUp(self):
+        super().setUp()
+        self.router.lang_analysis.translate_batch.side_effect = lambda texts, langs: texts
+        # low confidence for long queries so the tiebreak is exercised
+        predictions = {len(self.queries[2]): [("code", 0.4), ("web", 0.35), ("talk", 0.25)]}
+        classifier = self.router.talk_classifier
+        # like the real classifier, predict embeds the text
+        classifier.predict = lambda text: (classifier._get_embeddings([text]),
+                                           predictions.get(len(text), [("code", 0.8), ("web", 0.1)]))[1]
+        bart_result = {"labels": ["web"], "scores": [0.9]}
+        self.router.pipelines["bart"].side_effect = lambda texts, labels, **kwargs: \
+            [bart_result] * len(texts) if isinstance(texts, list) else bart_result
+
+    def test_same_decisions_as_single_queries(self):
+        batched = [agent.role for agent in self.router.select_agents(self.queries)]
+        self.router.cache.clear()
+        single = [self.router.select_agent(query).role for query in self.queries]
+        self.assertEqual(batched, single)
+        self.assertEqual(batched, ["code", "talk", "web", "code"])
+
+    def test_one_encoder_and_bart_call_per_batch(self):
+        self.router.select_agents(self.queries)
+        self.assertEqual(self.router.talk_classifier.embed_calls, 1)
+        self.assertEqual(self.router.pipelines["bart"].call_count, 1)
+        self.router.lang_analysis.translate_batch.assert_called_once()
+
+    def test_cached_queries_skip_models(self):
+        self.router.select_agent(self.queries[0])
+        self.router.select_agents([self.queries[0], self.queries[0]])
+        self.assertEqual(self.router.talk_classifier.embed_calls, 1)
+
+class TestRuleRouter(ReadyRouterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.agents.append(make_agent("files", "file"))
+        self.router.rules = RuleRouter.from_file(os.path.join(os.path.dirname(__file__), '..', 'llm_router', 'rules.json'))
+
+    def test_unambiguous_queries_skip_models(self):
+        queries = {
+            "what does https://example.com/about say?": "web",
+            "Peut tu chercher sur internet et me trouver une 4090 pas cher ?": "web",
+            "why does this fail?\n```\nprint(1/0)\n```": "code",
+            "Hey, can you find the old_project.zip file somewhere on my drive?": "files",
+            "在网上找到最新的人工智能研究论文。": "web",
+        }
+        for query, role in queries.items():
+            self.assertEqual(self.router.select_agent(query).role, role, query)
+        self.assertEqual(self.router.talk_classifier.embed_calls, 0)
+        self.assertEqual(self.router.decisions["rules"], len(queries))
+        self.router.lang_analysis.detect_language.assert_not_called()
+
+    def test_ambiguous_queries_fall_through(self):
+        for query in ["write a python script to download https://example.com/report.pdf",
+                      "search the web for a weather api and then make an app with it",
+                      "tell me a joke"]:
+            self.assertIsNone(self.router.rules.match(query, [agent.role for agent in self.agents]), query)
+
+    def test_multi_step_queries_fall_through(self):
+        roles = [agent.role for agent in self.agents]
+        for query in ["search the web for the latest GPU prices and save them to a file",
+                      "make a plan to compare the pages of https://example.com",
+                      "step by step, write a python script that sorts a list",
+                      "cherche sur internet le prix d'une 4090 et sauvegarde le dans mon dossier"]:
+            self.assertIsNone(self.router.rules.match(query, roles), query)
+        self.router.select_agent("search the web for the latest GPU prices and save them to a file")
+        self.assertEqual(self.router.decisions["rules"], 0)
+
+    def test_source_file_needs_a_path(self):
+        roles = [agent.role for agent in self.agents]
+        for query in ["what is the difference between Node.js and Vue.js?", "is Next.js faster than Nuxt.js"]:
+            self.assertIsNone(self.router.rules.match(query, roles), query)
+        for query in ["fix the crash in src/app.js", "run ./main.py", "edit ~/bin/backup.sh"]:
+            self.assertEqual(self.router.rules.match(query, roles), ("code", "source_file"), query)
+
+    def test_only_available_roles(self):
+        self.assertIsNone(self.router.rules.match("open report.pdf", ["talk", "code", "web"]))
+        self.assertEqual(self.router.rules.match("open report.pdf", ["talk", "files"]), ("files", "file_name"))
+
+    def test_decision_paths_recorded(self):
+        self.router.select_agent("look at https://example.com")
+        self.router.select_agent("write something nice")
+        self.router.select_agent("write something nice")
+        self.assertEqual(self.router.decisions, {"rules": 1, "cache": 1, "models": 1, "fallback": 0})
+
+    def test_rules_before_models_ready(self):
+        self.router.ready.clear()
+        self.assertEqual(self.router.select_agent("read https://example.com").role, "web")
+        self.router.select_agent("tell me a joke")
+        self.assertEqual(self.router.decisions["fallback"], 1)
+
+class FakeClassifier:
+    """Embeds a text as a vector filled with its length."""
+    def __init__(self, predictions=None):
+        self.embed_calls = 0
+        self.added = None
+        self.predictions = predictions or []
+
+    def _get_embeddings(self, texts):
+        self.embed_calls += 1
+        return [torch.full((4,), float(len(text))) for text in texts]
+
+    def add_examples(self, texts, labels):
+        self.added = (texts, labels, self._get_embeddings(texts))
+
+    def predict(self, text):
+        self._get_embeddings([text])
+        return self.predictions
+
+class TestFewShotsCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.router = AgentRouter([make_agent("talk", "jarvis")], warm_up=False)
+        self.router.router_path = self.tmp.name
+        for filename, content in [("config.json", "{}"), ("model.safetensors", "weights")]:
+            with open(os.path.join(self.tmp.name, filename), 'w') as f:
+                f.write(content)
+        self.write_few_shots([["hi", "talk"], ["write code", "code"], ["search the web", "web"]])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_few_shots(self, tasks):
+        with open(os.path.join(self.tmp.name, "few_shots.json"), 'w') as f:
+            json.dump({"tasks": tasks, "complexity": []}, f)
+
+    def test_embeddings_cached_between_starts(self):
+        first = FakeClassifier()
+        self.router.learn_few_shots_tasks(first)
+        self.assertEqual(first.embed_calls, 1)
+        second = FakeClassifier()
+        self.router.learn_few_shots_tasks(second)
+        self.assertEqual(second.embed_calls, 0)
+        texts, labels, embeddings = second.added
+        self.assertEqual(sorted(zip(texts, labels)), sorted([("hi", "talk"), ("write code", "code"), ("search the web", "web")]))
+        for text, embedding in zip(texts, embeddings):
+            self.assertEqual(embedding[0].item(), float(len(text)))
+
+    def test_changed_examples_are_embedded_again(self):
+        self.router.learn_few_shots_tasks(FakeClassifier())
+        self.write_few_shots([["hello", "talk"], ["write code", "code"]])
+        classifier = FakeClassifier()
+        self.router.learn_few_shots_tasks(classifier)
+        self.assertEqual(classifier.embed_calls, 1)
+        self.assertEqual(len(glob.glob(os.path.join(self.tmp.name, "few_shots_tasks_*.npy"))), 1)
+
+def tiny_router_classifier(folder: str):
+    """A real AdaptiveClassifier on a tiny random BERT encoder saved in folder, nothing is downloaded."""
+    from transformers import BertConfig, BertModel, BertTokenizer
+    from adaptive_classifier import AdaptiveClassifier
+    words = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "hi", "write", "code", "search", "the", "web", "plan", "trip"]
+    with open(os.path.join(folder, "vocab.txt"), 'w') as f:
+        f.write("\n".join(words))
+    BertTokenizer(os.path.join(folder, "vocab.txt")).save_pretrained(folder)
+    config = BertConfig(vocab_size=len(words), hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32)
+    BertModel(config).save_pretrained(folder)
+    return AdaptiveClassifier(folder, use_onnx=False)
+
+class TestSharedEncoder(unittest.TestCase):
+    """The router heads on the pinned adaptive-classifier, with a tiny encoder."""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        encoder_dir = os.path.join(self.tmp.name, "encoder")
+        os.makedirs(encoder_dir)
+        self.router = AgentRouter([make_agent("talk", "jarvis")], warm_up=False)
+        self.router.router_path = self.tmp.name
+        for filename, content in [("config.json", "{}"), ("model.safetensors", "weights")]:
+            with open(os.path.join(self.tmp.name, filename), 'w') as f:
+                f.write(content)
+        with open(os.path.join(self.tmp.name, "few_shots.json"), 'w') as f:
+            json.dump({"tasks": [["hi", "talk"], ["write code", "code"], ["search the web", "web"]] * 3,
+                       "complexity": [["hi", "LOW"], ["plan trip", "HIGH"]] * 3}, f)
+        self.classifier = tiny_router_classifier(encoder_dir)
+
+    def test_heads_share_one_encoder(self):
+        with patch.object(AgentRouter, 'load_llm_router', return_value=self.classifier) as load:
+            task, complexity = self.router.load_router_heads()
+        load.assert_called_once()
+        self.assertIs(task.model, complexity.model)
+        self.assertIs(task.tokenizer, complexity.tokenizer)
+        self.assertEqual(set(task.label_to_id), {"talk", "code", "web"})
+        self.assertEqual(set(complexity.label_to_id), {"LOW", "HIGH"})
+
+    def test_predict_from_embedding_skips_encoder(self):
+        with patch.object(AgentRouter, 'load_llm_router', return_value=self.classifier):
+            task, complexity = self.router.load_router_heads()
+        self.router.talk_classifier = task
+        forwards = []
+        task.model.register_forward_hook(lambda *args: forwards.append(1))
+        embedding = self.router.encode("write code")
+        self.assertEqual(len(forwards), 1)
+        for classifier in [task, complexity]:
+            self.assertTrue(self.router.predict(classifier, "write code", embedding))
+        self.assertEqual(len(forwards), 1)
+
+    def test_unexpected_embedding_path_fails_loudly(self):
+        classifier = FakeClassifier(predictions=[("code", 1.0)])
+        classifier.predict = lambda text: classifier.predictions
+        with self.assertRaises(RuntimeError):
+            self.router.predict(classifier, "write code", torch.zeros(4))
+
+if __name__ == '__main__':
+    unittest.main()
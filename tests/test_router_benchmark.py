@@ -0,0 +1,57 @@
+import unittest
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.router import AgentRouter, RuleRouter
+from benchmarks.router_benchmark import run_benchmark, percentile, load_queries, default_agents, STAGES
+
+class TestRouterBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.router = AgentRouter(default_agents(), warm_up=False)
+        self.router.rules = RuleRouter({"patterns": {"web": {"url": "https?://"}}})
+        self.router.lang_analysis = MagicMock()
+        self.router.lang_analysis.detect_language.return_value = "en"
+        self.router.lang_analysis.translate.side_effect = lambda text, lang: text
+        self.router.encode = MagicMock(return_value=None)
+        self.router.estimate_complexity = MagicMock(return_value="LOW")
+        self.router.llm_router = MagicMock(side_effect=lambda text, embedding: ("code", 0.5, 0.5) if "python" in text
+                                           else ("talk", 0.9, 0.9))
+        self.router.pipelines = {"bart": MagicMock(return_value={"labels": ["web"], "scores": [0.9]})}
+        self.router.ready.set()
+        self.queries = [{"text": "write a python script", "lang": "en", "role": "code"},
+                        {"text": "tell me a funny story", "lang": "en", "role": "talk"},
+                        {"text": "read https://example.com", "lang": "en", "role": "web"}]
+
+    def test_report(self):
+        report = run_benchmark(self.router, self.queries, repeat=2, warmup=0)
+        self.assertEqual(report["end_to_end"]["calls"], 6)
+        self.assertEqual(set(report["stages"]), set(STAGES))
+        self.assertEqual(report["stages"]["rules"]["calls"], 6)
+        self.assertEqual(report["stages"]["detect"]["calls"], 4)
+        self.assertEqual(report["decided_by_rules"], 1)
+        # only the low confidence query runs the BART tiebreak
+        self.assertEqual(report["stages"]["bart"]["calls"], 2)
+        self.assertEqual(report["accuracy_per_role"]["talk"]["accuracy"], 1.0)
+        self.assertEqual(report["accuracy_per_role"]["code"]["accuracy"], 0.0)
+        self.assertEqual(report["errors"], [{"text": "write a python script", "expected": "code", "predicted": "web"}])
+        self.assertAlmostEqual(report["accuracy"], 2 / 3)
+
+    def test_timers_removed_after_run(self):
+        bart = self.router.pipelines["bart"]
+        run_benchmark(self.router, self.queries, warmup=0)
+        self.assertIs(self.router.pipelines["bart"], bart)
+
+    def test_percentile(self):
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertAlmostEqual(percentile(list(range(101)), 95), 95)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_query_set_is_labelled(self):
+        roles = {agent.role for agent in default_agents()}
+        queries = load_queries()
+        self.assertTrue(all(query["role"] in roles and query["lang"] in ["en", "fr", "zh"] for query in queries))
+
+if __name__ == '__main__':
+    unittest.main()
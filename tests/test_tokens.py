@@ -0,0 +1,37 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources import tokens
+from sources.tokens import ApproxTokenCounter, get_token_counter
+
+class TestGetTokenCounter(unittest.TestCase):
+    def test_auto_without_tiktoken(self):
+        with patch.object(tokens, 'TIKTOKEN_FOUND', False):
+            self.assertIsInstance(get_token_counter("auto"), ApproxTokenCounter)
+
+    def test_auto_falls_back_when_encoding_fails(self):
+        tiktoken = MagicMock()
+        tiktoken.get_encoding.side_effect = ConnectionError("offline")
+        with patch.object(tokens, 'TIKTOKEN_FOUND', True), patch.object(tokens, 'tiktoken', tiktoken, create=True):
+            counter = get_token_counter("auto")
+            self.assertIsInstance(counter, ApproxTokenCounter)
+            with self.assertRaises(ConnectionError):
+                get_token_counter("tiktoken")
+        self.assertEqual(counter.count("abcdefgh"), 2)
+
+    def test_approx_truncate(self):
+        counter = ApproxTokenCounter()
+        text = "word " * 40
+        self.assertLessEqual(counter.count(counter.truncate(text, 10)), 10)
+        self.assertEqual(counter.truncate(text, 0), "")
+        self.assertEqual(counter.truncate("short", 10), "short")
+
+    def test_unknown_tokenizer(self):
+        with self.assertRaises(ValueError):
+            get_token_counter("sentencepiece")
+
+if __name__ == '__main__':
+    unittest.main()